@@ -0,0 +1,647 @@
+"""Shared Anthropic API plumbing for the content generation agents."""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterable, Optional, List, Tuple, Type
+from anthropic import Anthropic, AsyncAnthropic
+
+from client import get_async_client, get_client
+from pydantic import BaseModel
+
+from config import (
+    DEDUP_AVOID_HINTS,
+    DEDUP_MAX_REGENERATIONS,
+    DEDUP_MODE,
+    DEFAULT_MODEL,
+    FAST_MODEL,
+    FAST_MODEL_ROUTES,
+    MAX_CONTINUATIONS,
+    STRUCTURED_OUTPUT,
+)
+from dedup import DuplicateContentError, NearDuplicateIndex, avoid_hint, shared_duplicate_index
+from resilience import (
+    CircuitBreaker,
+    RetryPolicy,
+    acall_with_retry,
+    call_with_retry,
+    default_circuit_breaker,
+)
+from rate_limiter import SharedRateLimiter, shared_rate_limiter
+from response_cache import ResponseCache
+from schemas import tool_definition
+from telemetry import estimate_cost
+from token_budget import drop_short_breakpoints, estimate_input_tokens, structured_max_tokens
+
+
+# Marks the end of a prompt prefix the API may cache and reuse across calls
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+class BaseAgent:
+    """
+    Base class for the content agents.
+
+    Agents use the process-wide pooled clients from client.py unless a client
+    is passed in explicitly.
+
+    In structured mode the post is returned as the input of a forced tool call
+    whose schema is OUTPUT_SCHEMA, instead of as marker-delimited text.
+
+    With a near-duplicate index (DEDUP_MODE), generate_post and
+    agenerate_post check each post against the saved ones and regenerate or
+    reject near-duplicates, and save_post adds the saved post to the index.
+
+    Posts whose content type or template is in `fast_routes` are drafted with
+    `fast_model` and regenerated with `model` only if the draft fails the
+    agent's quality_issues checks. "route" in the post metadata records the
+    outcome: "default", "fast" or "escalated".
+    """
+
+    # Set by subclasses: the pydantic model a structured post must validate against
+    OUTPUT_SCHEMA: Optional[Type[BaseModel]] = None
+    OUTPUT_TOOL = "save_post"
+    OUTPUT_TOOL_DESCRIPTION = "Save the finished post."
+
+    # Set by subclasses: the content type saved posts are indexed under
+    CONTENT_TYPE = "post"
+
+    def __init__(
+        self,
+        model: str = DEFAULT_MODEL,
+        response_cache: Optional[ResponseCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        client: Optional[Anthropic] = None,
+        async_client: Optional[AsyncAnthropic] = None,
+        structured: bool = STRUCTURED_OUTPUT,
+        rate_limiter: Optional[SharedRateLimiter] = None,
+        duplicate_index: Optional[NearDuplicateIndex] = None,
+        fast_model: Optional[str] = FAST_MODEL,
+        fast_routes: Optional[Iterable[str]] = None,
+    ):
+        self.client = client or get_client()
+        self._async_client = async_client
+        self.model = model
+        self.fast_model = fast_model
+        self.fast_routes = set(FAST_MODEL_ROUTES if fast_routes is None else fast_routes)
+        self.response_cache = response_cache
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or default_circuit_breaker
+        self.structured = structured
+        self.rate_limiter = rate_limiter or shared_rate_limiter()
+        self.duplicate_index = duplicate_index or shared_duplicate_index()
+        self.system_prompt = self._build_system_prompt()
+
+    @property
+    def async_client(self) -> AsyncAnthropic:
+        """Async client, fetched on first use so sync-only callers never create one."""
+        if self._async_client is None:
+            self._async_client = get_async_client()
+        return self._async_client
+
+    def _build_system_prompt(self) -> str:
+        raise NotImplementedError
+
+    def _text_block(self, text: str, cache: bool = False) -> dict:
+        """Build a text content block, optionally marked as a cache breakpoint."""
+        block = {"type": "text", "text": text}
+        if cache:
+            block["cache_control"] = CACHE_CONTROL
+        return block
+
+    def _request_params(
+        self,
+        content: List[dict],
+        max_tokens: int,
+        tool: Optional[dict] = None,
+        model: Optional[str] = None,
+    ) -> dict:
+        """
+        Build the keyword arguments for a messages.create call.
+
+        The system prompt never changes for an agent, so it is marked as a
+        cache breakpoint, as are the blocks `content` marks. Breakpoints whose
+        prefix is shorter than the model caches are dropped (see
+        token_budget.drop_short_breakpoints).
+
+        In structured mode `tool` replaces the OUTPUT_TOOL definition, and
+        `max_tokens`, sized for the text format, is enlarged for the JSON
+        envelope (see token_budget.structured_max_tokens). The request goes
+        to `model`, or the agent's model if None.
+        """
+        params = {
+            "model": model or self.model,
+            "max_tokens": max_tokens,
+            "system": [self._text_block(self.system_prompt, cache=True)],
+            "messages": [{"role": "user", "content": content}],
+        }
+        if self.structured:
+            tool = tool or tool_definition(self.OUTPUT_TOOL, self.OUTPUT_TOOL_DESCRIPTION, self.OUTPUT_SCHEMA)
+            params["tools"] = [tool]
+            params["tool_choice"] = {"type": "tool", "name": tool["name"]}
+            params["max_tokens"] = structured_max_tokens(max_tokens)
+        drop_short_breakpoints(params)
+        return params
+
+    def _structured_fields(
+        self,
+        message,
+        tool_name: Optional[str] = None,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> dict:
+        """
+        Validate the forced tool call of a structured response against its
+        schema (OUTPUT_TOOL and OUTPUT_SCHEMA unless given).
+
+        Raises:
+            ValueError: If the response has no tool call, was cut off, or does not match the schema
+        """
+        tool_name = tool_name or self.OUTPUT_TOOL
+        schema = schema or self.OUTPUT_SCHEMA
+        if message.stop_reason == "max_tokens":
+            raise ValueError("Structured output was cut off at max_tokens")
+        for block in message.content:
+            if block.type == "tool_use" and block.name == tool_name:
+                # pydantic's ValidationError is a ValueError
+                return schema.model_validate(block.input).model_dump()
+        raise ValueError(f"Response did not call the {tool_name} tool")
+
+    def _can_continue(self, message) -> bool:
+        """Whether a response stopped at max_tokens and can be resumed with a prefill."""
+        # A half-written tool call cannot be continued from an assistant prefill
+        return message.stop_reason == "max_tokens" and not self.structured
+
+    def _usage_metadata(self, message) -> dict:
+        """Extract token usage, including prompt cache reads and writes, from a response."""
+        usage = message.usage
+        return {
+            "input_tokens": usage.input_tokens,
+            "output_tokens": usage.output_tokens,
+            "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", None) or 0,
+            "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", None) or 0,
+        }
+
+    def _call_metadata(self, message, call_info: Optional[dict] = None) -> dict:
+        """
+        Build the per-call post metadata: token usage, stop reason, estimated
+        cost and whatever timing and retry details the caller measured.
+
+        Responses replayed from the response cache cost nothing, and batch
+        results (call_info["batch"]) are billed at the batch discount. Cost is
+        estimated for call_info["model"] when the request was routed to a model
+        other than the agent's.
+        """
+        call_info = call_info or {}
+        usage = self._usage_metadata(message)
+        cost = estimate_cost(call_info.get("model", self.model), usage, batch=call_info.get("batch", False))
+        return {
+            "usage": usage,
+            "stop_reason": message.stop_reason,
+            "cost_usd": 0.0 if call_info.get("cache_hit") else cost,
+            **call_info,
+        }
+
+    def _elapsed_ms(self, start: float) -> float:
+        return round((time.perf_counter() - start) * 1000, 1)
+
+    def _cached_response(self, params: dict):
+        """Look a request up in the response cache, if one is configured."""
+        if self.response_cache is None:
+            return None
+        return self.response_cache.get(params)
+
+    def _cache_response(self, params: dict, message):
+        if self.response_cache is not None:
+            self.response_cache.put(params, message)
+
+    def _message_text(self, message) -> str:
+        return "".join(block.text for block in message.content if block.type == "text")
+
+    def _continuation_params(self, params: dict, text: str) -> dict:
+        """
+        Build a request that resumes a truncated response.
+
+        The partial output is sent back as an assistant prefill, so the model
+        continues from where it stopped instead of starting over. The API
+        rejects prefills ending in whitespace, so it is trimmed.
+        """
+        return {
+            **params,
+            "messages": params["messages"] + [{"role": "assistant", "content": text.rstrip()}],
+        }
+
+    def _merge_continuation(self, message, text: str, continuation):
+        """Combine a truncated response and its continuation into one message."""
+        usage = message.usage
+        more = continuation.usage
+        merged_usage = usage.model_copy(update={
+            "input_tokens": usage.input_tokens + more.input_tokens,
+            "output_tokens": usage.output_tokens + more.output_tokens,
+            "cache_creation_input_tokens": (usage.cache_creation_input_tokens or 0)
+            + (more.cache_creation_input_tokens or 0),
+            "cache_read_input_tokens": (usage.cache_read_input_tokens or 0)
+            + (more.cache_read_input_tokens or 0),
+        })
+        text_block = message.content[0].model_copy(
+            update={"text": text.rstrip() + self._message_text(continuation)}
+        )
+        return message.model_copy(update={
+            "content": [text_block],
+            "stop_reason": continuation.stop_reason,
+            "usage": merged_usage,
+        })
+
+    def _reserve(self, params: dict):
+        """Wait for the shared rate limiter to admit a request."""
+        self.rate_limiter.acquire(estimate_input_tokens(params), params["max_tokens"])
+
+    def _settle(self, params: dict, message=None):
+        """
+        Correct the rate limiter's reservation with a response's actual usage.
+
+        Output is reserved at max_tokens and input at an estimate; prompt cache
+        reads do not count toward input limits. A failed request (no message)
+        gives its token reservation back.
+        """
+        if self.rate_limiter is None:
+            return
+        actual_input = actual_output = 0
+        if message is not None:
+            usage = message.usage
+            actual_input = usage.input_tokens + (getattr(usage, "cache_creation_input_tokens", None) or 0)
+            actual_output = usage.output_tokens
+        self.rate_limiter.settle(
+            input_tokens=actual_input - estimate_input_tokens(params),
+            output_tokens=actual_output - params["max_tokens"],
+        )
+
+    def _limited(self, call, params: dict):
+        """Make one API request under the shared rate limiter, if one is configured."""
+        if self.rate_limiter is None:
+            return call()
+        self._reserve(params)
+        message = None
+        try:
+            message = call()
+            return message
+        finally:
+            self._settle(params, message)
+
+    def _send(self, params: dict) -> Tuple[object, int]:
+        # The limiter sits inside the retry loop so every attempt is metered
+        return call_with_retry(
+            lambda: self._limited(lambda: self.client.messages.create(**params), params),
+            self.retry_policy,
+            self.circuit_breaker,
+        )
+
+    def complete_truncated(self, params: dict, message) -> Tuple[object, int, int]:
+        """
+        Continue a response that stopped at max_tokens, up to MAX_CONTINUATIONS times.
+
+        Returns:
+            The full message, the number of continuations and the retries they took
+        """
+        continuations = retries = 0
+        while self._can_continue(message) and continuations < MAX_CONTINUATIONS:
+            text = self._message_text(message)
+            continuation, attempts = self._send(self._continuation_params(params, text))
+            message = self._merge_continuation(message, text, continuation)
+            continuations += 1
+            retries += attempts
+        return message, continuations, retries
+
+    def _create_message(self, params: dict) -> Tuple[object, dict]:
+        """
+        Send a request with the sync client, continuing it if it was truncated.
+
+        Returns:
+            The response message and a dict of per-call details for the post metadata
+        """
+        start = time.perf_counter()
+        message = self._cached_response(params)
+        if message is not None:
+            return message, self._cache_hit_info(start, params)
+
+        message, retries = self._send(params)
+        # Non-streaming responses arrive whole, so the first token lands with the first response
+        ttft_ms = self._elapsed_ms(start)
+        message, continuations, more_retries = self.complete_truncated(params, message)
+
+        self._cache_response(params, message)
+        return message, {
+            "model": params["model"],
+            "cache_hit": False,
+            "retries": retries + more_retries,
+            "continuations": continuations,
+            "wall_time_ms": self._elapsed_ms(start),
+            "ttft_ms": ttft_ms,
+        }
+
+    def _cache_hit_info(self, start: float, params: dict) -> dict:
+        elapsed = self._elapsed_ms(start)
+        return {
+            "model": params["model"],
+            "cache_hit": True,
+            "retries": 0,
+            "continuations": 0,
+            "wall_time_ms": elapsed,
+            "ttft_ms": elapsed,
+        }
+
+    @contextmanager
+    def _stream_message(self, params: dict):
+        """
+        Open a streaming request with the sync client (a context manager).
+
+        A stream cannot be replayed once text has been yielded, so only the
+        circuit breaker applies here and the SDK's own retries cover failures
+        to open the connection. The outcome is recorded with the circuit
+        breaker when the block exits, and the rate limiter reservation is
+        settled with the final message's usage, or given back if the stream
+        failed or was abandoned.
+        """
+        self.circuit_breaker.before_call()
+        reserved = False
+        message = None
+        try:
+            if self.rate_limiter is not None:
+                self._reserve(params)
+                reserved = True
+            with self.client.with_options(max_retries=2).messages.stream(**params) as stream:
+                yield stream
+                message = stream.get_final_message()
+        except BaseException as e:
+            # Also releases a half-open probe when the caller stops reading early
+            self.circuit_breaker.record_failure(e)
+            raise
+        else:
+            self.circuit_breaker.record_success()
+        finally:
+            if reserved:
+                self._settle(params, message)
+
+    async def _acreate_message(self, params: dict) -> Tuple[object, dict]:
+        """Send a request with the async client. Returns the same pair as _create_message."""
+        start = time.perf_counter()
+        message = self._cached_response(params)
+        if message is not None:
+            return message, self._cache_hit_info(start, params)
+
+        async def limited(request: dict):
+            if self.rate_limiter is None:
+                return await self.async_client.messages.create(**request)
+            # The limiter blocks on SQLite and sleeps, so keep it off the event loop
+            await asyncio.to_thread(self._reserve, request)
+            message = None
+            try:
+                message = await self.async_client.messages.create(**request)
+                return message
+            finally:
+                await asyncio.to_thread(self._settle, request, message)
+
+        async def send(request: dict):
+            return await acall_with_retry(
+                lambda: limited(request),
+                self.retry_policy,
+                self.circuit_breaker,
+            )
+
+        message, retries = await send(params)
+        ttft_ms = self._elapsed_ms(start)
+        continuations = 0
+        while self._can_continue(message) and continuations < MAX_CONTINUATIONS:
+            text = self._message_text(message)
+            continuation, attempts = await send(self._continuation_params(params, text))
+            message = self._merge_continuation(message, text, continuation)
+            continuations += 1
+            retries += attempts
+
+        self._cache_response(params, message)
+        return message, {
+            "model": params["model"],
+            "cache_hit": False,
+            "retries": retries,
+            "continuations": continuations,
+            "wall_time_ms": self._elapsed_ms(start),
+            "ttft_ms": ttft_ms,
+        }
+
+    def _draft(
+        self,
+        topic: str,
+        template_type: str,
+        suggestion: Optional[str],
+        additional_context: Optional[str],
+        model: Optional[str] = None,
+        **options,
+    ) -> dict:
+        """Generate one post with a single request to `model` (implemented by subclasses)."""
+        raise NotImplementedError
+
+    def quality_issues(self, post: dict, template_type: str) -> List[str]:
+        """Run the local quality checks on a post (implemented by subclasses, see quality.py)."""
+        raise NotImplementedError
+
+    def route_model(self, template_type: str) -> str:
+        """Get the model that drafts posts of a template: fast_model if routed, else the agent's model."""
+        routes = {self.CONTENT_TYPE, f"{self.CONTENT_TYPE}:{template_type}"}
+        if self.fast_model and self.fast_routes & routes:
+            return self.fast_model
+        return self.model
+
+    def _routed(self, post: dict, template_type: str, draft: Optional[dict] = None) -> Tuple[dict, bool]:
+        """
+        Record a post's route in its metadata.
+
+        Returns:
+            The post and whether it must be escalated: a fast-model draft that
+            failed the quality checks
+        """
+        issues = self.quality_issues(post, template_type)
+        metadata = post["metadata"]
+        metadata["quality_issues"] = issues
+        if draft is not None:
+            metadata["route"] = "escalated"
+            metadata["escalation"] = {
+                "model": draft["metadata"]["model"],
+                "issues": draft["metadata"]["quality_issues"],
+                "usage": draft["metadata"]["usage"],
+                "cost_usd": draft["metadata"]["cost_usd"],
+                "wall_time_ms": draft["metadata"].get("wall_time_ms"),
+            }
+            return post, False
+        metadata["route"] = "default" if metadata["model"] == self.model else "fast"
+        return post, metadata["route"] == "fast" and bool(issues)
+
+    def _generate_routed(
+        self,
+        template_type: str,
+        draft: Callable[[str], dict],
+        post: Optional[dict] = None,
+    ) -> dict:
+        """
+        Draft a post with the template's routed model, regenerating it with
+        the agent's model if the draft fails the quality checks.
+
+        Args:
+            template_type: Template type, for routing and the quality checks
+            draft: Generates one post with the given model
+            post: An already drafted post (e.g. a batch result) to check
+                instead of drafting one
+        """
+        if post is None:
+            post = draft(self.route_model(template_type))
+        post, escalate = self._routed(post, template_type)
+        if not escalate:
+            return post
+        return self._routed(draft(self.model), template_type, draft=post)[0]
+
+    async def _agenerate_routed(self, template_type: str, draft: Callable[[str], Awaitable[dict]]) -> dict:
+        """Async counterpart of _generate_routed."""
+        post, escalate = self._routed(await draft(self.route_model(template_type)), template_type)
+        if not escalate:
+            return post
+        return self._routed(await draft(self.model), template_type, draft=post)[0]
+
+    def _generate_once(
+        self,
+        topic: str,
+        template_type: str,
+        suggestion: Optional[str],
+        additional_context: Optional[str],
+        **options,
+    ) -> dict:
+        """Generate one post through the model route, escalating a draft that fails the quality checks."""
+        return self._generate_routed(
+            template_type,
+            lambda model: self._draft(topic, template_type, suggestion, additional_context, model, **options),
+        )
+
+    def review(self, post: dict, topic: str, template_type: str) -> dict:
+        """
+        Apply the quality gate to a post drafted outside generate_post (e.g. a
+        batch result requested with route_model), regenerating it with the
+        agent's model if it is a fast-model draft that fails.
+
+        Returns:
+            The post, or its replacement
+        """
+        return self._generate_routed(
+            template_type,
+            lambda model: self._draft(topic, template_type, None, None, model),
+            post=post,
+        )
+
+    def _with_avoid_hints(self, additional_context: Optional[str], headlines: List[str]) -> Optional[str]:
+        if not headlines:
+            return additional_context
+        hint = avoid_hint(headlines)
+        return f"{additional_context}\n\n{hint}" if additional_context else hint
+
+    def _avoid_context(self, topic: str, additional_context: Optional[str]) -> Optional[str]:
+        """Add the recent posts on a topic to the additional context as angles to avoid."""
+        if self.duplicate_index is None:
+            return additional_context
+        headlines = self.duplicate_index.recent_headlines(self.CONTENT_TYPE, topic, DEDUP_AVOID_HINTS)
+        return self._with_avoid_hints(additional_context, headlines)
+
+    def _next_avoid_hints(self, post: dict, regenerations: int, avoid: List[str]) -> Optional[List[str]]:
+        """
+        Check a post against the duplicate index.
+
+        Returns:
+            None if the post is accepted (its regenerations are recorded in its
+            metadata), otherwise the avoid hints for regenerating it
+
+        Raises:
+            DuplicateContentError: If it is a duplicate and may not be regenerated
+        """
+        match = self.duplicate_index.find_similar(self.CONTENT_TYPE, post)
+        if match is None:
+            post["metadata"]["regenerations"] = regenerations
+            return None
+        max_regenerations = 0 if DEDUP_MODE == "reject" else DEDUP_MAX_REGENERATIONS
+        if regenerations >= max_regenerations:
+            raise DuplicateContentError(match)
+        return [match.headline] + [h for h in avoid if h != match.headline]
+
+    def _generate_unique(
+        self,
+        topic: str,
+        generate: Callable[[Optional[str]], dict],
+        additional_context: Optional[str] = None,
+        post: Optional[dict] = None,
+    ) -> dict:
+        """
+        Generate a post that is not a near-duplicate of a saved one.
+
+        The titles or hooks of recent posts on the topic are appended to the
+        additional context as things to avoid. A post the index matches is
+        regenerated with the match added to those hints, up to
+        DEDUP_MAX_REGENERATIONS times (never in "reject" mode).
+
+        Args:
+            topic: Topic key, for looking up recent posts
+            generate: Generates one post given the additional context
+            additional_context: The caller's additional context
+            post: An already generated post to check before generating any
+
+        Raises:
+            DuplicateContentError: If every attempt was a near-duplicate
+        """
+        if self.duplicate_index is None:
+            return post if post is not None else generate(additional_context)
+
+        avoid = self.duplicate_index.recent_headlines(self.CONTENT_TYPE, topic, DEDUP_AVOID_HINTS)
+        regenerations = 0
+        while True:
+            if post is None:
+                post = generate(self._with_avoid_hints(additional_context, avoid))
+            avoid = self._next_avoid_hints(post, regenerations, avoid)
+            if avoid is None:
+                return post
+            post = None
+            regenerations += 1
+
+    async def _agenerate_unique(
+        self,
+        topic: str,
+        generate: Callable[[Optional[str]], Awaitable[dict]],
+        additional_context: Optional[str] = None,
+    ) -> dict:
+        """Async counterpart of _generate_unique."""
+        if self.duplicate_index is None:
+            return await generate(additional_context)
+
+        # Index lookups wait on SQLite and hash the whole post, so keep them off the event loop
+        avoid = await asyncio.to_thread(
+            self.duplicate_index.recent_headlines, self.CONTENT_TYPE, topic, DEDUP_AVOID_HINTS
+        )
+        regenerations = 0
+        while True:
+            post = await generate(self._with_avoid_hints(additional_context, avoid))
+            avoid = await asyncio.to_thread(self._next_avoid_hints, post, regenerations, avoid)
+            if avoid is None:
+                return post
+            regenerations += 1
+
+    def dedupe(self, post: dict, topic: str, template_type: str) -> dict:
+        """
+        Check a post generated outside generate_post (e.g. a batch result)
+        against the duplicate index, regenerating it if it is a near-duplicate.
+
+        Returns:
+            The post, or its replacement
+        """
+        return self._generate_unique(
+            topic,
+            lambda context: self._generate_once(topic, template_type, None, context),
+            post=post,
+        )
+
+    def _index_saved(self, post: dict, path: str):
+        """Add a saved post to the duplicate index."""
+        if self.duplicate_index is not None:
+            self.duplicate_index.add(self.CONTENT_TYPE, post, path)
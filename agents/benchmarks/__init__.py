@@ -0,0 +1 @@
+"""Benchmarks for the content generation system."""
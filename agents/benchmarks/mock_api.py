@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Anthropic Messages API.
+
+Serves POST /v1/messages with canned, correctly sectioned blog or LinkedIn
+responses (or tool calls, for structured-output requests) so the agents can
+be driven at scale without network access or API spend. Latency, error rate,
+response length and streaming pace are all configurable. Point the agents at
+it with ANTHROPIC_BASE_URL.
+
+Message Batches are served too: POST /v1/messages/batches answers every
+request up front, GET /v1/messages/batches/{id} reports the batch as
+in progress until its slowest request would have finished, and
+GET /v1/messages/batches/{id}/results streams the results as JSONL.
+
+Usage (from the agents/ directory):
+    python -m benchmarks.mock_api --port 8089 --latency lognormal:0.8:0.5 --error-rate 0.02
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+
+# Rough request size to input tokens, for the usage block
+CHARS_PER_TOKEN = 4
+
+# Message Batches expire if they have not ended within 24 hours
+BATCH_EXPIRY = timedelta(hours=24)
+
+FILLER_WORDS = (
+    "battery storage systems shift renewable energy to peak demand hours while "
+    "providing frequency response, voltage support and backup power to the grid"
+).split()
+
+
+class LatencyModel:
+    """
+    Distribution of time to first token, in seconds.
+
+    Specs are "fixed:SECONDS", "uniform:LOW:HIGH" or "lognormal:MEDIAN:SIGMA".
+    """
+
+    def __init__(self, spec: str = "fixed:0"):
+        kind, *args = spec.split(":")
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {kind}. Available: ['fixed', 'uniform', 'lognormal']")
+        self.kind = kind
+        self.args = [float(a) for a in args]
+        self.spec = spec
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            return self.args[0]
+        if self.kind == "uniform":
+            return random.uniform(self.args[0], self.args[1])
+        median, sigma = self.args
+        return random.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+
+def _filler(words: int) -> str:
+    return " ".join(FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(words))
+
+
+def _variant_count(prompt: str) -> int:
+    """Number of post variants a prompt asks for (1 for a single post)."""
+    match = re.search(r"Write (\d+) distinct posts", prompt)
+    return int(match.group(1)) if match else 1
+
+
+def _linkedin_post(words: int, variant: int = 1) -> dict:
+    return {
+        "content": f"{_filler(words)} (take {variant})",
+        "hook": f"Battery storage systems shift renewable energy, take {variant}.",
+        "cta": "What would you measure first?",
+    }
+
+
+def _response_text(prompt: str, words: int) -> str:
+    """Build a response in the section format the requesting agent expects."""
+    variants = _variant_count(prompt)
+    if variants > 1:
+        return "\n".join(
+            f"=== VARIANT {i} ===\nPOST:\n{post['content']}\n\nHOOK: {post['hook']}\nCTA: {post['cta']}\n"
+            for i, post in ((i, _linkedin_post(words, i)) for i in range(1, variants + 1))
+        )
+    if "META_DESCRIPTION:" in prompt:
+        return (
+            "TITLE: Benchmark Blog Post\n"
+            "META_DESCRIPTION: A synthetic post generated by the mock Messages API.\n"
+            f"CONTENT:\n# Benchmark Blog Post\n\n{_filler(words)}\n\n"
+            "KEYWORDS: battery storage, benchmark, grid\n"
+        )
+    return (
+        f"POST:\n{_filler(words)}\n\n"
+        "HOOK: Battery storage systems shift renewable energy.\n"
+        "CTA: What would you measure first?\n"
+    )
+
+
+def _timestamp(moment: datetime) -> str:
+    return moment.isoformat().replace("+00:00", "Z")
+
+
+def _error_body(status: int, message: str) -> dict:
+    error_type = {429: "rate_limit_error", 529: "overloaded_error"}.get(status, "api_error")
+    return {"type": "error", "error": {"type": error_type, "message": message}}
+
+
+def _tool_input(tool: dict, words: int, prompt: str) -> dict:
+    """Build the input of a structured-output tool call from its schema."""
+    properties = tool["input_schema"].get("properties", {})
+    if "variants" in properties:
+        return {"variants": [_linkedin_post(words, i) for i in range(1, _variant_count(prompt) + 1)]}
+    if "meta_description" in properties:
+        return {
+            "title": "Benchmark Blog Post",
+            "meta_description": "A synthetic post generated by the mock Messages API.",
+            "content": f"# Benchmark Blog Post\n\n{_filler(words)}",
+            "keywords": ["battery storage", "benchmark", "grid"],
+        }
+    return {
+        "content": _filler(words),
+        "hook": "Battery storage systems shift renewable energy.",
+        "cta": "What would you measure first?",
+    }
+
+
+class MockMessagesServer:
+    """
+    Threaded HTTP server answering Messages API calls.
+
+    Args:
+        latency: Time-to-first-token distribution
+        error_rate: Fraction of requests answered with an error status
+        error_statuses: Statuses to choose from for injected errors
+        output_words: Words of body text per response
+        token_delay: Seconds per output token, paced between stream chunks
+            and added to the total time of non-streaming responses
+        retry_after_ms: retry-after-ms header sent with 429/529 errors
+        host: Interface to bind
+        port: Port to bind (0 picks a free one)
+    """
+
+    def __init__(
+        self,
+        latency: Optional[LatencyModel] = None,
+        error_rate: float = 0.0,
+        error_statuses: Optional[List[int]] = None,
+        output_words: int = 300,
+        token_delay: float = 0.0,
+        retry_after_ms: int = 100,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = latency or LatencyModel()
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses or [529, 500, 429]
+        self.output_words = output_words
+        self.token_delay = token_delay
+        self.retry_after_ms = retry_after_ms
+
+        self.requests = 0
+        self.errors = 0
+        self.batches: dict = {}
+        self._lock = threading.Lock()
+
+        handler = type("Handler", (_Handler,), {"mock": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockMessagesServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, error: bool):
+        with self._lock:
+            self.requests += 1
+            if error:
+                self.errors += 1
+
+    def _inject_error(self) -> Optional[int]:
+        """Draw whether a request fails; returns the error status, or None."""
+        failed = random.random() < self.error_rate
+        self._count(error=failed)
+        return random.choice(self.error_statuses) if failed else None
+
+    def _message(self, body: dict):
+        """
+        Build the Message a create request would return.
+
+        Returns:
+            Tuple of (message, generated text)
+        """
+        if body.get("tools"):
+            tool = body["tools"][0]
+            tool_input = _tool_input(tool, self.output_words, json.dumps(body.get("messages", [])))
+            text = json.dumps(tool_input)
+            content = [{"type": "tool_use", "id": f"toolu_mock_{uuid.uuid4().hex[:12]}",
+                        "name": tool["name"], "input": tool_input}]
+            stop_reason = "tool_use"
+        else:
+            text = _response_text(json.dumps(body.get("messages", [])), self.output_words)
+            content = [{"type": "text", "text": text}]
+            stop_reason = "end_turn"
+
+        message = {
+            "id": f"msg_mock_{uuid.uuid4().hex[:12]}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "mock"),
+            "content": content,
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": len(json.dumps(body)) // CHARS_PER_TOKEN,
+                "output_tokens": len(text) // CHARS_PER_TOKEN,
+                "cache_creation_input_tokens": 0,
+                "cache_read_input_tokens": 0,
+            },
+        }
+        return message, text
+
+    def create_batch(self, requests: List[dict]) -> dict:
+        """
+        Answer every request of a Message Batch and record when it ends.
+
+        The batch ends once its slowest request would have finished, by the
+        same latency and token pace as a single call.
+        """
+        created = datetime.now(timezone.utc)
+        results = []
+        seconds = 0.0
+        for request in requests:
+            status = self._inject_error()
+            if status is not None:
+                results.append({"custom_id": request["custom_id"], "result": {
+                    "type": "errored", "error": _error_body(status, "Injected by mock server"),
+                }})
+                continue
+            message, _ = self._message(request["params"])
+            seconds = max(seconds, self.latency.sample() + self.token_delay * message["usage"]["output_tokens"])
+            results.append({"custom_id": request["custom_id"], "result": {"type": "succeeded", "message": message}})
+
+        batch_id = f"msgbatch_mock_{uuid.uuid4().hex[:12]}"
+        errored = sum(1 for r in results if r["result"]["type"] == "errored")
+        with self._lock:
+            self.batches[batch_id] = {
+                "created_at": created,
+                "ends_at": created + timedelta(seconds=seconds),
+                "results": results,
+                "request_counts": {
+                    "processing": 0,
+                    "succeeded": len(results) - errored,
+                    "errored": errored,
+                    "canceled": 0,
+                    "expired": 0,
+                },
+            }
+        return self.batch(batch_id)
+
+    def batch(self, batch_id: str) -> Optional[dict]:
+        """Get a Message Batch object, or None for an unknown ID."""
+        with self._lock:
+            state = self.batches.get(batch_id)
+        if state is None:
+            return None
+
+        ended = datetime.now(timezone.utc) >= state["ends_at"]
+        counts = state["request_counts"]
+        if not ended:
+            counts = {**{k: 0 for k in counts}, "processing": len(state["results"])}
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": counts,
+            "created_at": _timestamp(state["created_at"]),
+            "expires_at": _timestamp(state["created_at"] + BATCH_EXPIRY),
+            "ended_at": _timestamp(state["ends_at"]) if ended else None,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": f"{self.url}/v1/messages/batches/{batch_id}/results" if ended else None,
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    mock: MockMessagesServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+        path = self.path.split("?")[0]
+        if path == "/v1/messages/batches":
+            self._send_json(200, self.mock.create_batch(body.get("requests", [])))
+            return
+        if path != "/v1/messages":
+            self._send_not_found()
+            return
+
+        mock = self.mock
+        time.sleep(mock.latency.sample())
+
+        status = mock._inject_error()
+        if status is not None:
+            self._send_error(status)
+            return
+
+        message, text = mock._message(body)
+        if body.get("stream") and not body.get("tools"):
+            self._send_stream(message, text)
+        else:
+            time.sleep(mock.token_delay * message["usage"]["output_tokens"])
+            self._send_json(200, message)
+
+    def do_GET(self):
+        match = re.fullmatch(r"/v1/messages/batches/([\w-]+)(/results)?", self.path.split("?")[0])
+        batch = self.mock.batch(match.group(1)) if match else None
+        if batch is None or (match.group(2) and batch["processing_status"] != "ended"):
+            self._send_not_found()
+            return
+        if not match.group(2):
+            self._send_json(200, batch)
+            return
+
+        data = "".join(
+            json.dumps(result) + "\n" for result in self.mock.batches[batch["id"]]["results"]
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("content-type", "application/binary")
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: int):
+        headers = {}
+        if status in (429, 529):
+            headers["retry-after-ms"] = str(self.mock.retry_after_ms)
+        self._send_json(status, _error_body(status, "Injected by mock server"), headers)
+
+    def _send_not_found(self):
+        self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+    def _send_stream(self, message: dict, text: str):
+        """Send the message as server-sent events, one chunk per few words."""
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("cache-control", "no-cache")
+        self.send_header("connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(name: str, data: dict):
+            self.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        usage = message["usage"]
+        start = {**message, "content": [], "stop_reason": None, "usage": {**usage, "output_tokens": 1}}
+        event("message_start", {"type": "message_start", "message": start})
+        event("content_block_start", {"type": "content_block_start", "index": 0,
+                                      "content_block": {"type": "text", "text": ""}})
+
+        words = text.split(" ")
+        for i in range(0, len(words), 8):
+            chunk = " ".join(words[i:i + 8]) + (" " if i + 8 < len(words) else "")
+            time.sleep(self.mock.token_delay * len(chunk) / CHARS_PER_TOKEN)
+            event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                          "delta": {"type": "text_delta", "text": chunk}})
+
+        event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        event("message_delta", {"type": "message_delta",
+                                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                "usage": {"output_tokens": usage["output_tokens"]}})
+        event("message_stop", {"type": "message_stop"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock of the Messages API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="fixed:0.2", help="fixed:S, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--output-words", type=int, default=300, help="Body words per response")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds per output token")
+    args = parser.parse_args()
+
+    server = MockMessagesServer(
+        latency=LatencyModel(args.latency),
+        error_rate=args.error_rate,
+        output_words=args.output_words,
+        token_delay=args.token_delay,
+        host=args.host,
+        port=args.port,
+    )
+    print(f"Mock Messages API listening on {server.url} (ANTHROPIC_BASE_URL={server.url})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
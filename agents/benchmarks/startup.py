@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+CLI cold-start benchmark.
+
+Runs each offline subcommand of main.py under `python -X importtime` and
+reports wall-clock time, total import time and the heaviest top-level
+imports. Commands that call the API are not run.
+
+Usage (from the agents/ directory):
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 10 --budget-ms 300
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+
+AGENTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Subcommands that never touch the API and are safe to run repeatedly
+SUBCOMMANDS = {
+    "help": ["--help"],
+    "list": ["list"],
+    "list-templates": ["list", "--blog-templates", "--linkedin-templates"],
+    "status": ["status"],
+}
+
+
+def parse_importtime(stderr: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    Parse `-X importtime` output.
+
+    Returns:
+        Total import time in ms and (module, cumulative ms) for top-level imports
+    """
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # the header row
+        # Nested imports are indented under the module that triggered them
+        if not name.startswith(" ") or name[1:2] != " ":
+            top_level.append((name.strip(), int(cumulative) / 1000))
+
+    return sum(ms for _, ms in top_level), top_level
+
+
+def run_once(args: List[str]) -> Tuple[float, float, List[Tuple[str, float]]]:
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "main.py", *args],
+        cwd=AGENTS_DIR,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    if result.returncode != 0:
+        raise RuntimeError(f"main.py {' '.join(args)} exited with {result.returncode}")
+
+    import_ms, modules = parse_importtime(result.stderr)
+    return wall_ms, import_ms, modules
+
+
+def benchmark(runs: int) -> Dict[str, dict]:
+    results = {}
+    for name, args in SUBCOMMANDS.items():
+        walls, imports, modules = [], [], []
+        for _ in range(runs):
+            wall_ms, import_ms, modules = run_once(args)
+            walls.append(wall_ms)
+            imports.append(import_ms)
+
+        results[name] = {
+            "wall_ms": statistics.median(walls),
+            "import_ms": statistics.median(imports),
+            "heaviest": sorted(modules, key=lambda m: m[1], reverse=True)[:5],
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure CLI cold-start time per subcommand")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per subcommand (median is reported)")
+    parser.add_argument("--budget-ms", type=float, help="Fail if any subcommand's median wall time exceeds this")
+    args = parser.parse_args()
+
+    results = benchmark(args.runs)
+    over_budget = []
+
+    print(f"{'subcommand':<16}{'wall ms':>10}{'import ms':>12}  heaviest imports")
+    for name, r in results.items():
+        heaviest = ", ".join(f"{mod} {ms:.0f}" for mod, ms in r["heaviest"][:3])
+        print(f"{name:<16}{r['wall_ms']:>10.0f}{r['import_ms']:>12.0f}  {heaviest}")
+        if args.budget_ms is not None and r["wall_ms"] > args.budget_ms:
+            over_budget.append(name)
+
+    if over_budget:
+        print(f"\nOver the {args.budget_ms:.0f} ms budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
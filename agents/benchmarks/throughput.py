@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Offline throughput and latency benchmark.
+
+Starts the mock Messages API from benchmarks/mock_api.py and drives the real
+agents against it at increasing scale. Each scenario and scale runs in a fresh
+subprocess with its own temporary OUTPUT_DIR, so peak RSS is per run and no
+output or schedule state leaks between runs. Reports posts/sec, p50/p95/p99
+request latency, failures and peak RSS.
+
+Scenarios:
+    blog               BlogAgent.generate_post from a thread pool
+    blog-stream        BlogAgent.generate_post_stream from a thread pool
+    linkedin-batch     LinkedInAgent.generate_batch
+    linkedin-variants  LinkedInAgent.generate_variants, five posts per request
+    scheduler          ContentScheduler.execute_pending_tasks over mixed tasks
+    scheduler-batch    ContentScheduler.execute_pending_tasks_batch (run --batch) over
+                       mixed tasks, through the mock's Message Batches endpoints
+
+Usage (from the agents/ directory):
+    python -m benchmarks.throughput
+    python -m benchmarks.throughput --scenarios blog scheduler --scales 10 100 --workers 16
+    python -m benchmarks.throughput --latency lognormal:1.5:0.6 --error-rate 0.05 --json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from benchmarks.mock_api import LatencyModel, MockMessagesServer
+
+
+AGENTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = ["blog", "blog-stream", "linkedin-batch", "linkedin-variants", "scheduler", "scheduler-batch"]
+
+BLOG_TOPICS = ["grid_stability", "renewable_integration", "cost_savings", "technology"]
+
+VARIANTS_PER_CALL = 5
+
+# Seconds between Message Batch status checks in the scheduler-batch scenario
+BATCH_POLL_INTERVAL = 0.1
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def peak_rss_mb() -> float:
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# --- Scenario runners (executed in the child process) ---
+
+def _timed_agents():
+    """Agent subclasses that record the latency of every successful API call."""
+    from blog_agent import BlogAgent
+    from linkedin_agent import LinkedInAgent
+
+    latencies: List[float] = []
+
+    class Timed:
+        def _create_message(self, params):
+            start = time.perf_counter()
+            result = super()._create_message(params)
+            latencies.append(time.perf_counter() - start)
+            return result
+
+    class TimedBlogAgent(Timed, BlogAgent):
+        pass
+
+    class TimedLinkedInAgent(Timed, LinkedInAgent):
+        pass
+
+    return TimedBlogAgent, TimedLinkedInAgent, latencies
+
+
+def run_blog(count: int, workers: int) -> dict:
+    TimedBlogAgent, _, latencies = _timed_agents()
+    agent = TimedBlogAgent()
+
+    def one(i: int) -> bool:
+        try:
+            agent.generate_post(BLOG_TOPICS[i % len(BLOG_TOPICS)])
+            return True
+        except Exception:
+            return False
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        ok = sum(executor.map(one, range(count)))
+    return {"posts": ok, "failed": count - ok, "latencies": latencies}
+
+
+def run_blog_stream(count: int, workers: int) -> dict:
+    from blog_agent import BlogAgent
+
+    agent = BlogAgent()
+    latencies: List[float] = []
+    first_tokens: List[float] = []
+
+    def one(i: int) -> bool:
+        start = time.perf_counter()
+        first = None
+        try:
+            for section, _ in agent.generate_post_stream(BLOG_TOPICS[i % len(BLOG_TOPICS)]):
+                if first is None and section != "post":
+                    first = time.perf_counter() - start
+        except Exception:
+            return False
+        latencies.append(time.perf_counter() - start)
+        if first is not None:
+            first_tokens.append(first)
+        return True
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        ok = sum(executor.map(one, range(count)))
+    return {
+        "posts": ok,
+        "failed": count - ok,
+        "latencies": latencies,
+        "ttft_p50_ms": percentile(first_tokens, 50) * 1000,
+    }
+
+
+def run_linkedin_batch(count: int, workers: int) -> dict:
+    _, TimedLinkedInAgent, latencies = _timed_agents()
+    posts = TimedLinkedInAgent().generate_batch(count=count, workers=workers)
+    return {"posts": len(posts), "failed": count - len(posts), "latencies": latencies}
+
+
+def run_linkedin_variants(count: int, workers: int) -> dict:
+    _, TimedLinkedInAgent, latencies = _timed_agents()
+    agent = TimedLinkedInAgent()
+
+    def one(start: int) -> int:
+        try:
+            n = min(VARIANTS_PER_CALL, count - start)
+            return len(agent.generate_variants(BLOG_TOPICS[start % len(BLOG_TOPICS)], n=n))
+        except Exception:
+            return 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        ok = sum(executor.map(one, range(0, count, VARIANTS_PER_CALL)))
+    return {"posts": ok, "failed": count - ok, "latencies": latencies}
+
+
+def _scheduler_with_tasks(count: int):
+    """A scheduler with timed agents and ``count`` due blog and LinkedIn tasks."""
+    from scheduler import ContentScheduler
+
+    TimedBlogAgent, TimedLinkedInAgent, latencies = _timed_agents()
+    scheduler = ContentScheduler()
+    scheduler.blog_agent = TimedBlogAgent(circuit_breaker=scheduler.circuit_breaker)
+    scheduler.linkedin_agent = TimedLinkedInAgent(circuit_breaker=scheduler.circuit_breaker)
+
+    due = datetime.now() - timedelta(minutes=1)
+    for i in range(count):
+        topic = BLOG_TOPICS[i % len(BLOG_TOPICS)]
+        if i % 2:
+            scheduler.schedule_linkedin_post(topic, scheduled_time=due)
+        else:
+            scheduler.schedule_blog_post(topic, scheduled_time=due)
+    return scheduler, latencies
+
+
+def run_scheduler(count: int, workers: int) -> dict:
+    scheduler, latencies = _scheduler_with_tasks(count)
+    tasks = scheduler.execute_pending_tasks(workers=workers)
+    ok = sum(1 for t in tasks if t.status == "completed")
+    return {"posts": ok, "failed": count - ok, "latencies": latencies}
+
+
+def run_scheduler_batch(count: int, workers: int) -> dict:
+    scheduler, latencies = _scheduler_with_tasks(count)
+    start = time.perf_counter()
+    tasks = scheduler.execute_pending_tasks_batch(poll_interval=BATCH_POLL_INTERVAL)
+    # The batch counts as one request; escalated or truncated results add regular calls
+    latencies.append(time.perf_counter() - start)
+    ok = sum(1 for t in tasks if t.status == "completed")
+    return {"posts": ok, "failed": count - ok, "latencies": latencies}
+
+
+RUNNERS = {
+    "blog": run_blog,
+    "blog-stream": run_blog_stream,
+    "linkedin-batch": run_linkedin_batch,
+    "linkedin-variants": run_linkedin_variants,
+    "scheduler": run_scheduler,
+    "scheduler-batch": run_scheduler_batch,
+}
+
+
+def run_child(scenario: str, count: int, workers: int):
+    """Run one scenario in this process and print its results as JSON."""
+    start = time.perf_counter()
+    result = RUNNERS[scenario](count, workers)
+    elapsed = time.perf_counter() - start
+
+    latencies = result.pop("latencies")
+    result.update({
+        "seconds": elapsed,
+        "posts_per_sec": result["posts"] / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+    })
+    print(json.dumps(result))
+
+
+# --- Driver (parent process) ---
+
+def run_scenario(server: MockMessagesServer, scenario: str, count: int, workers: int, backend: str) -> dict:
+    with tempfile.TemporaryDirectory(prefix="bess-bench-") as output_dir:
+        env = {
+            **os.environ,
+            "ANTHROPIC_API_KEY": "mock",
+            "ANTHROPIC_BASE_URL": server.url,
+            "OUTPUT_DIR": output_dir,
+            "SCHEDULE_BACKEND": backend,
+        }
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.throughput", "--child", scenario,
+             "--count", str(count), "--workers", str(workers)],
+            cwd=AGENTS_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"{scenario} x{count} failed:\n{proc.stderr}")
+    # The agents print progress and errors; the result is the last line
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the agents against a local mock Messages API")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--scales", nargs="+", type=int, default=[10, 50, 200], help="Posts per run")
+    parser.add_argument("--workers", "-w", type=int, default=8, help="Concurrent requests")
+    parser.add_argument("--backend", choices=["journal", "sqlite"], default="journal",
+                        help="Schedule storage backend for the scheduler scenarios")
+    parser.add_argument("--latency", default="lognormal:0.2:0.5",
+                        help="Mock time to first token: fixed:S, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--token-delay", type=float, default=0.0005, help="Mock seconds per output token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of mock requests that fail")
+    parser.add_argument("--output-words", type=int, default=300, help="Body words per mock response")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--count", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.count, args.workers)
+        return
+
+    server = MockMessagesServer(
+        latency=LatencyModel(args.latency),
+        error_rate=args.error_rate,
+        output_words=args.output_words,
+        token_delay=args.token_delay,
+    ).start()
+
+    results: List[Dict] = []
+    try:
+        if not args.json:
+            print(f"{'scenario':<19}{'posts':>7}{'failed':>8}{'posts/s':>9}"
+                  f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'rss MB':>8}")
+        for scenario in args.scenarios:
+            for count in args.scales:
+                r = run_scenario(server, scenario, count, args.workers, args.backend)
+                r.update({"scenario": scenario, "scale": count, "workers": args.workers})
+                results.append(r)
+                if not args.json:
+                    print(f"{scenario:<19}{r['posts']:>7}{r['failed']:>8}{r['posts_per_sec']:>9.1f}"
+                          f"{r['p50_ms']:>9.0f}{r['p95_ms']:>9.0f}{r['p99_ms']:>9.0f}{r['peak_rss_mb']:>8.0f}")
+    finally:
+        server.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"\nMock API: {server.requests} requests, {server.errors} injected errors "
+              f"(latency {args.latency}, error rate {args.error_rate:.0%})")
+
+
+if __name__ == "__main__":
+    main()
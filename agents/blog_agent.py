@@ -2,29 +2,39 @@
 
 import os
 import json
+import time
 from datetime import datetime
-from typing import Optional
-from anthropic import Anthropic
+from typing import Dict, Optional, List, Iterator, Tuple, Any
 
+from base_agent import BaseAgent
+from file_utils import atomic_write, sharded_output_path
+from quality import blog_quality_issues
+from schemas import BlogPostFields
 from config import (
     ANTHROPIC_API_KEY,
-    DEFAULT_MODEL,
     COMPANY_NAME,
     COMPANY_WEBSITE,
     COMPANY_DESCRIPTION,
     TOPICS,
     BLOG_OUTPUT_DIR,
+    MAX_CONTINUATIONS,
 )
+from stream_parser import SectionStreamParser
+from token_budget import blog_max_tokens
 from templates.blog_templates import BLOG_TEMPLATES, SEO_GUIDELINES
 
 
-class BlogAgent:
+# Response sections in the order the generation prompt asks for them
+BLOG_SECTIONS = ["TITLE", "META_DESCRIPTION", "CONTENT", "KEYWORDS"]
+
+
+class BlogAgent(BaseAgent):
     """Agent for generating SEO-optimized blog posts about BESS technology."""
 
-    def __init__(self, model: str = DEFAULT_MODEL):
-        self.client = Anthropic(api_key=ANTHROPIC_API_KEY)
-        self.model = model
-        self.system_prompt = self._build_system_prompt()
+    OUTPUT_SCHEMA = BlogPostFields
+    OUTPUT_TOOL = "save_blog_post"
+    OUTPUT_TOOL_DESCRIPTION = "Save the finished blog post with its SEO metadata."
+    CONTENT_TYPE = "blog"
 
     def _build_system_prompt(self) -> str:
         return f"""You are an expert content writer specializing in Battery Energy Storage Systems (BESS)
@@ -65,7 +75,172 @@ energy storage, grid modernization, and clean energy solutions."""
 
         Returns:
             Dictionary with title, meta_description, content, and metadata
+
+        Raises:
+            DuplicateContentError: If near-duplicate detection is on and the
+                post (and any regenerations) matched a saved post
+        """
+        return self._generate_unique(
+            topic,
+            lambda context: self._generate_once(topic, template_type, title_suggestion, context),
+            additional_context,
+        )
+
+    def _draft(
+        self,
+        topic: str,
+        template_type: str,
+        title_suggestion: Optional[str],
+        additional_context: Optional[str],
+        model: Optional[str] = None,
+    ) -> dict:
+        params = self.build_request(topic, template_type, title_suggestion, additional_context, model)
+        response, call_info = self._create_message(params)
+        return self.parse_message(response, topic, template_type, call_info)
+
+    def quality_issues(self, post: dict, template_type: str) -> List[str]:
+        """Check a post's length and SEO fields against its template (see quality.py)."""
+        return blog_quality_issues(post, BLOG_TEMPLATES[template_type])
+
+    async def agenerate_post(
+        self,
+        topic: str,
+        template_type: str = "educational",
+        title_suggestion: Optional[str] = None,
+        additional_context: Optional[str] = None,
+    ) -> dict:
+        """
+        Generate a complete blog post with the async client.
+
+        Takes the same arguments and returns the same dictionary as generate_post.
         """
+        async def generate(context: Optional[str]) -> dict:
+            async def draft(model: str) -> dict:
+                params = self.build_request(topic, template_type, title_suggestion, context, model)
+                response, call_info = await self._acreate_message(params)
+                return self.parse_message(response, topic, template_type, call_info)
+
+            return await self._agenerate_routed(template_type, draft)
+
+        return await self._agenerate_unique(topic, generate, additional_context)
+
+    def generate_post_stream(
+        self,
+        topic: str,
+        template_type: str = "educational",
+        title_suggestion: Optional[str] = None,
+        additional_context: Optional[str] = None,
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Generate a blog post, yielding sections as the response streams in.
+
+        Takes the same arguments as generate_post.
+
+        Yields:
+            ("title" | "meta_description" | "content" | "keywords", text) chunks
+            as they arrive, then a final ("post", dict) with the parsed post.
+            In structured mode the tool call is only valid once complete, so
+            each section is yielded whole after the response arrives.
+
+        Streamed text cannot be taken back once shown, so text-mode streams
+        skip model routing and always use the agent's model. Structured mode
+        shows nothing until the post is complete, so it is generated (and
+        routed) as by generate_post.
+        """
+        if self.structured:
+            post = self.generate_post(topic, template_type, title_suggestion, additional_context)
+            for section in BLOG_SECTIONS:
+                value = post[section.lower()]
+                yield section.lower(), ", ".join(value) if isinstance(value, list) else value
+            yield "post", post
+            return
+
+        params = self.build_request(topic, template_type, title_suggestion, additional_context)
+        parser = SectionStreamParser(BLOG_SECTIONS)
+
+        start = time.perf_counter()
+        message = self._cached_response(params)
+        if message is not None:
+            call_info = self._cache_hit_info(start, params)
+            yield from parser.feed(message.content[0].text)
+            yield from parser.close()
+            yield "post", self.parse_message(message, topic, template_type, call_info, parser.sections)
+            return
+
+        ttft_ms = None
+        with self._stream_message(params) as stream:
+            for text in stream.text_stream:
+                if ttft_ms is None:
+                    ttft_ms = self._elapsed_ms(start)
+                yield from parser.feed(text)
+            message = stream.get_final_message()
+
+        # Keep streaming from where a truncated response stopped
+        continuations = 0
+        while self._can_continue(message) and continuations < MAX_CONTINUATIONS:
+            text = self._message_text(message)
+            continuation_params = self._continuation_params(params, text)
+            with self._stream_message(continuation_params) as stream:
+                for chunk in stream.text_stream:
+                    yield from parser.feed(chunk)
+                continuation = stream.get_final_message()
+            message = self._merge_continuation(message, text, continuation)
+            continuations += 1
+        yield from parser.close()
+
+        self._cache_response(params, message)
+        call_info = {
+            "model": params["model"],
+            "cache_hit": False,
+            "continuations": continuations,
+            "wall_time_ms": self._elapsed_ms(start),
+            "ttft_ms": ttft_ms,
+        }
+        yield "post", self.parse_message(message, topic, template_type, call_info, parser.sections)
+
+    def build_request(
+        self,
+        topic: str,
+        template_type: str = "educational",
+        title_suggestion: Optional[str] = None,
+        additional_context: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> dict:
+        """Build the messages.create parameters for a post without sending them (to `model`, if given)."""
+        content = self._prepare_prompt(topic, template_type, title_suggestion, additional_context)
+        return self._request_params(content, max_tokens=blog_max_tokens(BLOG_TEMPLATES[template_type]), model=model)
+
+    def parse_message(
+        self,
+        message,
+        topic: str,
+        template_type: str,
+        call_info: Optional[dict] = None,
+        sections: Optional[Dict[str, str]] = None,
+    ) -> dict:
+        """
+        Turn an API response message into a structured post with usage, cost and timing.
+
+        A streamed response passes the sections its SectionStreamParser
+        already split, so the post matches the streamed section events.
+        """
+        if self.structured:
+            post = self._build_post(self._structured_fields(message), topic, template_type)
+        elif sections is not None:
+            post = self._sections_post(sections, topic, template_type)
+        else:
+            post = self._parse_response(message.content[0].text, topic, template_type)
+        post["metadata"].update(self._call_metadata(message, call_info))
+        return post
+
+    def _prepare_prompt(
+        self,
+        topic: str,
+        template_type: str,
+        title_suggestion: Optional[str],
+        additional_context: Optional[str],
+    ) -> List[dict]:
+        """Validate the topic and template, then build the generation prompt."""
         if topic not in TOPICS:
             raise ValueError(f"Unknown topic: {topic}. Available: {list(TOPICS.keys())}")
 
@@ -75,39 +250,39 @@ energy storage, grid modernization, and clean energy solutions."""
         topic_info = TOPICS[topic]
         template = BLOG_TEMPLATES[template_type]
 
-        prompt = self._build_generation_prompt(
+        return self._build_generation_prompt(
             topic_info, template, title_suggestion, additional_context
         )
 
-        response = self.client.messages.create(
-            model=self.model,
-            max_tokens=4096,
-            system=self.system_prompt,
-            messages=[{"role": "user", "content": prompt}],
-        )
-
-        content = response.content[0].text
-        return self._parse_response(content, topic, template_type)
-
     def _build_generation_prompt(
         self,
         topic_info: dict,
         template: dict,
         title_suggestion: Optional[str],
         additional_context: Optional[str],
-    ) -> str:
-        prompt = f"""Write a comprehensive blog post about {topic_info['name']}.
-
-Topic Description: {topic_info['description']}
-
-Relevant Keywords to Incorporate: {', '.join(topic_info['keywords'])}
+    ) -> List[dict]:
+        """
+        Build the user message as content blocks.
 
-Content Template: {template['name']}
+        The template block is identical for every post of a template type, so it
+        comes first and carries a cache breakpoint. The topic-specific request
+        follows it uncached.
+        """
+        template_block = f"""Content Template: {template['name']}
 Target Word Count: {template['word_count']}
 Desired Tone: {template['tone']}
 
 Structure to Follow:
 {template['structure']}
+
+{self._output_instructions()}
+"""
+
+        prompt = f"""Write a comprehensive blog post about {topic_info['name']}.
+
+Topic Description: {topic_info['description']}
+
+Relevant Keywords to Incorporate: {', '.join(topic_info['keywords'])}
 """
 
         if title_suggestion:
@@ -116,8 +291,15 @@ Structure to Follow:
         if additional_context:
             prompt += f"\nAdditional Requirements:\n{additional_context}\n"
 
-        prompt += """
-Please provide the response in the following format:
+        return [
+            self._text_block(template_block, cache=True),
+            self._text_block(prompt),
+        ]
+
+    def _output_instructions(self) -> str:
+        if self.structured:
+            return f"Return the finished post by calling the {self.OUTPUT_TOOL} tool."
+        return """Please provide the response in the following format:
 
 TITLE: [SEO-optimized title under 60 characters]
 
@@ -126,39 +308,25 @@ META_DESCRIPTION: [Compelling meta description, 150-160 characters]
 CONTENT:
 [Full blog post content with proper markdown formatting]
 
-KEYWORDS: [Comma-separated list of 5-7 target keywords]
-"""
-        return prompt
+KEYWORDS: [Comma-separated list of 5-7 target keywords]"""
 
     def _parse_response(self, response: str, topic: str, template_type: str) -> dict:
         """Parse the AI response into structured output."""
-        sections = {}
-
-        # Parse title
-        if "TITLE:" in response:
-            title_start = response.find("TITLE:") + 6
-            title_end = response.find("\n", title_start)
-            sections["title"] = response[title_start:title_end].strip()
-
-        # Parse meta description
-        if "META_DESCRIPTION:" in response:
-            meta_start = response.find("META_DESCRIPTION:") + 17
-            meta_end = response.find("\n", meta_start)
-            sections["meta_description"] = response[meta_start:meta_end].strip()
-
-        # Parse content
-        if "CONTENT:" in response:
-            content_start = response.find("CONTENT:") + 8
-            content_end = response.find("KEYWORDS:", content_start) if "KEYWORDS:" in response else len(response)
-            sections["content"] = response[content_start:content_end].strip()
-
-        # Parse keywords
-        if "KEYWORDS:" in response:
-            keywords_start = response.find("KEYWORDS:") + 9
-            keywords_text = response[keywords_start:].strip()
-            sections["keywords"] = [k.strip() for k in keywords_text.split(",")]
-
-        # Add metadata
+        # The same parser as streamed responses, so both split sections identically
+        parser = SectionStreamParser(BLOG_SECTIONS)
+        parser.feed(response)
+        parser.close()
+        return self._sections_post(parser.sections, topic, template_type)
+
+    def _sections_post(self, sections: Dict[str, str], topic: str, template_type: str) -> dict:
+        """Build a post from the marker sections SectionStreamParser split off."""
+        fields = {marker.lower(): text.strip() for marker, text in sections.items()}
+        if "keywords" in fields:
+            fields["keywords"] = [k.strip() for k in fields["keywords"].split(",")]
+        return self._build_post(fields, topic, template_type)
+
+    def _build_post(self, sections: dict, topic: str, template_type: str) -> dict:
+        """Add the post metadata to the parsed sections."""
         sections["metadata"] = {
             "topic": topic,
             "template_type": template_type,
@@ -170,30 +338,33 @@ KEYWORDS: [Comma-separated list of 5-7 target keywords]
         return sections
 
     def save_post(self, post: dict, filename: Optional[str] = None) -> str:
-        """Save the generated post to a file."""
-        os.makedirs(BLOG_OUTPUT_DIR, exist_ok=True)
-
-        if not filename:
-            slug = post.get("title", "untitled").lower()
-            slug = "".join(c if c.isalnum() or c == " " else "" for c in slug)
-            slug = slug.replace(" ", "-")[:50]
-            date_str = datetime.now().strftime("%Y-%m-%d")
-            filename = f"{date_str}-{slug}"
-
-        # Save markdown content
-        md_path = os.path.join(BLOG_OUTPUT_DIR, f"{filename}.md")
-        with open(md_path, "w") as f:
-            f.write(f"# {post.get('title', 'Untitled')}\n\n")
-            f.write(f"*{post.get('meta_description', '')}*\n\n")
-            f.write("---\n\n")
-            f.write(post.get("content", ""))
-
-        # Save metadata as JSON
-        json_path = os.path.join(BLOG_OUTPUT_DIR, f"{filename}.json")
-        with open(json_path, "w") as f:
-            json.dump(post, f, indent=2)
-
-        return md_path
+        """
+        Save the generated post as a markdown file plus a JSON metadata file.
+
+        Files go under BLOG_OUTPUT_DIR/YYYY/MM/<topic>/ with a content-hashed
+        name (see sharded_output_path), or at BLOG_OUTPUT_DIR/<filename> when
+        a filename is given. Both files are written atomically, JSON first, so
+        a reader that finds the .md file always finds its complete .json too.
+
+        Returns:
+            Path of the markdown file
+        """
+        markdown = (
+            f"# {post.get('title', 'Untitled')}\n\n"
+            f"*{post.get('meta_description', '')}*\n\n"
+            "---\n\n"
+            f"{post.get('content', '')}"
+        )
+
+        if filename:
+            path = os.path.join(BLOG_OUTPUT_DIR, filename)
+        else:
+            path = sharded_output_path(BLOG_OUTPUT_DIR, post, post.get("title", "untitled"), markdown)
+
+        atomic_write(f"{path}.json", json.dumps(post, indent=2))
+        atomic_write(f"{path}.md", markdown)
+        self._index_saved(post, f"{path}.md")
+        return f"{path}.md"
 
 
 def main():
@@ -0,0 +1,142 @@
+"""Process-wide registry of pooled Anthropic clients."""
+
+import importlib
+import threading
+from typing import Dict, Optional
+
+from anthropic import Anthropic, AsyncAnthropic, DefaultAsyncHttpxClient, DefaultHttpxClient
+
+from config import (
+    ANTHROPIC_API_KEY,
+    ANTHROPIC_BASE_URL,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+)
+
+# The HTTP library the SDK is built on (httpx in older releases, httpx2 in
+# newer ones). The SDK rejects limits, timeouts and transports from the other.
+httpx = importlib.import_module(DefaultHttpxClient.__mro__[1].__module__.partition(".")[0])
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class ClientSettings:
+    """Connection pool, timeout and transport settings shared by all clients."""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = ANTHROPIC_API_KEY,
+        base_url: Optional[str] = ANTHROPIC_BASE_URL,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        max_keepalive: int = HTTP_MAX_KEEPALIVE,
+        keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = HTTP_READ_TIMEOUT,
+        http2: bool = HTTP2_AVAILABLE,
+        transport: Optional[httpx.BaseTransport] = None,
+        async_transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.http2 = http2
+        self.transport = transport
+        self.async_transport = async_transport
+
+    def http_kwargs(self, transport=None) -> dict:
+        """
+        Keyword arguments for the SDK's DefaultHttpxClient/DefaultAsyncHttpxClient.
+
+        `transport` is only passed when set: without one the SDK builds its
+        own, with TCP keep-alive probes and the environment's proxies.
+        """
+        kwargs = {
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            "timeout": httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            "http2": self.http2,
+        }
+        if transport is not None:
+            kwargs["transport"] = transport
+        return kwargs
+
+
+_settings = ClientSettings()
+_clients: Dict[str, object] = {}
+_lock = threading.Lock()
+
+
+def configure(**kwargs):
+    """
+    Replace the client settings and drop cached clients.
+
+    Accepts the keyword arguments of ClientSettings. Passing `transport` (e.g.
+    client.httpx.MockTransport, from the SDK's HTTP library) routes every
+    request to a fake for tests and benchmarks.
+    """
+    global _settings
+    with _lock:
+        _settings = ClientSettings(**kwargs)
+        _clients.clear()
+
+
+def get_settings() -> ClientSettings:
+    return _settings
+
+
+def get_client() -> Anthropic:
+    """
+    Get the shared sync client.
+
+    The client and its connection pool are shared by every agent in the
+    process, so bursts of generation reuse warm keep-alive connections instead
+    of paying a TLS handshake per agent. Retries are left to resilience.py.
+    """
+    with _lock:
+        client = _clients.get("sync")
+        if client is None:
+            http_client = DefaultHttpxClient(**_settings.http_kwargs(_settings.transport))
+            client = Anthropic(
+                api_key=_settings.api_key,
+                base_url=_settings.base_url,
+                max_retries=0,
+                http_client=http_client,
+            )
+            _clients["sync"] = client
+        return client
+
+
+def get_async_client() -> AsyncAnthropic:
+    """
+    Get the shared async client.
+
+    Async connection pools are bound to the event loop that first uses them,
+    so a process that runs several loops one after another should call
+    configure() between them.
+    """
+    with _lock:
+        client = _clients.get("async")
+        if client is None:
+            http_client = DefaultAsyncHttpxClient(**_settings.http_kwargs(_settings.async_transport))
+            client = AsyncAnthropic(
+                api_key=_settings.api_key,
+                base_url=_settings.base_url,
+                max_retries=0,
+                http_client=http_client,
+            )
+            _clients["async"] = client
+        return client
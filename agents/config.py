@@ -8,6 +8,24 @@ load_dotenv()
 # API Configuration
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "claude-sonnet-4-20250514")
+# Tiered routing (opt-in): posts matching FAST_MODEL_ROUTES ("linkedin" or
+# "linkedin:question", comma-separated; empty, the default, disables) are drafted
+# with FAST_MODEL, and the draft is regenerated with DEFAULT_MODEL only if it fails
+# the local quality checks
+FAST_MODEL = os.getenv("FAST_MODEL", "claude-haiku-4-5")
+FAST_MODEL_ROUTES = {
+    route.strip()
+    for route in os.getenv("FAST_MODEL_ROUTES", "").split(",")
+    if route.strip()
+}
+ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL") or None
+
+# HTTP Connection Pool (shared by all agents in a process)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "600"))
 
 # Company Information
 COMPANY_NAME = os.getenv("COMPANY_NAME", "PowerGrid BESS")
@@ -75,6 +93,61 @@ TOPICS = {
 }
 
 # Output Directories
-OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "output")
+OUTPUT_DIR = os.getenv("OUTPUT_DIR", os.path.join(os.path.dirname(__file__), "output"))
 BLOG_OUTPUT_DIR = os.path.join(OUTPUT_DIR, "blog")
 LINKEDIN_OUTPUT_DIR = os.path.join(OUTPUT_DIR, "linkedin")
+
+# Return posts through a schema-validated tool call instead of marker-delimited text
+STRUCTURED_OUTPUT = os.getenv("STRUCTURED_OUTPUT", "false").lower() in ("1", "true", "yes")
+
+# Times a response that hits max_tokens is continued before it is accepted as-is
+MAX_CONTINUATIONS = int(os.getenv("MAX_CONTINUATIONS", "2"))
+
+# Retry and Circuit Breaker
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "5"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "1.0"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "60.0"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_COOLDOWN = float(os.getenv("CIRCUIT_COOLDOWN", "120.0"))
+
+# Times a scheduled task is re-queued after transient API failures before it is marked failed
+MAX_TASK_ATTEMPTS = int(os.getenv("MAX_TASK_ATTEMPTS", "3"))
+TASK_REQUEUE_DELAY = float(os.getenv("TASK_REQUEUE_DELAY", "300"))
+
+# Seconds a worker holds a claimed task before others may reclaim it; renewed
+# every third of this while the task runs
+LEASE_DURATION = float(os.getenv("LEASE_DURATION", "180"))
+
+# Schedule storage backend: "journal" (JSON snapshot + journal) or "sqlite"
+SCHEDULE_BACKEND = os.getenv("SCHEDULE_BACKEND", "journal")
+
+# Seconds between the daemon's checks of the schedule store for changes made by
+# other processes (tasks scheduled from other hosts, or without a wake-up
+# notification). 0, the default, turns polling off so an idle daemon stays
+# asleep; such changes are then picked up on the next `run --interval` rescan
+SCHEDULE_POLL_INTERVAL = float(os.getenv("SCHEDULE_POLL_INTERVAL", "0"))
+
+# Account-wide API limits shared by every process through a SQLite token bucket
+# (unset or 0 disables a limit)
+RATE_LIMIT_RPM = int(os.getenv("RATE_LIMIT_RPM", "0"))
+RATE_LIMIT_ITPM = int(os.getenv("RATE_LIMIT_ITPM", "0"))
+RATE_LIMIT_OTPM = int(os.getenv("RATE_LIMIT_OTPM", "0"))
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", os.path.join(OUTPUT_DIR, "ratelimit.db"))
+
+# Response Cache
+RESPONSE_CACHE_DIR = os.path.join(OUTPUT_DIR, ".cache", "responses")
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "500"))
+
+# Near-duplicate detection against saved posts: "off", "reject" (fail the
+# generation) or "regenerate" (retry with the match added to the avoid hints)
+DEDUP_MODE = os.getenv("DEDUP_MODE", "off").lower()
+# Estimated Jaccard similarity of 3-word shingles at which a post counts as a duplicate
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.5"))
+DEDUP_MAX_REGENERATIONS = int(os.getenv("DEDUP_MAX_REGENERATIONS", "2"))
+# Recent titles/hooks on the same topic passed to the prompt as things to avoid
+DEDUP_AVOID_HINTS = int(os.getenv("DEDUP_AVOID_HINTS", "10"))
+DEDUP_DB = os.getenv("DEDUP_DB", os.path.join(OUTPUT_DIR, "dedup.db"))
+
+# Prometheus text-format metrics written by the scheduler (for node_exporter's textfile collector)
+METRICS_FILE = os.getenv("METRICS_FILE", os.path.join(OUTPUT_DIR, "metrics.prom"))
@@ -0,0 +1,323 @@
+"""Near-duplicate detection over generated posts with MinHash and locality-sensitive hashing."""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from array import array
+from dataclasses import dataclass
+from datetime import datetime
+from hashlib import blake2b
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import (
+    BLOG_OUTPUT_DIR,
+    DEDUP_DB,
+    DEDUP_MODE,
+    DEDUP_THRESHOLD,
+    LINKEDIN_OUTPUT_DIR,
+)
+
+
+# Consecutive words per shingle: long enough that common phrases do not make
+# unrelated posts look alike, short enough to survive light rewording
+SHINGLE_WORDS = 3
+
+# Signature length, split into BANDS bands of NUM_PERM // BANDS rows. Posts
+# become candidates when any band matches exactly, which happens with
+# probability 1 - (1 - s^4)^32 for similarity s: ~50% at s=0.4, ~97% at 0.6
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+
+# Shingle hashes are 64-bit; the low bits pick a bin and the rest are the value
+_BIN_RANGE = (1 << 64) // NUM_PERM
+
+# Trailing lines of nothing but hashtags, like the randomly chosen ones
+# LinkedInAgent appends, which would make identical bodies look different
+TRAILING_HASHTAGS = re.compile(r"(?:\n[ \t]*(?:#\w+[ \t]*)+)+\s*$")
+
+# Bumped when what goes into a signature changes; an index signed by an older
+# version is emptied on open and refilled from the saved posts
+SIGNATURE_VERSION = 2
+
+# Where each content type is saved, and the extension of its primary file
+OUTPUT_DIRS = {
+    "blog": (BLOG_OUTPUT_DIR, ".md"),
+    "linkedin": (LINKEDIN_OUTPUT_DIR, ".txt"),
+}
+
+
+def post_fields(post: dict) -> Tuple[str, str]:
+    """Get the headline (blog title or LinkedIn hook) and body of a post, without trailing hashtags."""
+    headline = post.get("title") or post.get("hook") or ""
+    return headline, TRAILING_HASHTAGS.sub("", post.get("content", ""))
+
+
+def minhash(text: str) -> List[int]:
+    """
+    MinHash signature of the word shingles of `text`.
+
+    Uses one-permutation hashing: each shingle is hashed once and only the
+    minimum per bin is kept, so a signature costs one hash per shingle rather
+    than NUM_PERM. Empty bins borrow the value of the next filled bin, offset
+    by the distance (rotation densification), which keeps the fraction of
+    equal bins an estimate of Jaccard similarity for short posts too.
+
+    Returns:
+        NUM_PERM values, or an empty list for text without words
+    """
+    words = re.findall(r"[a-z0-9']+", text.lower())
+    grams = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    grams.discard("")
+    if not grams:
+        return []
+
+    bins: List[Optional[int]] = [None] * NUM_PERM
+    for gram in grams:
+        value, index = divmod(int.from_bytes(blake2b(gram.encode("utf-8"), digest_size=8).digest(), "big"), NUM_PERM)
+        if bins[index] is None or value < bins[index]:
+            bins[index] = value
+
+    signature = []
+    for index in range(NUM_PERM):
+        distance = 0
+        while bins[(index + distance) % NUM_PERM] is None:
+            distance += 1
+        signature.append(bins[(index + distance) % NUM_PERM] + distance * _BIN_RANGE)
+    return signature
+
+
+def similarity(a: List[int], b: List[int]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def _band_keys(signature: List[int]) -> List[Tuple[int, int]]:
+    keys = []
+    for band in range(BANDS):
+        rows = array("Q", signature[band * ROWS:(band + 1) * ROWS]).tobytes()
+        keys.append((band, int.from_bytes(blake2b(rows, digest_size=8).digest(), "big", signed=True)))
+    return keys
+
+
+@dataclass
+class DuplicateMatch:
+    """A stored post that a new post is too similar to."""
+
+    path: str
+    headline: str
+    similarity: float
+
+
+class DuplicateContentError(Exception):
+    """Raised when a generated post is a near-duplicate of one already saved."""
+
+    def __init__(self, match: DuplicateMatch):
+        self.match = match
+        super().__init__(f"Near-duplicate of {match.path} (similarity {match.similarity:.2f})")
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index over saved posts, shared by every process that opens
+    the same SQLite file.
+
+    Each post is reduced to a fixed-size MinHash signature of its word
+    shingles. The signature is split into bands and every band is hashed
+    into an indexed bucket, so a lookup fetches only the posts sharing a
+    bucket with the new one and compares their signatures, whatever the size
+    of the index. Posts are compared only with others of the same content
+    type.
+
+    Args:
+        db_path: SQLite file holding the index
+        threshold: Estimated Jaccard similarity at or above which two posts
+            count as duplicates
+    """
+
+    def __init__(self, db_path: str, threshold: float = DEDUP_THRESHOLD):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            db_path, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS posts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                headline TEXT NOT NULL,
+                path TEXT NOT NULL UNIQUE,
+                indexed_at TEXT NOT NULL,
+                signature BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_posts_kind_topic ON posts (kind, topic, id);
+            CREATE TABLE IF NOT EXISTS bands (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                post_id INTEGER NOT NULL,
+                PRIMARY KEY (band, bucket, post_id)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._conn.execute("BEGIN IMMEDIATE")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < SIGNATURE_VERSION:
+            self._conn.execute("DELETE FROM bands")
+            self._conn.execute("DELETE FROM posts")
+            self._conn.execute(f"PRAGMA user_version = {SIGNATURE_VERSION}")
+        self._conn.execute("COMMIT")
+
+    def _insert(self, kind: str, post: dict, path: str, signature: List[int]):
+        headline, _ = post_fields(post)
+        cursor = self._conn.execute(
+            """
+            INSERT OR IGNORE INTO posts (kind, topic, headline, path, indexed_at, signature)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (kind, post.get("metadata", {}).get("topic", ""), headline, path,
+             datetime.now().isoformat(), array("Q", signature).tobytes()),
+        )
+        if cursor.rowcount:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO bands (band, bucket, post_id) VALUES (?, ?, ?)",
+                [(band, bucket, cursor.lastrowid) for band, bucket in _band_keys(signature)],
+            )
+
+    def add(self, kind: str, post: dict, path: str):
+        """Index a saved post. Saving the same path again is a no-op."""
+        signature = minhash(post_fields(post)[1])
+        if not signature:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._insert(kind, post, path, signature)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def find_similar(self, kind: str, post: dict) -> Optional[DuplicateMatch]:
+        """
+        Find the saved post most similar to `post`, if any reaches the threshold.
+
+        Posts whose files have since been deleted are ignored.
+        """
+        signature = minhash(post_fields(post)[1])
+        if not signature:
+            return None
+
+        keys = _band_keys(signature)
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                WITH keys (band, bucket) AS (VALUES {",".join(["(?, ?)"] * len(keys))})
+                SELECT path, headline, signature FROM posts
+                WHERE id IN (SELECT post_id FROM keys JOIN bands USING (band, bucket))
+                  AND kind = ?
+                """,
+                (*[value for key in keys for value in key], kind),
+            ).fetchall()
+
+        best: Optional[DuplicateMatch] = None
+        for path, headline, blob in rows:
+            score = similarity(signature, array("Q", blob).tolist())
+            if score >= self.threshold and (best is None or score > best.similarity) and os.path.exists(path):
+                best = DuplicateMatch(path, headline, score)
+        return best
+
+    def recent_headlines(self, kind: str, topic: str, limit: int = 10) -> List[str]:
+        """Get the titles or hooks of the latest saved posts on a topic, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT headline FROM posts
+                WHERE kind = ? AND topic = ? AND headline != ''
+                ORDER BY id DESC LIMIT ?
+                """,
+                (kind, topic, limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def backfill(self, output_dirs: Dict[str, Tuple[str, str]] = OUTPUT_DIRS) -> int:
+        """
+        Index posts already saved under the output directories, from their
+        .json files. Already indexed posts are skipped.
+
+        Args:
+            output_dirs: Content type to (directory, primary file extension)
+
+        Returns:
+            Number of posts newly indexed
+        """
+        entries = []
+        for kind, (directory, extension) in output_dirs.items():
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    if not name.endswith(".json"):
+                        continue
+                    json_path = os.path.join(root, name)
+                    path = json_path[:-len(".json")] + extension
+                    try:
+                        with open(json_path, "r") as f:
+                            post = json.load(f)
+                    except (OSError, ValueError):
+                        continue
+                    signature = minhash(post_fields(post)[1]) if os.path.exists(path) else []
+                    if signature:
+                        entries.append((kind, post, path, signature))
+
+        with self._lock:
+            before = self._conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for entry in entries:
+                    self._insert(*entry)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return self._conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0] - before
+
+
+def avoid_hint(headlines: Iterable[str]) -> str:
+    """Prompt text asking the model not to repeat earlier posts."""
+    listed = "\n".join(f"- {headline}" for headline in headlines)
+    return (
+        "Recent posts on this topic already used the titles/hooks below. Take a "
+        "different angle and do not reuse or closely paraphrase them:\n" + listed
+    )
+
+
+_shared_index: Optional[NearDuplicateIndex] = None
+_shared_lock = threading.Lock()
+
+
+def shared_duplicate_index() -> Optional[NearDuplicateIndex]:
+    """
+    Get the process-wide index at DEDUP_DB, or None when DEDUP_MODE is "off".
+
+    A new, empty index is first filled from the posts already on disk.
+    """
+    global _shared_index
+    if DEDUP_MODE == "off":
+        return None
+    if DEDUP_MODE not in ("reject", "regenerate"):
+        raise ValueError(f"Unknown DEDUP_MODE: {DEDUP_MODE}. Available: ['off', 'reject', 'regenerate']")
+    with _shared_lock:
+        if _shared_index is None:
+            _shared_index = NearDuplicateIndex(DEDUP_DB)
+            if not _shared_index.count():
+                _shared_index.backfill()
+        return _shared_index
@@ -0,0 +1,116 @@
+"""Filesystem helpers shared by the agents and scheduler."""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+def atomic_write(path: str, data: str):
+    """
+    Write text to a file so readers see either the old or the new contents.
+
+    The data is written to a temp file in the same directory, flushed to disk
+    and renamed over the target, which is atomic on POSIX and Windows.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Hold an exclusive advisory lock on `path` (created if missing) across processes.
+
+    Uses POSIX record locks, which also work on NFS mounts shared between
+    hosts. The locks belong to the process, so they do not exclude other
+    threads of the same process: callers pair this with a threading lock.
+    Where fcntl is unavailable the lock is a no-op and only single-host,
+    single-process use is safe.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.lockf(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.lockf(f, fcntl.LOCK_UN)
+
+
+def slugify(text: str, max_length: int = 50) -> str:
+    """Lowercase `text` to hyphen-separated alphanumeric words, cut to `max_length`."""
+    words = re.sub(r"[^a-z0-9]+", " ", text.lower()).split()
+    return "-".join(words)[:max_length].strip("-") or "untitled"
+
+
+def sharded_output_path(base_dir: str, post: dict, name: str, body: str) -> str:
+    """
+    Build the path, without extension, for a post's output files.
+
+    Posts are sharded into base_dir/YYYY/MM/<topic>/ by their generation date
+    and topic, so no single directory grows without bound. The file name is
+    the date, `name` and a short hash of `body`: posts with different content
+    never collide, and saving the same content again rewrites the same files.
+
+    Args:
+        base_dir: Output directory for the content type
+        post: Generated post, with "topic" and "generated_at" in its metadata
+        name: Human-readable part of the file name (slugified here)
+        body: Primary file contents, hashed into the name
+
+    Returns:
+        Path of the form base_dir/YYYY/MM/topic/YYYY-MM-DD-name-hash
+    """
+    metadata = post.get("metadata", {})
+    try:
+        generated_at = datetime.fromisoformat(metadata["generated_at"])
+    except (KeyError, TypeError, ValueError):
+        generated_at = datetime.now()
+
+    digest = hashlib.sha256(body.encode("utf-8")).hexdigest()[:10]
+    directory = os.path.join(
+        base_dir,
+        generated_at.strftime("%Y"),
+        generated_at.strftime("%m"),
+        slugify(metadata.get("topic") or "general"),
+    )
+    return os.path.join(directory, f"{generated_at.strftime('%Y-%m-%d')}-{slugify(name)}-{digest}")
+
+
+
+def read_post(path: str) -> dict:
+    """
+    Load a saved post from the .json file written next to it by save_post.
+
+    Args:
+        path: Path of any of the post's output files (.md, .txt or .json)
+
+    Returns:
+        The post dictionary, with content and metadata
+    """
+    with open(os.path.splitext(path)[0] + ".json", "r") as f:
+        return json.load(f)
@@ -1,15 +1,24 @@
 """LinkedIn post generation agent using Anthropic API."""
 
+import asyncio
 import os
 import json
 import random
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, List
-from anthropic import Anthropic
-
+from typing import Optional, List, Iterator, Union
+
+from base_agent import BaseAgent
+from dedup import DuplicateContentError, minhash, post_fields, similarity
+from file_utils import atomic_write, read_post, sharded_output_path
+from quality import linkedin_quality_issues
+from resilience import CircuitOpenError
+from schemas import LinkedInPostFields, LinkedInVariantsFields, tool_definition
+from token_budget import linkedin_max_tokens
 from config import (
     ANTHROPIC_API_KEY,
-    DEFAULT_MODEL,
     COMPANY_NAME,
     COMPANY_WEBSITE,
     COMPANY_DESCRIPTION,
@@ -23,13 +32,37 @@ from templates.linkedin_templates import (
 )
 
 
-class LinkedInAgent:
+# Line the model writes before each post of a multi-variant response
+VARIANT_HEADER = re.compile(r"^\s*=+\s*VARIANT\s+\d+\s*=+\s*$", re.MULTILINE | re.IGNORECASE)
+
+
+def _split_usage(usage: dict, parts: int) -> List[dict]:
+    """Divide token counts between `parts` posts, any remainder going to the first ones."""
+    return [
+        {kind: count // parts + (i < count % parts) for kind, count in usage.items()}
+        for i in range(parts)
+    ]
+
+
+@dataclass
+class BatchError:
+    """A post in a batch that failed to generate."""
+    index: int
+    topic: str
+    template_type: str
+    error: Exception
+
+
+class LinkedInAgent(BaseAgent):
     """Agent for generating engaging LinkedIn posts about BESS technology."""
 
-    def __init__(self, model: str = DEFAULT_MODEL):
-        self.client = Anthropic(api_key=ANTHROPIC_API_KEY)
-        self.model = model
-        self.system_prompt = self._build_system_prompt()
+    OUTPUT_SCHEMA = LinkedInPostFields
+    OUTPUT_TOOL = "save_linkedin_post"
+    OUTPUT_TOOL_DESCRIPTION = "Save the finished LinkedIn post with its hook and call to action."
+    CONTENT_TYPE = "linkedin"
+
+    VARIANTS_TOOL = "save_linkedin_variants"
+    VARIANTS_TOOL_DESCRIPTION = "Save all the finished LinkedIn post variants, each with its hook and call to action."
 
     def _build_system_prompt(self) -> str:
         return f"""You are a LinkedIn content strategist and writer for {COMPANY_NAME},
@@ -72,7 +105,349 @@ as an industry authority in energy storage and clean energy solutions."""
 
         Returns:
             Dictionary with post content and metadata
+
+        Raises:
+            DuplicateContentError: If near-duplicate detection is on and the
+                post (and any regenerations) matched a saved post
+        """
+        return self._generate_unique(
+            topic,
+            lambda context: self._generate_once(
+                topic, template_type, hook_suggestion, context, include_hashtags=include_hashtags
+            ),
+            additional_context,
+        )
+
+    def _draft(
+        self,
+        topic: str,
+        template_type: str,
+        hook_suggestion: Optional[str],
+        additional_context: Optional[str],
+        model: Optional[str] = None,
+        include_hashtags: bool = True,
+    ) -> dict:
+        params = self.build_request(topic, template_type, hook_suggestion, additional_context, model)
+        response, call_info = self._create_message(params)
+        return self.parse_message(response, topic, template_type, include_hashtags, call_info)
+
+    def quality_issues(self, post: dict, template_type: str) -> List[str]:
+        """Check a post's length, hook and call to action against its template (see quality.py)."""
+        return linkedin_quality_issues(post, LINKEDIN_TEMPLATES[template_type])
+
+    async def agenerate_post(
+        self,
+        topic: str,
+        template_type: str = "insight",
+        hook_suggestion: Optional[str] = None,
+        additional_context: Optional[str] = None,
+        include_hashtags: bool = True,
+    ) -> dict:
+        """
+        Generate a LinkedIn post with the async client.
+
+        Takes the same arguments and returns the same dictionary as generate_post.
         """
+        async def generate(context: Optional[str]) -> dict:
+            async def draft(model: str) -> dict:
+                params = self.build_request(topic, template_type, hook_suggestion, context, model)
+                response, call_info = await self._acreate_message(params)
+                return self.parse_message(response, topic, template_type, include_hashtags, call_info)
+
+            return await self._agenerate_routed(template_type, draft)
+
+        return await self._agenerate_unique(topic, generate, additional_context)
+
+    def generate_variants(
+        self,
+        topic: str,
+        template_type: str = "insight",
+        n: int = 3,
+        additional_context: Optional[str] = None,
+        include_hashtags: bool = True,
+    ) -> List[dict]:
+        """
+        Generate several distinct LinkedIn posts on one topic in a single request.
+
+        The system prompt, best practices and template are sent once for all
+        the variants instead of once per post, and they share one round trip.
+
+        Args:
+            topic: Topic key from TOPICS config
+            template_type: Template type from LINKEDIN_TEMPLATES
+            n: Number of variants to ask for
+            additional_context: Additional context or requirements
+            include_hashtags: Whether to include hashtag suggestions
+
+        Returns:
+            One post dictionary per variant (see parse_variants). With
+            near-duplicate detection on, variants matching a saved post or
+            an earlier variant are left out.
+
+        Raises:
+            ValueError: If no variant could be parsed from the response
+            DuplicateContentError: If every variant matched a saved post
+        """
+        params = self.build_variants_request(
+            topic, template_type, n, self._avoid_context(topic, additional_context)
+        )
+        response, call_info = self._create_message(params)
+        posts = self.parse_variants(response, topic, template_type, include_hashtags, call_info)
+        return self.drop_duplicates(posts)
+
+    async def agenerate_variants(
+        self,
+        topic: str,
+        template_type: str = "insight",
+        n: int = 3,
+        additional_context: Optional[str] = None,
+        include_hashtags: bool = True,
+    ) -> List[dict]:
+        """
+        Generate post variants with the async client.
+
+        Takes the same arguments and returns the same list as generate_variants.
+        """
+        context = await asyncio.to_thread(self._avoid_context, topic, additional_context)
+        params = self.build_variants_request(topic, template_type, n, context)
+        response, call_info = await self._acreate_message(params)
+        posts = self.parse_variants(response, topic, template_type, include_hashtags, call_info)
+        return await asyncio.to_thread(self.drop_duplicates, posts)
+
+    def build_variants_request(
+        self,
+        topic: str,
+        template_type: str = "insight",
+        n: int = 3,
+        additional_context: Optional[str] = None,
+    ) -> dict:
+        """Build the messages.create parameters for N post variants without sending them."""
+        if n < 1:
+            raise ValueError("n must be at least 1")
+        content = self._prepare_prompt(topic, template_type, None, additional_context)
+        # After the cached template block, so single posts and variants share its cache entry
+        content.append(self._text_block(self._variants_instructions(n)))
+        tool = tool_definition(self.VARIANTS_TOOL, self.VARIANTS_TOOL_DESCRIPTION, LinkedInVariantsFields)
+        max_tokens = linkedin_max_tokens(LINKEDIN_TEMPLATES[template_type]) * n
+        return self._request_params(content, max_tokens=max_tokens, tool=tool)
+
+    def _variants_instructions(self, n: int) -> str:
+        instructions = (
+            f"Write {n} distinct posts. Give each its own hook, angle and call to action, "
+            "and keep each within the character limit."
+        )
+        if self.structured:
+            return instructions + f" Return all {n} in a single call to the {self.VARIANTS_TOOL} tool."
+        return instructions + (
+            f' Start each post with a line "=== VARIANT k ===" (k = 1 to {n}), followed by its '
+            "POST, HOOK and CTA sections in the format above."
+        )
+
+    def parse_variants(
+        self,
+        message,
+        topic: str,
+        template_type: str,
+        include_hashtags: bool = True,
+        call_info: Optional[dict] = None,
+    ) -> List[dict]:
+        """
+        Split a multi-variant response into separate posts.
+
+        Each post gets its own hashtags and metadata. The call's token usage
+        and cost are divided between the variants, so totals summed over
+        posts stay correct; "variant" (1-based) and "variant_count" record
+        where each post came from.
+
+        Raises:
+            ValueError: If the response holds no parseable variant
+        """
+        if self.structured:
+            fields = self._structured_fields(message, self.VARIANTS_TOOL, LinkedInVariantsFields)
+            posts = [
+                self._build_post(variant, topic, template_type, include_hashtags)
+                for variant in fields["variants"]
+            ]
+        else:
+            posts = [
+                self._parse_response(chunk, topic, template_type, include_hashtags)
+                for chunk in VARIANT_HEADER.split(message.content[0].text)
+                if "POST:" in chunk
+            ]
+        if not posts:
+            raise ValueError("Response did not contain any post variants")
+
+        metadata = self._call_metadata(message, call_info)
+        cost = metadata["cost_usd"]
+        for i, (post, usage) in enumerate(zip(posts, _split_usage(metadata["usage"], len(posts)))):
+            post["metadata"].update(
+                metadata,
+                usage=usage,
+                cost_usd=None if cost is None else round(cost / len(posts), 6),
+                variant=i + 1,
+                variant_count=len(posts),
+            )
+        return posts
+
+    def drop_duplicates(self, posts: List[dict]) -> List[dict]:
+        """
+        Leave out posts the duplicate index matches, and posts as similar to
+        one kept earlier in the list; raise if every post matched a saved one.
+        """
+        if self.duplicate_index is None:
+            return posts
+        unique, kept, match = [], [], None
+        for post in posts:
+            found = self.duplicate_index.find_similar(self.CONTENT_TYPE, post)
+            if found is not None:
+                match = match or found
+                continue
+            signature = minhash(post_fields(post)[1])
+            if any(similarity(signature, other) >= self.duplicate_index.threshold for other in kept):
+                continue
+            unique.append(post)
+            kept.append(signature)
+        if not unique:
+            raise DuplicateContentError(match)
+        return unique
+
+    def repurpose_blog_post(
+        self,
+        blog_post: Union[dict, str],
+        count: int = 3,
+        template_type: str = "insight",
+        include_hashtags: bool = True,
+    ) -> List[dict]:
+        """
+        Derive LinkedIn posts promoting a blog post, all in a single request.
+
+        The model works from the article itself rather than from the topic
+        description, so the posts repeat its facts and figures instead of
+        inventing their own, and one short request replaces `count` full
+        generations.
+
+        Args:
+            blog_post: Post dictionary from BlogAgent.generate_post, or the
+                path of a post saved by BlogAgent.save_post
+            count: Number of LinkedIn posts to derive
+            template_type: Template type from LINKEDIN_TEMPLATES
+            include_hashtags: Whether to include hashtag suggestions
+
+        Returns:
+            One post dictionary per derived post (see parse_repurposed). With
+            near-duplicate detection on, posts matching a saved post or an
+            earlier one are left out.
+
+        Raises:
+            ValueError: If the blog post has no content, or no post could be
+                parsed from the response
+            DuplicateContentError: If every derived post matched a saved post
+        """
+        source_file = blog_post if isinstance(blog_post, str) else None
+        if source_file:
+            blog_post = read_post(source_file)
+        params = self.build_repurpose_request(blog_post, count, template_type)
+        response, call_info = self._create_message(params)
+        posts = self.parse_repurposed(
+            response, blog_post, template_type, include_hashtags, call_info, source_file
+        )
+        return self.drop_duplicates(posts)
+
+    def build_repurpose_request(
+        self,
+        blog_post: dict,
+        count: int = 3,
+        template_type: str = "insight",
+    ) -> dict:
+        """Build the messages.create parameters for posts derived from a blog post without sending them."""
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        if template_type not in LINKEDIN_TEMPLATES:
+            raise ValueError(f"Unknown template: {template_type}. Available: {list(LINKEDIN_TEMPLATES.keys())}")
+        if not blog_post.get("content"):
+            raise ValueError("Blog post has no content to repurpose")
+
+        template = LINKEDIN_TEMPLATES[template_type]
+        prompt = f"""Write LinkedIn posts promoting the blog post below. Base each post on a
+different point from the article, keep every fact, figure and claim consistent with it,
+and close by inviting readers to read the full article.
+
+Blog Title: {blog_post.get('title', '')}
+Summary: {blog_post.get('meta_description', '')}
+
+Article:
+{blog_post['content']}
+"""
+        content = [
+            self._text_block(self._template_block(template), cache=True),
+            self._text_block(prompt),
+            self._text_block(self._variants_instructions(count)),
+        ]
+        tool = tool_definition(self.VARIANTS_TOOL, self.VARIANTS_TOOL_DESCRIPTION, LinkedInVariantsFields)
+        return self._request_params(content, max_tokens=linkedin_max_tokens(template) * count, tool=tool)
+
+    def parse_repurposed(
+        self,
+        message,
+        blog_post: dict,
+        template_type: str,
+        include_hashtags: bool = True,
+        call_info: Optional[dict] = None,
+        source_file: Optional[str] = None,
+    ) -> List[dict]:
+        """
+        Split a repurposing response into posts, as parse_variants does.
+
+        The posts take the blog post's topic, and "source_blog" in their
+        metadata records the title and saved file of the article they promote.
+        """
+        topic = blog_post.get("metadata", {}).get("topic", "general")
+        posts = self.parse_variants(message, topic, template_type, include_hashtags, call_info)
+        for post in posts:
+            post["metadata"]["source_blog"] = {"title": blog_post.get("title"), "file": source_file}
+        return posts
+
+    def build_request(
+        self,
+        topic: str,
+        template_type: str = "insight",
+        hook_suggestion: Optional[str] = None,
+        additional_context: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> dict:
+        """Build the messages.create parameters for a post without sending them (to `model`, if given)."""
+        content = self._prepare_prompt(topic, template_type, hook_suggestion, additional_context)
+        if self.structured:
+            content.append(self._text_block(self._output_instructions()))
+        return self._request_params(
+            content, max_tokens=linkedin_max_tokens(LINKEDIN_TEMPLATES[template_type]), model=model
+        )
+
+    def parse_message(
+        self,
+        message,
+        topic: str,
+        template_type: str,
+        include_hashtags: bool = True,
+        call_info: Optional[dict] = None,
+    ) -> dict:
+        """Turn an API response message into a structured post with usage, cost and timing."""
+        if self.structured:
+            fields = self._structured_fields(message)
+            post = self._build_post(fields, topic, template_type, include_hashtags)
+        else:
+            post = self._parse_response(message.content[0].text, topic, template_type, include_hashtags)
+        post["metadata"].update(self._call_metadata(message, call_info))
+        return post
+
+    def _prepare_prompt(
+        self,
+        topic: str,
+        template_type: str,
+        hook_suggestion: Optional[str],
+        additional_context: Optional[str],
+    ) -> List[dict]:
+        """Validate the topic and template, then build the generation prompt."""
         if topic not in TOPICS:
             raise ValueError(f"Unknown topic: {topic}. Available: {list(TOPICS.keys())}")
 
@@ -82,39 +457,28 @@ as an industry authority in energy storage and clean energy solutions."""
         topic_info = TOPICS[topic]
         template = LINKEDIN_TEMPLATES[template_type]
 
-        prompt = self._build_generation_prompt(
+        return self._build_generation_prompt(
             topic_info, template, hook_suggestion, additional_context
         )
 
-        response = self.client.messages.create(
-            model=self.model,
-            max_tokens=1500,
-            system=self.system_prompt,
-            messages=[{"role": "user", "content": prompt}],
-        )
-
-        content = response.content[0].text
-        return self._parse_response(content, topic, template_type, include_hashtags)
-
     def _build_generation_prompt(
         self,
         topic_info: dict,
         template: dict,
         hook_suggestion: Optional[str],
         additional_context: Optional[str],
-    ) -> str:
+    ) -> List[dict]:
+        """
+        Build the user message as content blocks.
+
+        The post type block is shared by every post of a template type and is
+        marked as a cache breakpoint ahead of the topic-specific request.
+        """
         prompt = f"""Write a LinkedIn post about {topic_info['name']}.
 
 Topic Description: {topic_info['description']}
 
 Relevant Themes: {', '.join(topic_info['keywords'][:5])}
-
-Post Type: {template['name']}
-Character Limit: {template['character_limit']}
-Desired Tone: {template['tone']}
-
-Structure to Follow:
-{template['structure']}
 """
 
         if hook_suggestion:
@@ -123,17 +487,37 @@ Structure to Follow:
         if additional_context:
             prompt += f"\nAdditional Requirements:\n{additional_context}\n"
 
-        prompt += """
-Please provide the response in the following format:
+        return [
+            self._text_block(self._template_block(template), cache=True),
+            self._text_block(prompt),
+        ]
+
+    def _template_block(self, template: dict) -> str:
+        block = f"""Post Type: {template['name']}
+Character Limit: {template['character_limit']}
+Desired Tone: {template['tone']}
+
+Structure to Follow:
+{template['structure']}
+"""
+        # Structured requests name their tool at the end of the message
+        # instead: variants and repurposed posts share this block but save
+        # through VARIANTS_TOOL rather than OUTPUT_TOOL
+        if not self.structured:
+            block += f"\n{self._output_instructions()}\n"
+        return block
+
+    def _output_instructions(self) -> str:
+        if self.structured:
+            return f"Return the finished post by calling the {self.OUTPUT_TOOL} tool."
+        return """Please provide the response in the following format:
 
 POST:
 [Full LinkedIn post content with proper formatting, line breaks, and emojis where appropriate]
 
 HOOK: [Just the first 1-2 lines that appear before "see more"]
 
-CTA: [The call-to-action or engagement question]
-"""
-        return prompt
+CTA: [The call-to-action or engagement question]"""
 
     def _parse_response(
         self, response: str, topic: str, template_type: str, include_hashtags: bool
@@ -158,6 +542,12 @@ CTA: [The call-to-action or engagement question]
             cta_start = response.find("CTA:") + 4
             sections["cta"] = response[cta_start:].strip()
 
+        return self._build_post(sections, topic, template_type, include_hashtags)
+
+    def _build_post(
+        self, sections: dict, topic: str, template_type: str, include_hashtags: bool
+    ) -> dict:
+        """Add hashtags and the post metadata to the parsed sections."""
         # Add hashtags
         if include_hashtags:
             sections["hashtags"] = self._select_hashtags(topic)
@@ -201,6 +591,7 @@ CTA: [The call-to-action or engagement question]
         topics: Optional[List[str]] = None,
         template_types: Optional[List[str]] = None,
         count: int = 5,
+        workers: int = 1,
     ) -> List[dict]:
         """
         Generate multiple LinkedIn posts.
@@ -209,48 +600,121 @@ CTA: [The call-to-action or engagement question]
             topics: List of topics to use (random if None)
             template_types: List of templates to use (random if None)
             count: Number of posts to generate
+            workers: Number of posts to generate concurrently
 
         Returns:
             List of generated posts
         """
+        posts = []
+        for result in self.generate_batch_iter(topics, template_types, count, workers=workers):
+            if isinstance(result, BatchError):
+                if isinstance(result.error, CircuitOpenError):
+                    print(f"Stopping batch after {len(posts)} posts: {result.error}")
+                else:
+                    print(f"Error generating post {result.index + 1}: {result.error}")
+            else:
+                posts.append(result)
+
+        return posts
+
+    def generate_batch_iter(
+        self,
+        topics: Optional[List[str]] = None,
+        template_types: Optional[List[str]] = None,
+        count: int = 5,
+        workers: int = 4,
+        save: bool = False,
+    ) -> Iterator[Union[dict, BatchError]]:
+        """
+        Generate multiple LinkedIn posts concurrently, yielding each as it completes.
+
+        Posts are yielded in completion order and are not accumulated. A new
+        post is only submitted as each one is yielded, so a large batch holds
+        at most `workers` posts in flight. If the circuit breaker opens, the
+        remaining posts are cancelled after yielding its error.
+
+        Args:
+            topics: List of topics to use (random if None)
+            template_types: List of templates to use (random if None)
+            count: Number of posts to generate
+            workers: Number of posts to generate concurrently
+            save: Save each post with save_post as soon as it is generated;
+                the file path is added to the post as "output_file"
+
+        Yields:
+            Post dictionaries, or BatchError for posts that failed
+        """
         if not topics:
             topics = list(TOPICS.keys())
         if not template_types:
             template_types = list(LINKEDIN_TEMPLATES.keys())
 
-        posts = []
-        for i in range(count):
-            topic = random.choice(topics)
-            template = random.choice(template_types)
-
-            try:
-                post = self.generate_post(topic=topic, template_type=template)
-                posts.append(post)
-            except Exception as e:
-                print(f"Error generating post {i+1}: {e}")
-
-        return posts
+        def generate(topic: str, template: str) -> dict:
+            post = self.generate_post(topic=topic, template_type=template)
+            if save:
+                post["output_file"] = self.save_post(post)
+            return post
+
+        jobs = ((i, random.choice(topics), random.choice(template_types)) for i in range(count))
+        executor = ThreadPoolExecutor(max_workers=max(1, workers))
+        futures = {}
+
+        def submit_next():
+            job = next(jobs, None)
+            if job is not None:
+                futures[executor.submit(generate, job[1], job[2])] = job
+
+        try:
+            # Only `workers` posts are submitted at a time, so finished posts
+            # never pile up ahead of a slow consumer
+            for _ in range(max(1, workers)):
+                submit_next()
+
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, topic, template = futures.pop(future)
+                    try:
+                        post = future.result()
+                    except CircuitOpenError as e:
+                        # The API is overloaded; the rest of the batch would fail the same way
+                        yield BatchError(index, topic, template, e)
+                        return
+                    except Exception as e:
+                        submit_next()
+                        yield BatchError(index, topic, template, e)
+                    else:
+                        submit_next()
+                        yield post
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
 
     def save_post(self, post: dict, filename: Optional[str] = None) -> str:
-        """Save the generated post to a file."""
-        os.makedirs(LINKEDIN_OUTPUT_DIR, exist_ok=True)
-
-        if not filename:
-            date_str = datetime.now().strftime("%Y-%m-%d-%H%M")
-            topic = post.get("metadata", {}).get("topic", "general")
-            filename = f"{date_str}-{topic}"
-
-        # Save as text file (ready to copy-paste)
-        txt_path = os.path.join(LINKEDIN_OUTPUT_DIR, f"{filename}.txt")
-        with open(txt_path, "w") as f:
-            f.write(post.get("content", ""))
+        """
+        Save the generated post as a text file plus a JSON metadata file.
 
-        # Save metadata as JSON
-        json_path = os.path.join(LINKEDIN_OUTPUT_DIR, f"{filename}.json")
-        with open(json_path, "w") as f:
-            json.dump(post, f, indent=2)
+        Files go under LINKEDIN_OUTPUT_DIR/YYYY/MM/<topic>/ with a
+        content-hashed name (see sharded_output_path), or at
+        LINKEDIN_OUTPUT_DIR/<filename> when a filename is given. Both files are
+        written atomically, JSON first, so a reader that finds the .txt file
+        always finds its complete .json too.
 
-        return txt_path
+        Returns:
+            Path of the text file
+        """
+        content = post.get("content", "")
+
+        if filename:
+            path = os.path.join(LINKEDIN_OUTPUT_DIR, filename)
+        else:
+            template_type = post.get("metadata", {}).get("template_type", "post")
+            path = sharded_output_path(LINKEDIN_OUTPUT_DIR, post, template_type, content)
+
+        atomic_write(f"{path}.json", json.dumps(post, indent=2))
+        # Plain text, ready to copy-paste
+        atomic_write(f"{path}.txt", content)
+        self._index_saved(post, f"{path}.txt")
+        return f"{path}.txt"
 
 
 def main():
@@ -8,18 +8,14 @@ about Battery Energy Storage Systems using AI.
 
 import argparse
 import sys
-from datetime import datetime, timedelta
+from datetime import datetime
 from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from rich.markdown import Markdown
 
-from config import TOPICS, ANTHROPIC_API_KEY
-from blog_agent import BlogAgent
-from linkedin_agent import LinkedInAgent
-from scheduler import ContentScheduler
-from templates.blog_templates import BLOG_TEMPLATES
-from templates.linkedin_templates import LINKEDIN_TEMPLATES
+from config import TOPICS, ANTHROPIC_API_KEY, STRUCTURED_OUTPUT
+
+# Subcommand dependencies (the Anthropic SDK, agents, scheduler, rich renderables)
+# are imported inside the functions that use them, so offline commands such as
+# `list` and `status` start quickly. Measure with `python -m benchmarks.startup`.
 
 
 console = Console()
@@ -37,6 +33,8 @@ def check_api_key():
 
 def list_topics():
     """Display available topics."""
+    from rich.table import Table
+
     table = Table(title="Available Topics")
     table.add_column("Key", style="cyan")
     table.add_column("Name", style="green")
@@ -50,6 +48,10 @@ def list_topics():
 
 def list_templates(content_type: str):
     """Display available templates."""
+    from rich.table import Table
+    from templates.blog_templates import BLOG_TEMPLATES
+    from templates.linkedin_templates import LINKEDIN_TEMPLATES
+
     templates = BLOG_TEMPLATES if content_type == "blog" else LINKEDIN_TEMPLATES
 
     table = Table(title=f"{content_type.title()} Templates")
@@ -67,36 +69,58 @@ def generate_blog(args):
     """Generate a blog post."""
     check_api_key()
 
+    from rich.markdown import Markdown
+    from blog_agent import BlogAgent
+    from response_cache import ResponseCache
+
     console.print(f"\n[yellow]Generating blog post...[/yellow]")
     console.print(f"Topic: {args.topic}")
     console.print(f"Template: {args.template}")
 
-    agent = BlogAgent()
+    agent = BlogAgent(
+        response_cache=None if args.no_cache else ResponseCache(),
+        structured=args.structured,
+    )
 
     try:
-        post = agent.generate_post(
-            topic=args.topic,
-            template_type=args.template,
-            title_suggestion=args.title,
-            additional_context=args.context,
-        )
+        if args.stream:
+            post = stream_blog(agent, args)
+        else:
+            post = agent.generate_post(
+                topic=args.topic,
+                template_type=args.template,
+                title_suggestion=args.title,
+                additional_context=args.context,
+            )
 
-        console.print("\n" + "=" * 60)
-        console.print(f"[bold green]Title:[/bold green] {post.get('title')}")
-        console.print(f"[green]Meta:[/green] {post.get('meta_description')}")
-        console.print(f"[green]Keywords:[/green] {', '.join(post.get('keywords', []))}")
+            console.print("\n" + "=" * 60)
+            console.print(f"[bold green]Title:[/bold green] {post.get('title')}")
+            console.print(f"[green]Meta:[/green] {post.get('meta_description')}")
+            console.print(f"[green]Keywords:[/green] {', '.join(post.get('keywords', []))}")
 
-        if args.preview:
-            console.print("\n[bold]Content Preview:[/bold]")
-            console.print(Markdown(post.get("content", "")[:1500] + "\n\n..."))
-        else:
-            console.print("\n[bold]Full Content:[/bold]")
-            console.print(Markdown(post.get("content", "")))
+            if args.preview:
+                console.print("\n[bold]Content Preview:[/bold]")
+                console.print(Markdown(post.get("content", "")[:1500] + "\n\n..."))
+            else:
+                console.print("\n[bold]Full Content:[/bold]")
+                console.print(Markdown(post.get("content", "")))
+
+        if post.get("metadata", {}).get("cache_hit"):
+            console.print("\n[dim]Served from response cache (use --no-cache to regenerate)[/dim]")
 
+        filepath = None
         if args.save:
             filepath = agent.save_post(post)
             console.print(f"\n[blue]Saved to:[/blue] {filepath}")
 
+        if args.teasers:
+            from linkedin_agent import LinkedInAgent
+
+            console.print(f"\n[yellow]Deriving {args.teasers} LinkedIn teasers...[/yellow]")
+            linkedin_agent = LinkedInAgent(structured=args.structured)
+            teasers = linkedin_agent.repurpose_blog_post(filepath or post, count=args.teasers)
+            print_linkedin_posts(linkedin_agent, teasers, args.save, "Teaser")
+
     except ValueError as e:
         console.print(f"[red]Error: {e}[/red]")
         sys.exit(1)
@@ -105,28 +129,91 @@ def generate_blog(args):
         sys.exit(1)
 
 
+def stream_blog(agent, args) -> dict:
+    """Print a blog post section by section as it streams in and return the parsed post."""
+    labels = {
+        "title": "[bold green]Title:[/bold green]",
+        "meta_description": "[green]Meta:[/green]",
+        "content": "[bold]Full Content:[/bold]",
+        "keywords": "[green]Keywords:[/green]",
+    }
+    current = None
+
+    console.print("\n" + "=" * 60)
+    for section, chunk in agent.generate_post_stream(
+        topic=args.topic,
+        template_type=args.template,
+        title_suggestion=args.title,
+        additional_context=args.context,
+    ):
+        if section == "post":
+            console.print()
+            return chunk
+
+        if section != current:
+            console.print(f"\n{labels[section]}")
+            current = section
+
+        # Raw markdown goes straight to stdout so it can be piped to disk
+        sys.stdout.write(chunk)
+        sys.stdout.flush()
+
+
 def generate_linkedin(args):
     """Generate a LinkedIn post."""
     check_api_key()
 
+    from linkedin_agent import LinkedInAgent
+    from response_cache import ResponseCache
+
     console.print(f"\n[yellow]Generating LinkedIn post...[/yellow]")
     console.print(f"Topic: {args.topic}")
     console.print(f"Template: {args.template}")
 
-    agent = LinkedInAgent()
+    agent = LinkedInAgent(
+        response_cache=None if args.no_cache else ResponseCache(),
+        structured=args.structured,
+    )
 
     try:
-        post = agent.generate_post(
-            topic=args.topic,
-            template_type=args.template,
-            hook_suggestion=args.hook,
-            additional_context=args.context,
-        )
+        if args.variants > 1:
+            posts = agent.generate_variants(
+                topic=args.topic,
+                template_type=args.template,
+                n=args.variants,
+                additional_context=args.context,
+            )
+        else:
+            posts = [agent.generate_post(
+                topic=args.topic,
+                template_type=args.template,
+                hook_suggestion=args.hook,
+                additional_context=args.context,
+            )]
+
+        print_linkedin_posts(agent, posts, args.save, "Variant")
+
+        if posts[0].get("metadata", {}).get("cache_hit"):
+            console.print("\n[dim]Served from response cache (use --no-cache to regenerate)[/dim]")
+
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        sys.exit(1)
+    except Exception as e:
+        console.print(f"[red]Error generating post: {e}[/red]")
+        sys.exit(1)
 
+
+def print_linkedin_posts(agent, posts, save: bool, label: str):
+    """Print LinkedIn posts one panel each, saving them if asked."""
+    from rich.panel import Panel
+
+    for i, post in enumerate(posts, 1):
+        title = "Generated Post" if len(posts) == 1 else f"{label} {i} of {len(posts)}"
         console.print("\n" + "=" * 60)
         console.print(Panel(
             post.get("content", ""),
-            title="[green]Generated Post[/green]",
+            title=f"[green]{title}[/green]",
             border_style="green",
         ))
 
@@ -134,20 +221,71 @@ def generate_linkedin(args):
         console.print(f"[blue]CTA:[/blue] {post.get('cta', 'N/A')}")
         console.print(f"[blue]Characters:[/blue] {post.get('metadata', {}).get('character_count', 0)}")
 
-        if args.save:
+        if save:
             filepath = agent.save_post(post)
-            console.print(f"\n[blue]Saved to:[/blue] {filepath}")
+            console.print(f"[blue]Saved to:[/blue] {filepath}")
 
-    except ValueError as e:
+
+def repurpose_blog(args):
+    """Derive LinkedIn posts from a saved blog post."""
+    check_api_key()
+
+    from linkedin_agent import LinkedInAgent
+
+    console.print(f"\n[yellow]Deriving {args.count} LinkedIn posts from {args.source}...[/yellow]")
+
+    agent = LinkedInAgent(structured=args.structured)
+
+    try:
+        posts = agent.repurpose_blog_post(args.source, count=args.count, template_type=args.template)
+        print_linkedin_posts(agent, posts, args.save, "Teaser")
+
+    except (OSError, ValueError) as e:
         console.print(f"[red]Error: {e}[/red]")
         sys.exit(1)
     except Exception as e:
-        console.print(f"[red]Error generating post: {e}[/red]")
+        console.print(f"[red]Error generating posts: {e}[/red]")
         sys.exit(1)
 
 
+def generate_linkedin_batch(args):
+    """Generate several LinkedIn posts concurrently, reporting each as it completes."""
+    check_api_key()
+
+    from linkedin_agent import BatchError, LinkedInAgent
+
+    console.print(f"\n[yellow]Generating {args.count} LinkedIn posts with {args.workers} workers...[/yellow]")
+
+    agent = LinkedInAgent(structured=args.structured)
+    generated = 0
+
+    for result in agent.generate_batch_iter(
+        topics=args.topics,
+        template_types=args.templates,
+        count=args.count,
+        workers=args.workers,
+        save=args.save,
+    ):
+        if isinstance(result, BatchError):
+            console.print(f"[red]Post {result.index + 1} ({result.topic}/{result.template_type}) failed: {result.error}[/red]")
+            continue
+
+        generated += 1
+        metadata = result.get("metadata", {})
+        console.print(
+            f"[green]✓[/green] {metadata.get('topic')}/{metadata.get('template_type')}: "
+            f"{result.get('hook', '')[:70]}"
+        )
+        if result.get("output_file"):
+            console.print(f"  [blue]Saved to:[/blue] {result['output_file']}")
+
+    console.print(f"\n[green]Generated {generated} of {args.count} posts[/green]")
+
+
 def schedule_content(args):
     """Schedule content generation."""
+    from scheduler import ContentScheduler
+
     scheduler = ContentScheduler()
 
     if args.calendar:
@@ -157,10 +295,11 @@ def schedule_content(args):
             weeks=args.weeks,
             blog_posts_per_week=args.blogs_per_week,
             linkedin_posts_per_week=args.linkedin_per_week,
+            teasers_per_blog=args.teasers or 0,
         )
         console.print(f"[green]Scheduled {len(tasks)} tasks[/green]")
 
-    elif args.type and args.topic:
+    elif args.type:
         # Schedule a single item
         scheduled_time = None
         if args.time:
@@ -175,7 +314,19 @@ def schedule_content(args):
                 topic=args.topic,
                 template_type=args.template or "educational",
                 scheduled_time=scheduled_time,
+                repurpose_count=args.teasers or 0,
             )
+        elif args.type == "repurpose":
+            try:
+                task = scheduler.schedule_repurpose(
+                    source_file=args.source,
+                    count=args.teasers or 3,
+                    template_type=args.template or "insight",
+                    scheduled_time=scheduled_time,
+                )
+            except (OSError, ValueError) as e:
+                console.print(f"[red]Error: {e}[/red]")
+                sys.exit(1)
         else:
             task = scheduler.schedule_linkedin_post(
                 topic=args.topic,
@@ -189,8 +340,11 @@ def schedule_content(args):
     show_schedule(scheduler)
 
 
-def show_schedule(scheduler: ContentScheduler = None):
+def show_schedule(scheduler=None):
     """Display the current schedule."""
+    from rich.table import Table
+    from scheduler import ContentScheduler
+
     if scheduler is None:
         scheduler = ContentScheduler()
 
@@ -202,9 +356,11 @@ def show_schedule(scheduler: ContentScheduler = None):
     table.add_column("Scheduled", style="blue")
     table.add_column("Status", style="red")
 
-    for task in scheduler.tasks[-20:]:
+    for task in scheduler.recent_tasks(20):
         status_style = {
             "pending": "yellow",
+            "running": "cyan",
+            "batched": "blue",
             "completed": "green",
             "failed": "red",
         }.get(task.status, "white")
@@ -220,23 +376,34 @@ def show_schedule(scheduler: ContentScheduler = None):
 
     console.print(table)
 
-    pending = len(scheduler.get_pending_tasks())
-    completed = len(scheduler.get_completed_tasks())
-    console.print(f"\n[yellow]Pending:[/yellow] {pending} | [green]Completed:[/green] {completed}")
+    counts = scheduler.count_by_status()
+    pending = counts.get("pending", 0)
+    running = counts.get("running", 0)
+    completed = counts.get("completed", 0)
+    console.print(
+        f"\n[yellow]Pending:[/yellow] {pending} | [cyan]Running:[/cyan] {running} "
+        f"| [green]Completed:[/green] {completed}"
+    )
 
 
 def run_scheduler(args):
     """Run the scheduler daemon."""
     check_api_key()
 
-    scheduler = ContentScheduler()
+    from scheduler import ContentScheduler
 
-    if args.execute_now:
+    scheduler = ContentScheduler(requests_per_minute=args.rpm, worker_id=args.worker_id)
+
+    if args.batch:
+        console.print("[yellow]Submitting pending tasks as a message batch...[/yellow]")
+        executed = scheduler.execute_pending_tasks_batch(poll_interval=args.poll_interval)
+        console.print(f"[green]Executed {len(executed)} tasks[/green]")
+    elif args.execute_now:
         console.print("[yellow]Executing pending tasks...[/yellow]")
-        executed = scheduler.execute_pending_tasks()
+        executed = scheduler.execute_pending_tasks(workers=args.workers)
         console.print(f"[green]Executed {len(executed)} tasks[/green]")
     else:
-        scheduler.run_daemon(check_interval=args.interval)
+        scheduler.run_daemon(check_interval=args.interval, workers=args.workers)
 
 
 def main():
@@ -260,21 +427,55 @@ def main():
     blog_parser.add_argument("--context", "-c", help="Additional context")
     blog_parser.add_argument("--save", "-s", action="store_true", help="Save to file")
     blog_parser.add_argument("--preview", "-p", action="store_true", help="Show preview only")
+    blog_parser.add_argument("--stream", action="store_true", help="Print sections as they are generated")
+    blog_parser.add_argument("--no-cache", action="store_true", help="Always call the API, bypassing the response cache")
+    blog_parser.add_argument("--teasers", type=int, default=0,
+                             help="Also derive this many LinkedIn teasers from the post in one request")
+    blog_parser.add_argument("--structured", action="store_true", default=STRUCTURED_OUTPUT,
+                             help="Return the post through a schema-validated tool call")
 
     # LinkedIn command
     linkedin_parser = subparsers.add_parser("linkedin", help="Generate a LinkedIn post")
     linkedin_parser.add_argument("topic", help="Topic key")
     linkedin_parser.add_argument("--template", "-t", default="insight", help="Template type")
     linkedin_parser.add_argument("--hook", help="Suggested hook/opening")
+    linkedin_parser.add_argument("--variants", "-n", type=int, default=1,
+                                 help="Generate this many distinct posts in one request (ignores --hook)")
     linkedin_parser.add_argument("--context", "-c", help="Additional context")
     linkedin_parser.add_argument("--save", "-s", action="store_true", help="Save to file")
+    linkedin_parser.add_argument("--no-cache", action="store_true", help="Always call the API, bypassing the response cache")
+    linkedin_parser.add_argument("--structured", action="store_true", default=STRUCTURED_OUTPUT,
+                                 help="Return the post through a schema-validated tool call")
+
+    # LinkedIn batch command
+    linkedin_batch_parser = subparsers.add_parser("linkedin-batch", help="Generate several LinkedIn posts concurrently")
+    linkedin_batch_parser.add_argument("--count", "-n", type=int, default=5, help="Number of posts")
+    linkedin_batch_parser.add_argument("--workers", "-w", type=int, default=4, help="Posts to generate concurrently")
+    linkedin_batch_parser.add_argument("--topics", nargs="+", help="Topic keys to choose from (default: all)")
+    linkedin_batch_parser.add_argument("--templates", nargs="+", help="Template types to choose from (default: all)")
+    linkedin_batch_parser.add_argument("--save", "-s", action="store_true", help="Save each post as it completes")
+    linkedin_batch_parser.add_argument("--structured", action="store_true", default=STRUCTURED_OUTPUT,
+                                       help="Return posts through a schema-validated tool call")
+
+    # LinkedIn repurpose command
+    repurpose_parser = subparsers.add_parser("linkedin-repurpose", help="Derive LinkedIn posts from a saved blog post")
+    repurpose_parser.add_argument("source", help="Path of the saved blog post (.md or .json)")
+    repurpose_parser.add_argument("--count", "-n", type=int, default=3, help="Number of LinkedIn posts")
+    repurpose_parser.add_argument("--template", "-t", default="insight", help="Template type")
+    repurpose_parser.add_argument("--save", "-s", action="store_true", help="Save to file")
+    repurpose_parser.add_argument("--structured", action="store_true", default=STRUCTURED_OUTPUT,
+                                  help="Return the posts through a schema-validated tool call")
 
     # Schedule command
     schedule_parser = subparsers.add_parser("schedule", help="Schedule content generation")
-    schedule_parser.add_argument("--type", choices=["blog", "linkedin"], help="Content type")
+    schedule_parser.add_argument("--type", choices=["blog", "linkedin", "repurpose"], help="Content type")
     schedule_parser.add_argument("--topic", help="Topic key")
     schedule_parser.add_argument("--template", help="Template type")
     schedule_parser.add_argument("--time", help="Scheduled time (ISO format)")
+    schedule_parser.add_argument("--source", help="Saved blog post to derive LinkedIn posts from (--type repurpose)")
+    schedule_parser.add_argument("--teasers", type=int,
+                                 help="LinkedIn teasers to derive from each blog post once generated "
+                                      "(for --type repurpose: posts to derive, default 3)")
     schedule_parser.add_argument("--calendar", action="store_true", help="Generate content calendar")
     schedule_parser.add_argument("--weeks", type=int, default=4, help="Weeks to schedule")
     schedule_parser.add_argument("--blogs-per-week", type=int, default=2, help="Blog posts per week")
@@ -283,13 +484,38 @@ def main():
     # Run command
     run_parser = subparsers.add_parser("run", help="Run the scheduler")
     run_parser.add_argument("--execute-now", action="store_true", help="Execute pending tasks immediately")
-    run_parser.add_argument("--interval", type=int, default=60, help="Check interval in seconds")
+    run_parser.add_argument("--interval", type=int, default=60, help="Maximum seconds between schedule rescans")
+    run_parser.add_argument("--workers", "-w", type=int, default=1, help="Number of tasks to run concurrently")
+    run_parser.add_argument("--rpm", type=int, help="Maximum API requests per minute across processes (overrides RATE_LIMIT_RPM)")
+    run_parser.add_argument("--batch", action="store_true", help="Execute due tasks as one Message Batch")
+    run_parser.add_argument("--poll-interval", type=int, default=30, help="Seconds between batch status checks")
+    run_parser.add_argument("--worker-id", help="Name this worker holds task leases under (default: host-pid)")
 
     # Status command
     subparsers.add_parser("status", help="Show schedule status")
 
     args = parser.parse_args()
 
+    if args.command == "schedule" and args.type and not args.calendar:
+        # Catch incomplete tasks now rather than when the daemon runs them
+        if args.type == "repurpose":
+            if not args.source:
+                schedule_parser.error("--type repurpose needs --source, the path of a saved blog post")
+        else:
+            if not args.topic:
+                schedule_parser.error(f"--type {args.type} needs --topic")
+            if args.topic not in TOPICS:
+                schedule_parser.error(f"unknown topic {args.topic!r} (choose from {', '.join(TOPICS)})")
+            if args.source:
+                schedule_parser.error("--source only applies to --type repurpose")
+        if args.template:
+            from templates.blog_templates import BLOG_TEMPLATES
+            from templates.linkedin_templates import LINKEDIN_TEMPLATES
+
+            templates = BLOG_TEMPLATES if args.type == "blog" else LINKEDIN_TEMPLATES
+            if args.template not in templates:
+                schedule_parser.error(f"unknown template {args.template!r} (choose from {', '.join(templates)})")
+
     # Header
     console.print("\n[bold blue]🔋 BESS Content Generation System[/bold blue]")
     console.print("=" * 50)
@@ -308,6 +534,12 @@ def main():
     elif args.command == "linkedin":
         generate_linkedin(args)
 
+    elif args.command == "linkedin-batch":
+        generate_linkedin_batch(args)
+
+    elif args.command == "linkedin-repurpose":
+        repurpose_blog(args)
+
     elif args.command == "schedule":
         schedule_content(args)
 
@@ -0,0 +1,87 @@
+"""Local quality checks that decide whether a fast-model draft is kept or escalated."""
+
+import re
+from typing import List
+
+
+# Allowance over a LinkedIn template's character limit, which includes the
+# appended hashtags
+LENGTH_TOLERANCE = 1.15
+
+# Shortest acceptable LinkedIn post, as a fraction of the character limit
+MIN_LENGTH_RATIO = 0.25
+
+# Shortest acceptable blog post, as a fraction of the template's minimum word count
+MIN_WORDS_RATIO = 0.75
+
+# Search engines cut meta descriptions at about 160 characters
+META_DESCRIPTION_MAX = 160
+
+MIN_KEYWORDS = 3
+
+# Section markers the parser should have stripped, left in by a malformed response
+SECTION_MARKER = re.compile(r"^\s*(TITLE|META_DESCRIPTION|CONTENT|KEYWORDS|POST|HOOK|CTA):", re.MULTILINE)
+
+# Template placeholders the model was meant to fill in, e.g. "[Company Name]"
+PLACEHOLDER = re.compile(r"\[(insert|your|company|name|link|url|date|number|x)\b[^\]]*\]", re.IGNORECASE)
+
+
+def _common_issues(post: dict) -> List[str]:
+    issues = []
+    content = post.get("content", "")
+    if post.get("metadata", {}).get("stop_reason") == "max_tokens":
+        issues.append("cut off at max_tokens")
+    if SECTION_MARKER.search(content):
+        issues.append("section markers left in the content")
+    if PLACEHOLDER.search(content):
+        issues.append("unfilled placeholder")
+    return issues
+
+
+def blog_quality_issues(post: dict, template: dict) -> List[str]:
+    """
+    Check a blog post against its template's "word_count" range and the SEO
+    fields the prompt asks for.
+
+    Returns:
+        A description of each failed check; empty if the post passes
+    """
+    issues = _common_issues(post)
+    min_words = min(int(n) for n in re.findall(r"\d+", template["word_count"]))
+    words = len(post.get("content", "").split())
+    if words < min_words * MIN_WORDS_RATIO:
+        issues.append(f"{words} words, short of the {min_words}-word minimum")
+    if not post.get("title"):
+        issues.append("missing title")
+    meta = post.get("meta_description", "")
+    if not meta:
+        issues.append("missing meta description")
+    elif len(meta) > META_DESCRIPTION_MAX:
+        issues.append(f"meta description over {META_DESCRIPTION_MAX} characters")
+    if len([k for k in post.get("keywords", []) if k]) < MIN_KEYWORDS:
+        issues.append(f"fewer than {MIN_KEYWORDS} keywords")
+    if not re.search(r"^#{2,3} ", post.get("content", ""), re.MULTILINE):
+        issues.append("no section headings")
+    return issues
+
+
+def linkedin_quality_issues(post: dict, template: dict) -> List[str]:
+    """
+    Check a LinkedIn post against its template's "character_limit" and the
+    hook and call to action the prompt asks for.
+
+    Returns:
+        A description of each failed check; empty if the post passes
+    """
+    issues = _common_issues(post)
+    limit = template["character_limit"]
+    length = len(post.get("content", ""))
+    if length > limit * LENGTH_TOLERANCE:
+        issues.append(f"{length} characters, over the {limit}-character limit")
+    elif length < limit * MIN_LENGTH_RATIO:
+        issues.append(f"{length} characters, too short for the {limit}-character format")
+    if not post.get("hook"):
+        issues.append("missing hook")
+    if not post.get("cta"):
+        issues.append("missing call to action")
+    return issues
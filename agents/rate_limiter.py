@@ -0,0 +1,162 @@
+"""Rate limiting for Anthropic API calls."""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from config import RATE_LIMIT_RPM, RATE_LIMIT_ITPM, RATE_LIMIT_OTPM, RATE_LIMIT_DB
+
+
+class SharedRateLimiter:
+    """
+    Token buckets for requests, input tokens and output tokens per minute,
+    shared by every process that opens the same SQLite file.
+
+    Each bucket holds up to one minute's allowance and refills continuously,
+    mirroring how the API meters its own limits. acquire() takes what a
+    request is expected to use from every bucket at once, sleeping while any
+    is short; settle() corrects the estimate once the actual usage is known.
+    The database is only locked for the read-modify-write of the levels, so
+    many CLI runs, daemons and worker processes can share it.
+
+    Args:
+        db_path: SQLite file holding the bucket levels
+        requests_per_minute: Request limit, or None for no limit
+        input_tokens_per_minute: Input token limit, or None
+        output_tokens_per_minute: Output token limit, or None
+    """
+
+    # Longest single sleep, so a waiter notices tokens refunded by other processes
+    MAX_SLEEP = 2.0
+
+    def __init__(
+        self,
+        db_path: str,
+        requests_per_minute: Optional[int] = None,
+        input_tokens_per_minute: Optional[int] = None,
+        output_tokens_per_minute: Optional[int] = None,
+    ):
+        limits = {
+            "requests": requests_per_minute,
+            "input_tokens": input_tokens_per_minute,
+            "output_tokens": output_tokens_per_minute,
+        }
+        self.limits = {name: float(limit) for name, limit in limits.items() if limit}
+        if not self.limits:
+            raise ValueError("At least one per-minute limit must be set")
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            db_path, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS buckets (
+                name TEXT PRIMARY KEY,
+                level REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+
+    def _update(self, change: Callable[[Dict[str, float]], bool]) -> bool:
+        """
+        Refill the buckets, let `change` edit the levels in place and save
+        them if it returns True, all in one write transaction.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                rows = {
+                    name: (level, updated_at)
+                    for name, level, updated_at in self._conn.execute(
+                        "SELECT name, level, updated_at FROM buckets"
+                    )
+                }
+                levels = {}
+                for name, limit in self.limits.items():
+                    level, updated_at = rows.get(name, (limit, now))
+                    refill = max(0.0, now - updated_at) * limit / 60
+                    levels[name] = min(limit, level + refill)
+
+                changed = change(levels)
+                if changed:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO buckets (name, level, updated_at) VALUES (?, ?, ?)",
+                        [(name, min(self.limits[name], level), now) for name, level in levels.items()],
+                    )
+                self._conn.execute("COMMIT")
+                return changed
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def acquire(self, input_tokens: int = 0, output_tokens: int = 0):
+        """Block until one request with the given token estimates fits in every bucket."""
+        wanted = {"requests": 1, "input_tokens": input_tokens, "output_tokens": output_tokens}
+        # A request larger than a whole minute's allowance waits for a full bucket
+        wanted = {name: min(amount, self.limits[name]) for name, amount in wanted.items() if name in self.limits}
+        wait = 0.0
+
+        def take(levels: Dict[str, float]) -> bool:
+            nonlocal wait
+            short = [(amount - levels[name]) * 60 / self.limits[name]
+                     for name, amount in wanted.items() if levels[name] < amount]
+            if short:
+                wait = max(short)
+                return False
+            for name, amount in wanted.items():
+                levels[name] -= amount
+            return True
+
+        while not self._update(take):
+            # Jitter keeps waiting processes from retrying in lockstep
+            time.sleep(min(wait, self.MAX_SLEEP) + random.uniform(0, 0.05))
+
+    def settle(self, input_tokens: int = 0, output_tokens: int = 0):
+        """
+        Correct an earlier acquire() by the difference between actual and
+        estimated usage: positive values take more, negative values refund.
+        Buckets may go negative, which delays the next acquire().
+        """
+        deltas = {"input_tokens": input_tokens, "output_tokens": output_tokens}
+        deltas = {name: delta for name, delta in deltas.items() if name in self.limits and delta}
+        if not deltas:
+            return
+
+        def apply(levels: Dict[str, float]) -> bool:
+            for name, delta in deltas.items():
+                levels[name] -= delta
+            return True
+
+        self._update(apply)
+
+
+_shared_limiter: Optional[SharedRateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def shared_rate_limiter() -> Optional[SharedRateLimiter]:
+    """
+    Get the process-wide limiter configured by RATE_LIMIT_RPM/ITPM/OTPM, or
+    None when no limit is set.
+    """
+    global _shared_limiter
+    if not (RATE_LIMIT_RPM or RATE_LIMIT_ITPM or RATE_LIMIT_OTPM):
+        return None
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = SharedRateLimiter(
+                RATE_LIMIT_DB,
+                requests_per_minute=RATE_LIMIT_RPM,
+                input_tokens_per_minute=RATE_LIMIT_ITPM,
+                output_tokens_per_minute=RATE_LIMIT_OTPM,
+            )
+        return _shared_limiter
@@ -0,0 +1,214 @@
+"""Retry, backoff and circuit breaking around Anthropic API calls."""
+
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional, Tuple
+
+from config import (
+    RETRY_MAX_ATTEMPTS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_COOLDOWN,
+)
+
+
+# Status codes worth retrying: timeouts, lock conflicts, rate limits,
+# server errors and 529 "overloaded"
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the API while the circuit breaker is open."""
+
+    def __init__(self, retry_at: float):
+        self.retry_at = retry_at
+        wait = max(0.0, retry_at - time.time())
+        super().__init__(f"API circuit breaker open; retrying in {wait:.0f}s")
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an API error is transient and the request may succeed if repeated."""
+    # Deferred so the scheduler can import this module without loading the SDK
+    import anthropic
+
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    if isinstance(error, anthropic.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+def is_overload(error: Exception) -> bool:
+    """Whether an error signals the API is rate limiting or overloaded."""
+    import anthropic
+
+    return isinstance(error, anthropic.APIStatusError) and error.status_code in (429, 503, 529)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Read the server's requested delay, in seconds, from an error's headers."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, deferring to retry-after headers."""
+
+    def __init__(
+        self,
+        max_attempts: int = RETRY_MAX_ATTEMPTS,
+        base_delay: float = RETRY_BASE_DELAY,
+        max_delay: float = RETRY_MAX_DELAY,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, error: Exception) -> float:
+        """Seconds to wait before retry number `attempt` (1-based)."""
+        requested = retry_after(error)
+        if requested is not None:
+            return min(requested, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests after sustained overload.
+
+    After `failure_threshold` consecutive overload errors the circuit opens and
+    every call fails fast with CircuitOpenError for `cooldown` seconds. The
+    first call after the cooldown is let through as a probe: success closes the
+    circuit, another overload reopens it.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        cooldown: float = CIRCUIT_COOLDOWN,
+    ):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def retry_at(self) -> Optional[float]:
+        """When an open circuit will next allow a probe, or None if closed."""
+        if self.opened_at is None:
+            return None
+        return self.opened_at + self.cooldown
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.opened_at is not None and (
+                self._probing or time.time() < self.opened_at + self.cooldown
+            )
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a request may be sent now."""
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if self._probing or time.time() < self.opened_at + self.cooldown:
+                raise CircuitOpenError(self.opened_at + self.cooldown)
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self, error: Exception):
+        with self._lock:
+            if not is_overload(error):
+                self._probing = False
+                return
+
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+            self._probing = False
+
+
+# Shared by every agent in the process so overload seen by one pauses all
+default_circuit_breaker = CircuitBreaker()
+
+
+def call_with_retry(
+    call: Callable,
+    policy: RetryPolicy,
+    breaker: Optional[CircuitBreaker] = None,
+) -> Tuple[object, int]:
+    """
+    Call `call()` and retry transient API errors.
+
+    Returns:
+        The call's result and the number of retries it took
+    """
+    attempt = 0
+    while True:
+        if breaker:
+            breaker.before_call()
+        try:
+            result = call()
+        except Exception as e:
+            if breaker:
+                breaker.record_failure(e)
+            attempt += 1
+            if not is_retryable(e) or attempt >= policy.max_attempts:
+                raise
+            time.sleep(policy.delay(attempt, e))
+            continue
+
+        if breaker:
+            breaker.record_success()
+        return result, attempt
+
+
+async def acall_with_retry(
+    call: Callable,
+    policy: RetryPolicy,
+    breaker: Optional[CircuitBreaker] = None,
+) -> Tuple[object, int]:
+    """Async counterpart of call_with_retry; `call()` must return an awaitable."""
+    attempt = 0
+    while True:
+        if breaker:
+            breaker.before_call()
+        try:
+            result = await call()
+        except Exception as e:
+            if breaker:
+                breaker.record_failure(e)
+            attempt += 1
+            if not is_retryable(e) or attempt >= policy.max_attempts:
+                raise
+            await asyncio.sleep(policy.delay(attempt, e))
+            continue
+
+        if breaker:
+            breaker.record_success()
+        return result, attempt
@@ -0,0 +1,118 @@
+"""On-disk, content-addressed cache for Anthropic API responses."""
+
+import hashlib
+import json
+import os
+import time
+from typing import Optional
+
+from anthropic.types import Message
+
+from config import RESPONSE_CACHE_DIR, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES
+from file_utils import atomic_write
+
+
+class ResponseCache:
+    """
+    Cache of API responses keyed by a hash of the request.
+
+    Each entry is a JSON file named by the SHA-256 of the request parameters
+    that determine the output (model, system prompt, messages, max_tokens).
+    Entries expire `ttl` seconds after they were stored, by the "created_at"
+    time recorded in the entry, however often they are hit. Once the cache
+    holds more than `max_entries` files the least recently used ones are
+    evicted. A hit bumps the file's mtime, which is what LRU ordering is
+    based on.
+    """
+
+    def __init__(
+        self,
+        directory: str = RESPONSE_CACHE_DIR,
+        ttl: int = RESPONSE_CACHE_TTL,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    def key(self, params: dict) -> str:
+        """Hash the parts of a request that determine its response."""
+        material = {
+            "model": params.get("model"),
+            "system": params.get("system"),
+            "messages": params.get("messages"),
+            "max_tokens": params.get("max_tokens"),
+        }
+        # Structured requests answer through a tool, so they must not share
+        # entries with plain-text requests for the same prompt
+        for name in ("tools", "tool_choice"):
+            if name in params:
+                material[name] = params[name]
+        encoded = json.dumps(material, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, params: dict) -> Optional[Message]:
+        """Return the cached response for a request, or None on a miss."""
+        path = self._path(self.key(params))
+
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+            # Entries written before "created_at" was recorded count as expired
+            if time.time() - entry.get("created_at", 0) > self.ttl:
+                os.remove(path)
+                return None
+            message = Message.model_validate(entry["message"])
+        except (OSError, ValueError, KeyError, AttributeError):
+            return None
+
+        os.utime(path)
+        return message
+
+    def put(self, params: dict, message: Message):
+        """Store a response, then evict old entries if the cache is over size."""
+        entry = {"created_at": time.time(), "message": message.model_dump(mode="json")}
+        atomic_write(self._path(self.key(params)), json.dumps(entry))
+        self._evict()
+
+    def _evict(self):
+        """Drop expired entries and the least recently used ones beyond max_entries."""
+        entries = []
+        now = time.time()
+
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+
+            # mtime is never earlier than created_at, so this entry has expired;
+            # entries hit since they were stored are expired by get()
+            if now - mtime > self.ttl:
+                self._remove(path)
+            else:
+                entries.append((mtime, path))
+
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_entries)]:
+            self._remove(path)
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        """Remove every cached response."""
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                self._remove(os.path.join(self.directory, name))
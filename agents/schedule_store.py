@@ -0,0 +1,676 @@
+"""Persistent storage backends for scheduled content tasks."""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from file_utils import atomic_write, file_lock
+
+
+def _claimable(task: dict, now: str, due_only: bool = True) -> bool:
+    """
+    Whether a task is pending and not leased (and due, with `due_only`), or
+    its worker's lease has run out.
+    """
+    if task["status"] == "pending":
+        return not due_only or task["scheduled_time"] <= now
+    if task["status"] == "running":
+        return (task.get("lease_expires_at") or "") <= now
+    return False
+
+
+def _batch_claimable(task: dict, batch_id: str, now: str) -> bool:
+    """Whether a task waits on a batch's results and no worker holds a live lease on it."""
+    return (
+        task["status"] == "batched"
+        and task.get("batch_id") == batch_id
+        and (task.get("lease_expires_at") or "") <= now
+    )
+
+
+def _leased(task: dict, worker_id: str, lease_until: str, status: str = "running") -> dict:
+    return {**task, "status": status, "lease_owner": worker_id, "lease_expires_at": lease_until}
+
+
+def _released(task: dict) -> dict:
+    return {**task, "lease_owner": None, "lease_expires_at": None}
+
+
+def _file_signature(path: str) -> Optional[tuple]:
+    """Identity, modification time and size of a file, or None if it is missing."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class TaskStore:
+    """
+    Interface for scheduled task storage.
+
+    Tasks are exchanged as plain dicts (the fields of ScheduledTask) so that
+    backends do not depend on the scheduler module. Scheduled times are ISO
+    strings written by datetime.isoformat(), which sort chronologically, so
+    due-time comparisons are done on the strings directly.
+    """
+
+    def reload(self) -> bool:
+        """
+        Pick up changes written by other processes.
+
+        Returns:
+            Whether anything changed since the last load or reload
+        """
+        return False
+
+    def all_tasks(self) -> List[dict]:
+        raise NotImplementedError
+
+    def get(self, task_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def put(self, tasks: Iterable[dict]):
+        """Insert or update one or more tasks."""
+        raise NotImplementedError
+
+    def delete(self, task_ids: Iterable[str]):
+        raise NotImplementedError
+
+    def due_tasks(self, now: str) -> List[dict]:
+        """Get pending tasks scheduled at or before `now`, earliest first."""
+        raise NotImplementedError
+
+    def tasks_by_status(self, status: str) -> List[dict]:
+        raise NotImplementedError
+
+    def count_by_status(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+    def recent_tasks(self, limit: int) -> List[dict]:
+        """Get the most recently created tasks, oldest first."""
+        raise NotImplementedError
+
+    # Leasing: several workers, possibly on different hosts, drain one schedule.
+    # A worker claims a task by leasing it until a deadline, renews the lease
+    # while it runs and releases it with the final state. Claims are atomic
+    # across processes, and a task whose worker stops renewing becomes
+    # claimable again once the lease expires.
+
+    def claim_due(
+        self, now: str, worker_id: str, lease_until: str, limit: Optional[int] = 1
+    ) -> List[dict]:
+        """
+        Lease due tasks to a worker.
+
+        Claims pending tasks scheduled at or before `now` and running tasks
+        whose lease has expired, earliest first, marking them "running" under
+        `worker_id` until `lease_until`.
+
+        Returns:
+            The claimed tasks (at most `limit`, or all when None)
+        """
+        raise NotImplementedError
+
+    def claim(self, task_id: str, now: str, worker_id: str, lease_until: str) -> Optional[dict]:
+        """
+        Lease one task to a worker, due or not, as claim_due would.
+
+        Returns:
+            The claimed task, or None if it does not exist, is not pending, or
+            another worker holds a live lease on it
+        """
+        raise NotImplementedError
+
+    def claim_batched(self, batch_id: str, now: str, worker_id: str, lease_until: str) -> List[dict]:
+        """
+        Lease a Message Batch's tasks to the worker that will collect its results.
+
+        Claims the batch's tasks that are not leased or whose lease has
+        expired. They keep the "batched" status, so a collector that dies
+        leaves them to be claimed again rather than resubmitted.
+
+        Returns:
+            The claimed tasks, in creation order
+        """
+        raise NotImplementedError
+
+    def renew_leases(self, task_ids: Iterable[str], worker_id: str, lease_until: str) -> List[str]:
+        """
+        Extend a worker's leases.
+
+        Returns:
+            The IDs of the tasks the worker still holds
+        """
+        raise NotImplementedError
+
+    def release(self, task: dict, worker_id: str) -> bool:
+        """
+        Save a task's final state and clear its lease, if `worker_id` still holds it.
+
+        Returns:
+            False if the lease was lost to another worker (nothing is written)
+        """
+        raise NotImplementedError
+
+
+class JournalStore(TaskStore):
+    """
+    Schedule storage as a snapshot plus an append-only journal.
+
+    Every task change is appended to the journal as one JSON line, so
+    scheduling N tasks costs O(N) writes rather than rewriting the whole
+    schedule each time. Once the journal grows past `compact_every` events
+    the full task list is written to the snapshot (temp file plus atomic
+    rename) and the journal is truncated. Loading reads the snapshot and
+    replays the journal over it; a torn final line from a crash mid-append
+    is ignored.
+
+    Journal events look like {"op": "put", "task": {...}} or
+    {"op": "delete", "task_id": "..."}. The snapshot keeps the original
+    schedule.json format: a JSON list of task dicts.
+
+    Writes and lease operations hold an advisory lock on schedule.lock, so
+    processes sharing the files (on one host or over a network volume) never
+    interleave appends or compaction. Under the lock they first catch up on
+    events other processes appended, then append their own, so concurrent
+    writers merge rather than overwrite each other.
+
+    reload() is cheap enough to poll: it compares the files' inode, mtime and
+    size with what was last read, replays only the journal bytes appended
+    since then, and falls back to a full load when the snapshot was replaced
+    by a compaction.
+    """
+
+    def __init__(self, snapshot_path: str, compact_every: int = 1000):
+        self.snapshot_path = snapshot_path
+        self.journal_path = os.path.splitext(snapshot_path)[0] + ".journal.jsonl"
+        self.lock_path = os.path.splitext(snapshot_path)[0] + ".lock"
+        self.compact_every = compact_every
+        self.journal_events = 0
+        self._torn_tail = False
+        self._journal_offset = 0
+        self._snapshot_signature: Optional[tuple] = None
+        self._tasks: Dict[str, dict] = {}
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self.load()
+
+    @contextmanager
+    def _locked(self):
+        """Hold the thread lock and, at the outermost level, the cross-process file lock."""
+        with self._lock:
+            if self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+
+            # Closing any handle on the lock file drops the process's lock, so
+            # nested sections must not take it again
+            with file_lock(self.lock_path):
+                self._lock_depth = 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth = 0
+
+    def load(self) -> List[dict]:
+        """Read the snapshot and replay the whole journal over it."""
+        with self._lock:
+            # Taken before reading, so a compaction racing with the read is
+            # seen as a change on the next reload
+            self._snapshot_signature = _file_signature(self.snapshot_path)
+            tasks: Dict[str, dict] = {}
+            if os.path.exists(self.snapshot_path):
+                with open(self.snapshot_path, "r") as f:
+                    for task in json.load(f):
+                        tasks[task["task_id"]] = task
+
+            self._tasks = tasks
+            self.journal_events = 0
+            self._journal_offset = 0
+            self._replay_journal()
+            return list(tasks.values())
+
+    def reload(self) -> bool:
+        with self._lock:
+            if _file_signature(self.snapshot_path) != self._snapshot_signature:
+                self.load()
+                return True
+
+            journal = _file_signature(self.journal_path)
+            size = journal[2] if journal else 0
+            if size < self._journal_offset:
+                # Truncated without a new snapshot; start over
+                self.load()
+                return True
+            if size == self._journal_offset:
+                return False
+            return self._replay_journal()
+
+    def _replay_journal(self) -> bool:
+        """
+        Apply the complete journal lines written since the last read.
+
+        A trailing partial line is left unread: it is either still being
+        written or was torn by a crash, in which case the next append starts
+        on a fresh line and the fragment is skipped as invalid JSON.
+
+        Returns:
+            Whether any events were applied
+        """
+        try:
+            with open(self.journal_path, "rb") as f:
+                f.seek(self._journal_offset)
+                data = f.read()
+        except FileNotFoundError:
+            self._torn_tail = False
+            return False
+
+        end = data.rfind(b"\n") + 1
+        self._torn_tail = end < len(data)
+        self._journal_offset += end
+
+        applied = False
+        for line in data[:end].splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            self._apply(self._tasks, event)
+            self.journal_events += 1
+            applied = True
+        return applied
+
+    def _apply(self, tasks: Dict[str, dict], event: dict):
+        if event.get("op") == "put":
+            tasks[event["task"]["task_id"]] = event["task"]
+        elif event.get("op") == "delete":
+            tasks.pop(event["task_id"], None)
+
+    def _append(self, events: List[dict]):
+        lines = "".join(json.dumps(event) + "\n" for event in events)
+        if not lines:
+            return
+
+        # Start on a fresh line if a crash left half an event at the end
+        if self._torn_tail:
+            lines = "\n" + lines
+            self._torn_tail = False
+
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        with open(self.journal_path, "ab") as f:
+            f.write(lines.encode("utf-8"))
+            f.flush()
+            # Our own events are already applied; the next reload starts after them
+            self._journal_offset = f.tell()
+        self.journal_events += len(events)
+
+        if self.journal_events >= self.compact_every:
+            self.compact()
+
+    def put(self, tasks: Iterable[dict]):
+        with self._locked():
+            self.reload()
+            events = []
+            for task in tasks:
+                self._tasks[task["task_id"]] = task
+                events.append({"op": "put", "task": task})
+            self._append(events)
+
+    def delete(self, task_ids: Iterable[str]):
+        with self._locked():
+            self.reload()
+            events = []
+            for task_id in task_ids:
+                self._tasks.pop(task_id, None)
+                events.append({"op": "delete", "task_id": task_id})
+            self._append(events)
+
+    def compact(self):
+        """
+        Write the full task list as the new snapshot and reset the journal.
+
+        The snapshot is renamed into place before the journal is truncated, and
+        replaying puts and deletes is idempotent, so a crash between the two
+        steps loses nothing. The journal is re-read first so events appended
+        by other processes are folded into the snapshot rather than dropped.
+        """
+        with self._locked():
+            self.reload()
+            atomic_write(self.snapshot_path, json.dumps(list(self._tasks.values()), indent=2))
+            if os.path.exists(self.journal_path):
+                open(self.journal_path, "w").close()
+            self._snapshot_signature = _file_signature(self.snapshot_path)
+            self.journal_events = 0
+            self._journal_offset = 0
+            self._torn_tail = False
+
+    def all_tasks(self) -> List[dict]:
+        with self._lock:
+            return list(self._tasks.values())
+
+    def get(self, task_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._tasks.get(task_id)
+
+    def due_tasks(self, now: str) -> List[dict]:
+        with self._lock:
+            due = [
+                t for t in self._tasks.values()
+                if t["status"] == "pending" and t["scheduled_time"] <= now
+            ]
+        return sorted(due, key=lambda t: t["scheduled_time"])
+
+    def tasks_by_status(self, status: str) -> List[dict]:
+        with self._lock:
+            return [t for t in self._tasks.values() if t["status"] == status]
+
+    def count_by_status(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for task in self._tasks.values():
+                counts[task["status"]] = counts.get(task["status"], 0) + 1
+        return counts
+
+    def recent_tasks(self, limit: int) -> List[dict]:
+        with self._lock:
+            return list(self._tasks.values())[-limit:]
+
+    def claim_due(
+        self, now: str, worker_id: str, lease_until: str, limit: Optional[int] = 1
+    ) -> List[dict]:
+        with self._locked():
+            self.reload()
+            due = sorted(
+                (t for t in self._tasks.values() if _claimable(t, now)),
+                key=lambda t: t["scheduled_time"],
+            )
+            claimed = [_leased(t, worker_id, lease_until) for t in due[:limit]]
+            self.put(claimed)
+            return claimed
+
+    def claim(self, task_id: str, now: str, worker_id: str, lease_until: str) -> Optional[dict]:
+        with self._locked():
+            self.reload()
+            task = self._tasks.get(task_id)
+            if task is None or not _claimable(task, now, due_only=False):
+                return None
+            claimed = _leased(task, worker_id, lease_until)
+            self.put([claimed])
+            return claimed
+
+    def claim_batched(self, batch_id: str, now: str, worker_id: str, lease_until: str) -> List[dict]:
+        with self._locked():
+            self.reload()
+            claimed = [
+                _leased(t, worker_id, lease_until, status="batched")
+                for t in self._tasks.values() if _batch_claimable(t, batch_id, now)
+            ]
+            self.put(claimed)
+            return claimed
+
+    def renew_leases(self, task_ids: Iterable[str], worker_id: str, lease_until: str) -> List[str]:
+        with self._locked():
+            self.reload()
+            held = [
+                self._tasks[task_id] for task_id in task_ids
+                if self._tasks.get(task_id, {}).get("lease_owner") == worker_id
+            ]
+            self.put({**t, "lease_expires_at": lease_until} for t in held)
+            return [t["task_id"] for t in held]
+
+    def release(self, task: dict, worker_id: str) -> bool:
+        with self._locked():
+            self.reload()
+            current = self._tasks.get(task["task_id"])
+            if current is None or current.get("lease_owner") != worker_id:
+                return False
+            self.put([_released(task)])
+            return True
+
+
+class SQLiteTaskStore(TaskStore):
+    """
+    Schedule storage in a SQLite database.
+
+    Status and scheduled time are real columns with a composite index, so
+    due-task lookup is an index range scan and status counts are a GROUP BY.
+    The remaining task fields live in a JSON column, which lets ScheduledTask
+    gain fields without a schema migration. Lease owner and expiry are also
+    columns so claims can filter on them; claims run in BEGIN IMMEDIATE
+    transactions, which take SQLite's write lock up front, so concurrent
+    workers never claim the same task. reload() checks SQLite's data_version,
+    so polling for other processes' commits costs one PRAGMA.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            db_path, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                task_id TEXT NOT NULL UNIQUE,
+                status TEXT NOT NULL,
+                scheduled_time TEXT NOT NULL,
+                data TEXT NOT NULL,
+                lease_owner TEXT,
+                lease_expires_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_tasks_status_time
+                ON tasks (status, scheduled_time);
+            """
+        )
+        self._add_lease_columns()
+        self._data_version = self._get_data_version()
+
+    def _add_lease_columns(self):
+        """
+        Add the lease columns to a database created before leases existed.
+
+        The check and the ALTER run in one write transaction, so workers
+        opening the same old database at once add each column only once.
+        """
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+            for column in ("lease_owner", "lease_expires_at"):
+                if column not in columns:
+                    try:
+                        self._conn.execute(f"ALTER TABLE tasks ADD COLUMN {column} TEXT")
+                    except sqlite3.OperationalError as e:
+                        # Added by a process that does not take the write lock first
+                        if "duplicate column" not in str(e):
+                            raise
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _get_data_version(self) -> int:
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def reload(self) -> bool:
+        # Queries always read the database; data_version only changes when
+        # another connection commits, which tells pollers to look again
+        version = self._get_data_version()
+        changed = version != self._data_version
+        self._data_version = version
+        return changed
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _write(self, tasks: Iterable[dict]):
+        self._conn.executemany(
+            """
+            INSERT INTO tasks (task_id, status, scheduled_time, lease_owner, lease_expires_at, data)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(task_id) DO UPDATE SET
+                status = excluded.status,
+                scheduled_time = excluded.scheduled_time,
+                lease_owner = excluded.lease_owner,
+                lease_expires_at = excluded.lease_expires_at,
+                data = excluded.data
+            """,
+            [
+                (t["task_id"], t["status"], t["scheduled_time"],
+                 t.get("lease_owner"), t.get("lease_expires_at"), json.dumps(t))
+                for t in tasks
+            ],
+        )
+
+    def _query(self, sql: str, args: tuple = ()) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def all_tasks(self) -> List[dict]:
+        return self._query("SELECT data FROM tasks ORDER BY seq")
+
+    def get(self, task_id: str) -> Optional[dict]:
+        rows = self._query("SELECT data FROM tasks WHERE task_id = ?", (task_id,))
+        return rows[0] if rows else None
+
+    def put(self, tasks: Iterable[dict]):
+        with self._transaction():
+            self._write(tasks)
+
+    def delete(self, task_ids: Iterable[str]):
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM tasks WHERE task_id = ?",
+                [(task_id,) for task_id in task_ids],
+            )
+
+    def due_tasks(self, now: str) -> List[dict]:
+        return self._query(
+            """
+            SELECT data FROM tasks
+            WHERE status = 'pending' AND scheduled_time <= ?
+            ORDER BY scheduled_time
+            """,
+            (now,),
+        )
+
+    def tasks_by_status(self, status: str) -> List[dict]:
+        return self._query("SELECT data FROM tasks WHERE status = ? ORDER BY seq", (status,))
+
+    def count_by_status(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM tasks GROUP BY status"
+            ).fetchall()
+        return dict(rows)
+
+    def recent_tasks(self, limit: int) -> List[dict]:
+        rows = self._query("SELECT data FROM tasks ORDER BY seq DESC LIMIT ?", (limit,))
+        return rows[::-1]
+
+    def claim_due(
+        self, now: str, worker_id: str, lease_until: str, limit: Optional[int] = 1
+    ) -> List[dict]:
+        with self._transaction():
+            rows = self._conn.execute(
+                """
+                SELECT data FROM tasks
+                WHERE (status = 'pending' AND scheduled_time <= ?)
+                   OR (status = 'running' AND COALESCE(lease_expires_at, '') <= ?)
+                ORDER BY scheduled_time
+                LIMIT ?
+                """,
+                (now, now, -1 if limit is None else limit),
+            ).fetchall()
+            claimed = [_leased(json.loads(row[0]), worker_id, lease_until) for row in rows]
+            self._write(claimed)
+        return claimed
+
+    def claim(self, task_id: str, now: str, worker_id: str, lease_until: str) -> Optional[dict]:
+        with self._transaction():
+            row = self._conn.execute(
+                """
+                SELECT data FROM tasks
+                WHERE task_id = ?
+                  AND (status = 'pending'
+                       OR (status = 'running' AND COALESCE(lease_expires_at, '') <= ?))
+                """,
+                (task_id, now),
+            ).fetchone()
+            if row is None:
+                return None
+            claimed = _leased(json.loads(row[0]), worker_id, lease_until)
+            self._write([claimed])
+        return claimed
+
+    def claim_batched(self, batch_id: str, now: str, worker_id: str, lease_until: str) -> List[dict]:
+        with self._transaction():
+            rows = self._conn.execute(
+                """
+                SELECT data FROM tasks
+                WHERE status = 'batched' AND json_extract(data, '$.batch_id') = ?
+                  AND COALESCE(lease_expires_at, '') <= ?
+                ORDER BY seq
+                """,
+                (batch_id, now),
+            ).fetchall()
+            claimed = [_leased(json.loads(row[0]), worker_id, lease_until, status="batched") for row in rows]
+            self._write(claimed)
+        return claimed
+
+    def renew_leases(self, task_ids: Iterable[str], worker_id: str, lease_until: str) -> List[str]:
+        task_ids = list(task_ids)
+        if not task_ids:
+            return []
+        with self._transaction():
+            rows = self._conn.execute(
+                f"""
+                SELECT data FROM tasks
+                WHERE lease_owner = ? AND task_id IN ({",".join("?" * len(task_ids))})
+                """,
+                (worker_id, *task_ids),
+            ).fetchall()
+            held = [{**json.loads(row[0]), "lease_expires_at": lease_until} for row in rows]
+            self._write(held)
+        return [t["task_id"] for t in held]
+
+    def release(self, task: dict, worker_id: str) -> bool:
+        with self._transaction():
+            row = self._conn.execute(
+                "SELECT lease_owner FROM tasks WHERE task_id = ?", (task["task_id"],)
+            ).fetchone()
+            if row is None or row[0] != worker_id:
+                return False
+            self._write([_released(task)])
+        return True
+
+
+def create_store(backend: str, output_dir: str) -> TaskStore:
+    """Create the task store for a backend name ("journal" or "sqlite")."""
+    if backend == "journal":
+        return JournalStore(os.path.join(output_dir, "schedule.json"))
+    if backend == "sqlite":
+        return SQLiteTaskStore(os.path.join(output_dir, "schedule.db"))
+    raise ValueError(f"Unknown schedule backend: {backend}. Available: ['journal', 'sqlite']")
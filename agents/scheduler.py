@@ -1,77 +1,157 @@
 """Content scheduling system for automated content generation."""
 
 import os
-import json
+import heapq
 import random
-import schedule
+import socket
+import threading
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, List, Callable
+from typing import Dict, Optional, List, Callable, Iterator, Tuple
 from dataclasses import dataclass, asdict
 
-from config import TOPICS, OUTPUT_DIR
-from blog_agent import BlogAgent
-from linkedin_agent import LinkedInAgent
+from config import (
+    TOPICS,
+    OUTPUT_DIR,
+    SCHEDULE_BACKEND,
+    SCHEDULE_POLL_INTERVAL,
+    MAX_TASK_ATTEMPTS,
+    TASK_REQUEUE_DELAY,
+    METRICS_FILE,
+    LEASE_DURATION,
+    RATE_LIMIT_ITPM,
+    RATE_LIMIT_OTPM,
+    RATE_LIMIT_DB,
+)
+from dedup import DuplicateContentError
+from file_utils import read_post
+from rate_limiter import SharedRateLimiter
+from resilience import CircuitOpenError, default_circuit_breaker, is_retryable
+from schedule_store import TaskStore, create_store
+from telemetry import GenerationMetrics
+from wakeup import WakeupListener, notify
 
 
 @dataclass
 class ScheduledTask:
     """Represents a scheduled content generation task."""
     task_id: str
-    task_type: str  # "blog" or "linkedin"
+    task_type: str  # "blog", "linkedin" or "repurpose"
     topic: str
     template_type: str
     scheduled_time: str
-    status: str  # "pending", "completed", "failed"
+    status: str  # "pending", "running", "batched", "completed", "failed"
     created_at: str
     completed_at: Optional[str] = None
     output_file: Optional[str] = None
     error: Optional[str] = None
+    batch_id: Optional[str] = None
+    attempts: int = 0
+    lease_owner: Optional[str] = None  # worker running the task
+    lease_expires_at: Optional[str] = None
+    # LinkedIn posts to derive: from a repurpose task's source_file, or from a
+    # blog task's output once it completes (as a follow-on repurpose task)
+    repurpose_count: int = 0
+    source_file: Optional[str] = None  # blog post a repurpose task derives from
+    output_files: Optional[List[str]] = None  # every post a repurpose task saved
+
+
+def _combined_metadata(posts: List[dict]) -> dict:
+    """Metadata for the call that produced `posts`, with their shares of usage and cost summed back up."""
+    metadata = dict(posts[0]["metadata"])
+    metadata["usage"] = {kind: sum(p["metadata"]["usage"][kind] for p in posts) for kind in metadata["usage"]}
+    costs = [p["metadata"]["cost_usd"] for p in posts]
+    metadata["cost_usd"] = None if None in costs else round(sum(costs), 6)
+    return metadata
+
+
+def _rotation(topics: List[str], templates: List[str]) -> Iterator[Tuple[str, str]]:
+    """Cycle through every (topic, template) pair, reshuffled each round."""
+    pairs = [(topic, template) for topic in topics for template in templates]
+    while True:
+        random.shuffle(pairs)
+        yield from pairs
 
 
 class ContentScheduler:
-    """Scheduler for automated content generation."""
+    """
+    Scheduler for automated content generation.
 
-    def __init__(self):
+    Any number of schedulers, on one host or several sharing the schedule
+    storage, can execute the same queue: each due task is claimed with a
+    time-limited lease under the scheduler's worker ID, renewed by a heartbeat
+    while it runs, and reclaimed by another worker if the lease runs out.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        store: Optional[TaskStore] = None,
+        worker_id: Optional[str] = None,
+        lease_duration: float = LEASE_DURATION,
+    ):
         self.blog_agent = None
         self.linkedin_agent = None
-        self.tasks: List[ScheduledTask] = []
-        self.schedule_file = os.path.join(OUTPUT_DIR, "schedule.json")
-        self._load_schedule()
+        self.store = store or create_store(SCHEDULE_BACKEND, OUTPUT_DIR)
+        self.wakeup_path = os.path.join(OUTPUT_DIR, "scheduler.sock")
+        # Overrides RATE_LIMIT_RPM on the shared buckets, keeping the token limits
+        self.rate_limiter = SharedRateLimiter(
+            RATE_LIMIT_DB,
+            requests_per_minute=requests_per_minute,
+            input_tokens_per_minute=RATE_LIMIT_ITPM,
+            output_tokens_per_minute=RATE_LIMIT_OTPM,
+        ) if requests_per_minute else None
+        self.circuit_breaker = default_circuit_breaker
+        self.metrics = GenerationMetrics()
+        self.metrics_path = METRICS_FILE
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_duration = lease_duration
+        self._lock = threading.RLock()
 
     def _init_agents(self):
         """Initialize agents lazily."""
+        # Imported here so schedule/status commands never load the Anthropic SDK
+        from blog_agent import BlogAgent
+        from linkedin_agent import LinkedInAgent
+
         if self.blog_agent is None:
-            self.blog_agent = BlogAgent()
+            self.blog_agent = BlogAgent(circuit_breaker=self.circuit_breaker, rate_limiter=self.rate_limiter)
         if self.linkedin_agent is None:
-            self.linkedin_agent = LinkedInAgent()
+            self.linkedin_agent = LinkedInAgent(circuit_breaker=self.circuit_breaker, rate_limiter=self.rate_limiter)
 
-    def _load_schedule(self):
-        """Load scheduled tasks from file."""
-        if os.path.exists(self.schedule_file):
-            try:
-                with open(self.schedule_file, "r") as f:
-                    data = json.load(f)
-                    self.tasks = [ScheduledTask(**task) for task in data]
-            except Exception as e:
-                print(f"Error loading schedule: {e}")
-                self.tasks = []
+    def _to_tasks(self, rows: List[dict]) -> List[ScheduledTask]:
+        return [ScheduledTask(**row) for row in rows]
+
+    def _save_tasks(self, *tasks: ScheduledTask):
+        """Persist the current state of changed tasks."""
+        with self._lock:
+            self.store.put([asdict(task) for task in tasks])
+
+    @property
+    def tasks(self) -> List[ScheduledTask]:
+        """All scheduled tasks, in creation order."""
+        return self._to_tasks(self.store.all_tasks())
 
-    def _save_schedule(self):
-        """Save scheduled tasks to file."""
-        os.makedirs(OUTPUT_DIR, exist_ok=True)
-        with open(self.schedule_file, "w") as f:
-            json.dump([asdict(task) for task in self.tasks], f, indent=2)
+    def recent_tasks(self, limit: int = 20) -> List[ScheduledTask]:
+        """Get the most recently created tasks, oldest first."""
+        return self._to_tasks(self.store.recent_tasks(limit))
+
+    def count_by_status(self) -> dict:
+        """Get the number of tasks in each status."""
+        return self.store.count_by_status()
 
     def _generate_task_id(self) -> str:
         """Generate a unique task ID."""
-        return f"task_{datetime.now().strftime('%Y%m%d%H%M%S')}_{random.randint(1000, 9999)}"
+        return f"task_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
 
     def schedule_blog_post(
         self,
         topic: str,
         template_type: str = "educational",
         scheduled_time: Optional[datetime] = None,
+        repurpose_count: int = 0,
     ) -> ScheduledTask:
         """
         Schedule a blog post for generation.
@@ -80,6 +160,8 @@ class ContentScheduler:
             topic: Topic key from TOPICS config
             template_type: Blog template type
             scheduled_time: When to generate (None = immediate)
+            repurpose_count: LinkedIn teasers to derive from the post once it
+                is saved, scheduled then as a repurpose task (0 = none)
 
         Returns:
             ScheduledTask object
@@ -95,9 +177,10 @@ class ContentScheduler:
             scheduled_time=scheduled_time.isoformat(),
             status="pending",
             created_at=datetime.now().isoformat(),
+            repurpose_count=repurpose_count,
         )
-        self.tasks.append(task)
-        self._save_schedule()
+        self._save_tasks(task)
+        notify(self.wakeup_path, task.task_id)
         return task
 
     def schedule_linkedin_post(
@@ -129,15 +212,66 @@ class ContentScheduler:
             status="pending",
             created_at=datetime.now().isoformat(),
         )
-        self.tasks.append(task)
-        self._save_schedule()
+        self._save_tasks(task)
+        notify(self.wakeup_path, task.task_id)
+        return task
+
+    def schedule_repurpose(
+        self,
+        source_file: str,
+        count: int = 3,
+        template_type: str = "insight",
+        scheduled_time: Optional[datetime] = None,
+        topic: Optional[str] = None,
+    ) -> ScheduledTask:
+        """
+        Schedule LinkedIn posts to be derived from a saved blog post.
+
+        Args:
+            source_file: Path of the blog post, as returned by BlogAgent.save_post
+            count: Number of LinkedIn posts to derive
+            template_type: LinkedIn template type
+            scheduled_time: When to generate (None = immediate)
+            topic: Topic of the blog post (None = read from its .json file)
+
+        Returns:
+            ScheduledTask object
+        """
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        if topic is None:
+            topic = read_post(source_file).get("metadata", {}).get("topic", "general")
+        if scheduled_time is None:
+            scheduled_time = datetime.now()
+
+        task = ScheduledTask(
+            task_id=self._generate_task_id(),
+            task_type="repurpose",
+            topic=topic,
+            template_type=template_type,
+            scheduled_time=scheduled_time.isoformat(),
+            status="pending",
+            created_at=datetime.now().isoformat(),
+            repurpose_count=count,
+            source_file=source_file,
+        )
+        self._save_tasks(task)
+        notify(self.wakeup_path, task.task_id)
         return task
 
+    def _schedule_follow_on(self, task: ScheduledTask):
+        """Schedule the repurpose task for a completed blog task that asked for teasers."""
+        if task.task_type != "blog" or not task.repurpose_count or not task.output_file:
+            return
+        follow_on = self.schedule_repurpose(task.output_file, task.repurpose_count, topic=task.topic)
+        print(f"Scheduled {task.repurpose_count} LinkedIn teasers for {task.task_id}: {follow_on.task_id}")
+
     def schedule_content_calendar(
         self,
         weeks: int = 4,
         blog_posts_per_week: int = 2,
         linkedin_posts_per_week: int = 3,
+        teasers_per_blog: int = 0,
     ) -> List[ScheduledTask]:
         """
         Generate a content calendar for multiple weeks.
@@ -146,6 +280,8 @@ class ContentScheduler:
             weeks: Number of weeks to schedule
             blog_posts_per_week: Blog posts per week
             linkedin_posts_per_week: LinkedIn posts per week
+            teasers_per_blog: LinkedIn teasers derived from each blog post
+                once it is generated
 
         Returns:
             List of scheduled tasks
@@ -155,6 +291,11 @@ class ContentScheduler:
         blog_templates = ["educational", "thought_leadership", "how_to_guide"]
         linkedin_templates = ["insight", "tips", "data_driven", "story"]
 
+        # Use every topic/template pairing once before repeating any, rather
+        # than drawing independently, which repeats pairings early
+        blog_pairs = _rotation(topics, blog_templates)
+        linkedin_pairs = _rotation(topics, linkedin_templates)
+
         start_date = datetime.now()
 
         for week in range(weeks):
@@ -165,10 +306,12 @@ class ContentScheduler:
                 post_day = week_start + timedelta(days=(i * 2) + 1)  # Tue, Thu
                 post_time = post_day.replace(hour=9, minute=0, second=0)
 
+                topic, template_type = next(blog_pairs)
                 task = self.schedule_blog_post(
-                    topic=random.choice(topics),
-                    template_type=random.choice(blog_templates),
+                    topic=topic,
+                    template_type=template_type,
                     scheduled_time=post_time,
+                    repurpose_count=teasers_per_blog,
                 )
                 new_tasks.append(task)
 
@@ -177,9 +320,10 @@ class ContentScheduler:
                 post_day = week_start + timedelta(days=(i * 2))  # Mon, Wed, Fri
                 post_time = post_day.replace(hour=8, minute=30, second=0)
 
+                topic, template_type = next(linkedin_pairs)
                 task = self.schedule_linkedin_post(
-                    topic=random.choice(topics),
-                    template_type=random.choice(linkedin_templates),
+                    topic=topic,
+                    template_type=template_type,
                     scheduled_time=post_time,
                 )
                 new_tasks.append(task)
@@ -187,82 +331,517 @@ class ContentScheduler:
         return new_tasks
 
     def execute_task(self, task: ScheduledTask) -> ScheduledTask:
-        """Execute a single scheduled task."""
+        """
+        Execute a single scheduled task now, whether or not it is due.
+
+        The task is leased to this worker first, as execute_pending_tasks
+        does, so a daemon or other workers draining the queue never run it
+        at the same time.
+
+        Returns:
+            The task, updated with its final state
+
+        Raises:
+            ValueError: If the task is not pending or another worker holds its lease
+        """
+        claimed = self.store.claim(task.task_id, datetime.now().isoformat(), self.worker_id, self._lease_until())
+        if claimed is None:
+            raise ValueError(f"Task {task.task_id} is not pending or is leased by another worker")
+        vars(task).update(claimed)
+
+        stop = threading.Event()
+        threading.Thread(target=self._heartbeat, args=({task.task_id}, stop), daemon=True).start()
+        try:
+            self._execute_claimed(task)
+        finally:
+            stop.set()
+        return task
+
+    def _run_task(self, task: ScheduledTask):
+        """Generate and save a task's content, recording the outcome on the task."""
         self._init_agents()
 
         try:
             if task.task_type == "blog":
-                post = self.blog_agent.generate_post(
+                posts = [self.blog_agent.generate_post(
                     topic=task.topic,
                     template_type=task.template_type,
+                )]
+            elif task.task_type == "repurpose":
+                posts = self.linkedin_agent.repurpose_blog_post(
+                    task.source_file,
+                    count=task.repurpose_count,
+                    template_type=task.template_type,
                 )
-                output_file = self.blog_agent.save_post(post)
             else:  # linkedin
-                post = self.linkedin_agent.generate_post(
+                posts = [self.linkedin_agent.generate_post(
                     topic=task.topic,
                     template_type=task.template_type,
-                )
-                output_file = self.linkedin_agent.save_post(post)
-
-            task.status = "completed"
-            task.completed_at = datetime.now().isoformat()
-            task.output_file = output_file
+                )]
+
+            agent = self._agent_for(task)
+            output_files = [agent.save_post(post) for post in posts]
+            self.metrics.record_generation(task.task_type, _combined_metadata(posts))
+            with self._lock:
+                task.attempts += 1
+                task.status = "completed"
+                task.completed_at = datetime.now().isoformat()
+                task.output_file = output_files[0]
+                if task.task_type == "repurpose":
+                    task.output_files = output_files
+                task.error = None
+            self._schedule_follow_on(task)
+
+        except CircuitOpenError as e:
+            # Not the task's fault: leave it pending until the API recovers
+            with self._lock:
+                task.error = str(e)
+
+        except DuplicateContentError as e:
+            self.metrics.record_failure(task.task_type, "duplicate")
+            with self._lock:
+                task.attempts += 1
+                task.status = "failed"
+                task.error = str(e)
 
         except Exception as e:
-            task.status = "failed"
-            task.error = str(e)
+            with self._lock:
+                task.attempts += 1
+                task.error = str(e)
+                if is_retryable(e) and task.attempts < MAX_TASK_ATTEMPTS:
+                    # Re-queue with exponential backoff between attempts
+                    delay = TASK_REQUEUE_DELAY * 2 ** (task.attempts - 1)
+                    task.scheduled_time = (datetime.now() + timedelta(seconds=delay)).isoformat()
+                    self.metrics.record_failure(task.task_type, "requeued")
+                else:
+                    task.status = "failed"
+                    self.metrics.record_failure(task.task_type)
+
+    def _lease_until(self) -> str:
+        return (datetime.now() + timedelta(seconds=self.lease_duration)).isoformat()
+
+    def _claim_next(self) -> Optional[ScheduledTask]:
+        """Lease the earliest due task to this worker, if there is one."""
+        claimed = self.store.claim_due(datetime.now().isoformat(), self.worker_id, self._lease_until())
+        return ScheduledTask(**claimed[0]) if claimed else None
+
+    def _execute_claimed(self, task: ScheduledTask):
+        """Run a leased task and release it with its final state."""
+        self._run_task(task)
+        if task.status == "running":
+            # Re-queued or paused by the circuit breaker
+            task.status = "pending"
+        if not self.store.release(asdict(task), self.worker_id):
+            print(f"Lease on task {task.task_id} expired while it ran; another worker owns it now")
+
+    def _heartbeat(self, leased: set, stop: threading.Event):
+        """Renew the leases of in-flight tasks every third of the lease duration."""
+        while not stop.wait(self.lease_duration / 3):
+            with self._lock:
+                task_ids = list(leased)
+            if not task_ids:
+                continue
+            held = self.store.renew_leases(task_ids, self.worker_id, self._lease_until())
+            for task_id in set(task_ids) - set(held):
+                print(f"Lost lease on task {task_id}")
+
+    def _agent_for(self, task: ScheduledTask):
+        """Get the agent responsible for a task."""
+        return self.blog_agent if task.task_type == "blog" else self.linkedin_agent
+
+    def _request_model(self, task: ScheduledTask) -> str:
+        """Get the model a task's batch request goes to."""
+        agent = self._agent_for(task)
+        return agent.model if task.task_type == "repurpose" else agent.route_model(task.template_type)
+
+    def _build_request(self, task: ScheduledTask) -> dict:
+        """Build the messages.create parameters for a task without sending them."""
+        if task.task_type == "repurpose":
+            return self.linkedin_agent.build_repurpose_request(
+                read_post(task.source_file), task.repurpose_count, task.template_type
+            )
+        return self._agent_for(task).build_request(
+            topic=task.topic,
+            template_type=task.template_type,
+            model=self._request_model(task),
+        )
 
-        self._save_schedule()
-        return task
+    def _parse_batch_result(self, task: ScheduledTask, message, call_info: dict) -> List[dict]:
+        """
+        Turn a batch result into the task's posts, escalating fast-model drafts
+        that fail the quality checks and leaving out or rejecting near-duplicates.
+        """
+        agent = self._agent_for(task)
+        if task.task_type == "repurpose":
+            posts = agent.parse_repurposed(
+                message, read_post(task.source_file), task.template_type,
+                call_info=call_info, source_file=task.source_file,
+            )
+            return agent.drop_duplicates(posts)
+        post = agent.parse_message(message, task.topic, task.template_type, call_info=call_info)
+        post = agent.review(post, task.topic, task.template_type)
+        return [agent.dedupe(post, task.topic, task.template_type)]
+
+    def execute_pending_tasks(self, workers: int = 1) -> List[ScheduledTask]:
+        """
+        Execute all pending tasks that are due.
+
+        Each worker thread claims one task at a time, so several schedulers
+        draining the same queue share it without running any task twice.
+
+        Args:
+            workers: Number of tasks to run concurrently
+
+        Returns:
+            List of executed tasks
+        """
+        first = self._claim_next()
+        if first is None:
+            return []
 
-    def execute_pending_tasks(self) -> List[ScheduledTask]:
-        """Execute all pending tasks that are due."""
-        now = datetime.now()
+        executed: List[ScheduledTask] = []
+        leased = {first.task_id}
+        stop = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(leased, stop), daemon=True).start()
+
+        def drain(task: Optional[ScheduledTask]):
+            while True:
+                # Leave the rest of the queue alone while the API is overloaded
+                if task is None and self.circuit_breaker.is_open():
+                    return
+                if task is None:
+                    task = self._claim_next()
+                    if task is None:
+                        return
+                    with self._lock:
+                        leased.add(task.task_id)
+
+                try:
+                    print(f"Executing task: {task.task_id} ({task.task_type})")
+                    self._execute_claimed(task)
+                finally:
+                    with self._lock:
+                        leased.discard(task.task_id)
+                        executed.append(task)
+                task = None
+
+        try:
+            # Build the agents once up front (under the first task's heartbeat)
+            # so worker threads share them
+            self._init_agents()
+            if workers <= 1:
+                drain(first)
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(drain, first)]
+                    futures += [executor.submit(drain, None) for _ in range(workers - 1)]
+                    for future in futures:
+                        future.result()
+        finally:
+            stop.set()
+
+        self.write_metrics()
+        if self.circuit_breaker.is_open():
+            print("Circuit breaker open; remaining due tasks left pending")
+        return executed
+
+    def execute_pending_tasks_batch(self, poll_interval: int = 30) -> List[ScheduledTask]:
+        """
+        Execute all due tasks as a single Message Batch.
+
+        Batches are processed asynchronously by the API at reduced cost, so this
+        submits every due task in one request, polls until the batch ends and
+        then saves each result through the owning agent. Tasks left "batched"
+        by an interrupted run are collected before anything new is submitted.
+
+        Args:
+            poll_interval: Seconds between batch status checks
+
+        Returns:
+            List of executed tasks
+        """
+        self._init_agents()
         executed = []
 
-        for task in self.tasks:
-            if task.status != "pending":
-                continue
+        batched = self._to_tasks(self.store.tasks_by_status("batched"))
+        unfinished = {t.batch_id for t in batched if t.batch_id}
+        for batch_id in sorted(unfinished):
+            executed.extend(self.collect_batch_results(batch_id, poll_interval))
+
+        due = self._to_tasks(self.store.claim_due(
+            datetime.now().isoformat(), self.worker_id, self._lease_until(), limit=None
+        ))
+        if not due:
+            return executed
 
-            scheduled = datetime.fromisoformat(task.scheduled_time)
-            if scheduled <= now:
-                print(f"Executing task: {task.task_id} ({task.task_type})")
-                self.execute_task(task)
+        requests = []
+        for task in due:
+            try:
+                params = self._build_request(task)
+            except (OSError, ValueError) as e:
+                # e.g. a repurpose task whose blog post has been deleted
+                with self._lock:
+                    task.attempts += 1
+                    task.status = "failed"
+                    task.error = str(e)
+                self.metrics.record_failure(task.task_type)
+                self.store.release(asdict(task), self.worker_id)
                 executed.append(task)
+                continue
+            requests.append({"custom_id": task.task_id, "params": params})
+
+        due = [task for task in due if task.status != "failed"]
+        if not due:
+            return executed
 
+        try:
+            batch = self.blog_agent.client.messages.batches.create(requests=requests)
+        except Exception:
+            for task in due:
+                task.status = "pending"
+                self.store.release(asdict(task), self.worker_id)
+            raise
+        print(f"Submitted batch {batch.id} with {len(requests)} tasks")
+
+        with self._lock:
+            for task in due:
+                task.status = "batched"
+                task.batch_id = batch.id
+        for task in due:
+            self.store.release(asdict(task), self.worker_id)
+
+        executed.extend(self.collect_batch_results(batch.id, poll_interval))
         return executed
 
+    def collect_batch_results(self, batch_id: str, poll_interval: int = 30) -> List[ScheduledTask]:
+        """
+        Wait for a submitted batch to end and record its results on the tasks.
+
+        The batch's tasks are leased to this worker once the batch ends, so
+        only one of several schedulers waiting on the same batch saves its
+        posts and schedules their follow-on tasks.
+
+        Args:
+            batch_id: Message Batch ID returned on submission
+            poll_interval: Seconds between batch status checks
+
+        Returns:
+            List of tasks this worker collected; empty if another worker holds the batch
+        """
+        self._init_agents()
+        client = self.blog_agent.client
+
+        batch = client.messages.batches.retrieve(batch_id)
+        while batch.processing_status != "ended":
+            time.sleep(poll_interval)
+            batch = client.messages.batches.retrieve(batch_id)
+
+        tasks = {
+            t.task_id: t
+            for t in self._to_tasks(self.store.claim_batched(
+                batch_id, datetime.now().isoformat(), self.worker_id, self._lease_until()
+            ))
+        }
+        if not tasks:
+            return []
+
+        leased = set(tasks)
+        stop = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(leased, stop), daemon=True).start()
+        try:
+            self._collect_entries(client, batch_id, tasks)
+        finally:
+            stop.set()
+
+        collected = []
+        for task in tasks.values():
+            if not self.store.release(asdict(task), self.worker_id):
+                print(f"Lease on task {task.task_id} expired while collecting; another worker owns it now")
+                continue
+            collected.append(task)
+            if task.status == "completed":
+                self._schedule_follow_on(task)
+        self.write_metrics()
+        return collected
+
+    def _collect_entries(self, client, batch_id: str, tasks: Dict[str, ScheduledTask]):
+        """Record a batch's results on the leased tasks they belong to."""
+        for entry in client.messages.batches.results(batch_id):
+            task = tasks.get(entry.custom_id)
+            if task is None or task.status != "batched":
+                continue
+
+            try:
+                if entry.result.type != "succeeded":
+                    raise RuntimeError(f"Batch request {entry.result.type}")
+
+                agent = self._agent_for(task)
+                message = entry.result.message
+                call_info = {"batch": True, "model": self._request_model(task)}
+                if message.stop_reason == "max_tokens":
+                    # Finish truncated posts with regular calls rather than a new batch
+                    params = self._build_request(task)
+                    message, continuations, retries = agent.complete_truncated(params, message)
+                    call_info.update(continuations=continuations, retries=retries)
+                posts = self._parse_batch_result(task, message, call_info)
+                output_files = [agent.save_post(post) for post in posts]
+                self.metrics.record_generation(task.task_type, _combined_metadata(posts))
+
+                with self._lock:
+                    task.status = "completed"
+                    task.completed_at = datetime.now().isoformat()
+                    task.output_file = output_files[0]
+                    if task.task_type == "repurpose":
+                        task.output_files = output_files
+
+            except Exception as e:
+                self.metrics.record_failure(
+                    task.task_type, "duplicate" if isinstance(e, DuplicateContentError) else "failed"
+                )
+                with self._lock:
+                    task.status = "failed"
+                    task.error = str(e)
+
+        # Anything the results stream did not mention never ran
+        with self._lock:
+            for task in tasks.values():
+                if task.status == "batched":
+                    task.status = "failed"
+                    task.error = "Missing from batch results"
+                    self.metrics.record_failure(task.task_type)
+
+    def write_metrics(self):
+        """Export the generation metrics gathered so far to the metrics file."""
+        if not self.metrics_path:
+            return
+        try:
+            self.metrics.write(self.metrics_path)
+        except OSError as e:
+            print(f"Could not write metrics to {self.metrics_path}: {e}")
+
     def get_pending_tasks(self) -> List[ScheduledTask]:
         """Get all pending tasks."""
-        return [t for t in self.tasks if t.status == "pending"]
+        return self._to_tasks(self.store.tasks_by_status("pending"))
 
     def get_completed_tasks(self) -> List[ScheduledTask]:
         """Get all completed tasks."""
-        return [t for t in self.tasks if t.status == "completed"]
+        return self._to_tasks(self.store.tasks_by_status("completed"))
 
     def clear_completed_tasks(self):
         """Remove completed tasks from the schedule."""
-        self.tasks = [t for t in self.tasks if t.status != "completed"]
-        self._save_schedule()
+        completed = self.store.tasks_by_status("completed")
+        self.store.delete([t["task_id"] for t in completed])
+
+    def _deadline(self, task: Optional[dict]) -> Optional[str]:
+        """When a task next becomes claimable: its scheduled time, or its lease expiry while running."""
+        if task is None:
+            return None
+        if task["status"] == "pending":
+            return task["scheduled_time"]
+        if task["status"] == "running":
+            return task.get("lease_expires_at") or task["scheduled_time"]
+        return None
+
+    def _build_timer_heap(self) -> List[tuple]:
+        """Build a min-heap of (deadline, task_id) for pending and leased tasks."""
+        tasks = self.store.tasks_by_status("pending") + self.store.tasks_by_status("running")
+        heap = [(self._deadline(t), t["task_id"]) for t in tasks]
+        heapq.heapify(heap)
+        return heap
+
+    def _next_deadline(self, heap: List[tuple]) -> Optional[str]:
+        """
+        Get the earliest deadline still current in the heap.
 
-    def run_daemon(self, check_interval: int = 60):
+        Entries are validated lazily against the store: tasks that have run or
+        been removed are dropped, and tasks that were rescheduled or leased are
+        re-pushed with their new deadline. A deadline on a leased task is its
+        lease expiry, when it may be reclaimed from a worker that died.
         """
-        Run as a daemon, checking for and executing tasks.
+        while heap:
+            deadline, task_id = heap[0]
+            current = self._deadline(self.store.get(task_id))
+
+            if current is None:
+                heapq.heappop(heap)
+            elif current != deadline:
+                heapq.heapreplace(heap, (current, task_id))
+            else:
+                return deadline
+
+        return None
+
+    def run_daemon(self, check_interval: int = 60, workers: int = 1):
+        """
+        Run as a daemon, executing tasks as they come due.
+
+        Pending tasks are kept in a min-heap by scheduled time and the daemon
+        sleeps exactly until the earliest one. Scheduling a task from another
+        process sends a datagram to the daemon's wake-up socket, so new work is
+        picked up immediately instead of on the next poll. Changes that arrive
+        without a notification (from another host, or with the socket
+        unavailable) are caught by the rescan every `check_interval` seconds,
+        or sooner by polling the store every SCHEDULE_POLL_INTERVAL seconds if
+        that is set. Polling is off by default so an idle daemon does not wake.
 
         Args:
-            check_interval: Seconds between checks
+            check_interval: Maximum seconds to sleep before rescanning the schedule
+            workers: Number of tasks to run concurrently
         """
-        print(f"Starting content scheduler daemon (checking every {check_interval}s)")
+        print(f"Starting content scheduler daemon (rescanning at least every {check_interval}s)")
         print("Press Ctrl+C to stop")
 
-        schedule.every(check_interval).seconds.do(self.execute_pending_tasks)
+        listener = WakeupListener(self.wakeup_path)
+
+        # Load the SDK now rather than delaying the first due task
+        self._init_agents()
+        heap = self._build_timer_heap()
+        last_scan = time.monotonic()
 
         try:
             while True:
-                schedule.run_pending()
-                time.sleep(1)
+                deadline = self._next_deadline(heap)
+                now = datetime.now()
+
+                retry_at = self.circuit_breaker.retry_at
+                paused = retry_at is not None and self.circuit_breaker.is_open()
+
+                if deadline is not None and deadline <= now.isoformat() and not paused:
+                    self.execute_pending_tasks(workers=workers)
+                    continue
+
+                timeout = check_interval
+                if paused:
+                    # Sleep out the breaker's cooldown rather than spinning on due tasks
+                    timeout = min(timeout, max(retry_at - time.time(), 0.1))
+                elif deadline is not None:
+                    until_due = (datetime.fromisoformat(deadline) - now).total_seconds()
+                    timeout = min(timeout, max(until_due, 0))
+
+                if SCHEDULE_POLL_INTERVAL > 0:
+                    timeout = min(timeout, SCHEDULE_POLL_INTERVAL)
+                task_ids = listener.wait(timeout)
+                changed = self.store.reload()
+
+                if task_ids is None:
+                    # Rebuild on changes made without a notification, and
+                    # periodically in case a change went unseen
+                    if changed or time.monotonic() - last_scan >= check_interval:
+                        heap = self._build_timer_heap()
+                        last_scan = time.monotonic()
+                    continue
+
+                for task_id in task_ids:
+                    deadline = self._deadline(self.store.get(task_id)) if task_id else None
+                    if deadline is None:
+                        heap = self._build_timer_heap()
+                        break
+                    heapq.heappush(heap, (deadline, task_id))
+
         except KeyboardInterrupt:
             print("\nScheduler stopped")
+        finally:
+            listener.close()
 
 
 def main():
@@ -289,7 +868,7 @@ def main():
     table.add_column("Scheduled", style="blue")
     table.add_column("Status", style="red")
 
-    for task in scheduler.tasks[-10:]:  # Show last 10
+    for task in scheduler.recent_tasks(10):
         table.add_row(
             task.task_id[-8:],
             task.task_type,
@@ -0,0 +1,43 @@
+"""Pydantic schemas for structured (tool use) post output."""
+
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class BlogPostFields(BaseModel):
+    """Fields of a generated blog post."""
+
+    title: str = Field(description="SEO-optimized title under 60 characters")
+    meta_description: str = Field(description="Compelling meta description, 150-160 characters")
+    content: str = Field(description="Full blog post content with proper markdown formatting")
+    keywords: List[str] = Field(description="5-7 target keywords", min_length=1)
+
+
+class LinkedInPostFields(BaseModel):
+    """Fields of a generated LinkedIn post."""
+
+    content: str = Field(
+        description="Full LinkedIn post content with proper formatting, line breaks, "
+        "and emojis where appropriate"
+    )
+    hook: str = Field(description='Just the first 1-2 lines that appear before "see more"')
+    cta: str = Field(description="The call-to-action or engagement question")
+
+
+class LinkedInVariantsFields(BaseModel):
+    """Several distinct LinkedIn posts on one topic."""
+
+    variants: List[LinkedInPostFields] = Field(
+        description="Distinct posts, each with its own hook, angle and call to action",
+        min_length=1,
+    )
+
+
+def tool_definition(name: str, description: str, schema: type) -> dict:
+    """Describe a pydantic model as a tool whose input is the post."""
+    return {
+        "name": name,
+        "description": description,
+        "input_schema": schema.model_json_schema(),
+    }
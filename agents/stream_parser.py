@@ -0,0 +1,117 @@
+"""Incremental parser for marker-delimited model responses."""
+
+from typing import Dict, List, Optional, Tuple
+
+
+# Characters allowed ahead of a marker on its line, e.g. "**TITLE:**" or "## CONTENT:"
+MARKER_LEAD = " \t*#"
+
+
+class SectionStreamParser:
+    """
+    Split a streamed "MARKER: text" response into sections as it arrives.
+
+    A marker only breaks a section at the start of a line (after optional
+    whitespace or markdown emphasis), so "KEYWORDS:" inside a title is
+    text. Markers are matched in the order given, so an earlier section's
+    marker later on (e.g. "TITLE:" inside the content) is text too. Text
+    that could be the start of a marker split across two chunks is held
+    back until the next chunk decides it.
+    """
+
+    def __init__(self, markers: List[str]):
+        self.markers = markers
+        self.section: Optional[str] = None
+        self.sections: Dict[str, str] = {}
+        self._buffer = ""
+        self._at_section_start = False
+        # Whether the text consumed since the last newline is only MARKER_LEAD
+        self._line_start = True
+
+    def _next_markers(self) -> List[str]:
+        if self.section is None:
+            return self.markers
+        return self.markers[self.markers.index(self.section) + 1:]
+
+    def _starts_line(self, idx: int) -> bool:
+        """Whether a marker at buffer position `idx` begins a line."""
+        newline = self._buffer.rfind("\n", 0, idx)
+        if newline == -1:
+            return self._line_start and not self._buffer[:idx].strip(MARKER_LEAD)
+        return not self._buffer[newline + 1:idx].strip(MARKER_LEAD)
+
+    def _consume(self, end: int):
+        """Drop the first `end` characters of the buffer, tracking the line position."""
+        consumed = self._buffer[:end]
+        newline = consumed.rfind("\n")
+        if newline == -1:
+            self._line_start = self._line_start and not consumed.strip(MARKER_LEAD)
+        else:
+            self._line_start = not consumed[newline + 1:].strip(MARKER_LEAD)
+        self._buffer = self._buffer[end:]
+
+    def _find_marker(self, marker: str) -> int:
+        """Position of the first line-starting `marker` in the buffer, or -1."""
+        token = f"{marker}:"
+        idx = self._buffer.find(token)
+        while idx != -1 and not self._starts_line(idx):
+            idx = self._buffer.find(token, idx + 1)
+        return idx
+
+    def _emit(self, text: str, events: List[Tuple[str, str]]):
+        if self.section is None or not text:
+            return
+        if self._at_section_start:
+            text = text.lstrip()
+            if not text:
+                return
+            self._at_section_start = False
+        self.sections[self.section] = self.sections.get(self.section, "") + text
+        events.append((self.section.lower(), text))
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        """
+        Consume a chunk of streamed text.
+
+        Returns:
+            List of (section, text) events, with section names lowercased
+        """
+        self._buffer += text
+        events = []
+
+        while True:
+            found = None
+            for marker in self._next_markers():
+                idx = self._find_marker(marker)
+                if idx != -1 and (found is None or idx < found[0]):
+                    found = (idx, marker)
+
+            if found is None:
+                break
+
+            idx, marker = found
+            self._emit(self._buffer[:idx], events)
+            self._consume(idx + len(marker) + 1)
+            self.section = marker
+            self._at_section_start = True
+
+        # Hold back a suffix that could still grow into a marker
+        holdback = 0
+        for marker in self._next_markers():
+            token = f"{marker}:"
+            for k in range(min(len(token) - 1, len(self._buffer)), holdback, -1):
+                if token.startswith(self._buffer[-k:]):
+                    holdback = k
+                    break
+
+        cut = len(self._buffer) - holdback
+        self._emit(self._buffer[:cut], events)
+        self._consume(cut)
+        return events
+
+    def close(self) -> List[Tuple[str, str]]:
+        """Flush any held-back text once the stream has ended."""
+        events = []
+        self._emit(self._buffer, events)
+        self._consume(len(self._buffer))
+        return events
@@ -0,0 +1,200 @@
+"""Cost estimation and Prometheus metrics for content generation calls."""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from file_utils import atomic_write
+
+
+# USD per million tokens (input, output), matched by model name prefix.
+# Most specific prefixes first.
+MODEL_PRICING: List[Tuple[str, Tuple[float, float]]] = [
+    ("claude-opus-4-5", (5.00, 25.00)),
+    ("claude-opus-4", (15.00, 75.00)),
+    ("claude-sonnet-4", (3.00, 15.00)),
+    ("claude-3-7-sonnet", (3.00, 15.00)),
+    ("claude-haiku-4-5", (1.00, 5.00)),
+    ("claude-3-5-haiku", (0.80, 4.00)),
+    ("claude-3-haiku", (0.25, 1.25)),
+]
+
+# Prompt cache writes and reads are billed relative to the input price
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.10
+
+# Message Batches are billed at half price
+BATCH_DISCOUNT = 0.5
+
+# Histogram buckets, in seconds
+LATENCY_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+TTFT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def model_pricing(model: str) -> Optional[Tuple[float, float]]:
+    for prefix, pricing in MODEL_PRICING:
+        if model.startswith(prefix):
+            return pricing
+    return None
+
+
+def estimate_cost(model: str, usage: dict, batch: bool = False) -> Optional[float]:
+    """
+    Estimate the USD cost of a call from its token usage.
+
+    Args:
+        model: Model the request was sent to
+        usage: Token counts as recorded by BaseAgent._usage_metadata
+        batch: Whether the call went through the Message Batches API
+
+    Returns:
+        Cost in USD, or None for models missing from MODEL_PRICING
+    """
+    pricing = model_pricing(model)
+    if pricing is None:
+        return None
+
+    input_price, output_price = pricing
+    cost = (
+        usage["input_tokens"] * input_price
+        + usage["cache_creation_input_tokens"] * input_price * CACHE_WRITE_MULTIPLIER
+        + usage["cache_read_input_tokens"] * input_price * CACHE_READ_MULTIPLIER
+        + usage["output_tokens"] * output_price
+    ) / 1_000_000
+    return round(cost * BATCH_DISCOUNT if batch else cost, 6)
+
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+class GenerationMetrics:
+    """
+    Counters and histograms over generation calls, rendered in the
+    Prometheus text exposition format.
+
+    The scheduler records every task it runs here and writes the result to a
+    .prom file, which node_exporter's textfile collector (or any scraper that
+    reads the format) picks up. Values accumulate for the life of the process.
+    """
+
+    COUNTERS = {
+        "bess_generations_total": "Generation tasks by outcome",
+        "bess_tokens_total": "Tokens processed, by kind",
+        "bess_cost_usd_total": "Estimated API cost in USD",
+        "bess_retries_total": "API retries",
+        "bess_continuations_total": "Continuations of responses cut off at max_tokens",
+        "bess_response_cache_hits_total": "Generations served from the response cache",
+        "bess_regenerations_total": "Posts regenerated for being near-duplicates of saved posts",
+        "bess_route_generations_total": "Generations by template and model route (default, fast or escalated)",
+        "bess_route_cost_usd_total": "Estimated API cost in USD by template and model route, including escalated drafts",
+    }
+    HISTOGRAMS = {
+        "bess_generation_seconds": ("Wall time per generation, including retries", LATENCY_BUCKETS),
+        "bess_time_to_first_token_seconds": ("Time until the first response token", TTFT_BUCKETS),
+        "bess_route_generation_seconds": (
+            "Wall time per generation by template and model route, including escalated drafts",
+            LATENCY_BUCKETS,
+        ),
+    }
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[tuple, float]] = {name: {} for name in self.COUNTERS}
+        self._histograms: Dict[str, Dict[tuple, _Histogram]] = {name: {} for name in self.HISTOGRAMS}
+        self._lock = threading.Lock()
+
+    def _inc(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        self._counters[name][key] = self._counters[name].get(key, 0) + value
+
+    def _observe(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        histogram = self._histograms[name].get(key)
+        if histogram is None:
+            histogram = self._histograms[name][key] = _Histogram(self.HISTOGRAMS[name][1])
+        histogram.observe(value)
+
+    def record_generation(self, task_type: str, metadata: dict):
+        """
+        Record a successful generation from its post metadata.
+
+        The tokens and cost of a fast-model draft that was escalated
+        (metadata["escalation"]) count toward the totals too.
+        """
+        calls = [metadata] + ([metadata["escalation"]] if metadata.get("escalation") else [])
+        cost = sum(call.get("cost_usd") or 0 for call in calls)
+        with self._lock:
+            self._inc("bess_generations_total", 1, task_type=task_type, status="completed")
+            if metadata.get("cache_hit"):
+                self._inc("bess_response_cache_hits_total", 1, task_type=task_type)
+            for call in calls:
+                for kind, count in call.get("usage", {}).items():
+                    self._inc("bess_tokens_total", count, task_type=task_type, kind=kind.replace("_tokens", ""))
+            if cost:
+                self._inc("bess_cost_usd_total", cost, task_type=task_type)
+            self._inc("bess_retries_total", metadata.get("retries", 0), task_type=task_type)
+            self._inc("bess_continuations_total", metadata.get("continuations", 0), task_type=task_type)
+            self._inc("bess_regenerations_total", metadata.get("regenerations", 0), task_type=task_type)
+            if metadata.get("wall_time_ms") is not None:
+                self._observe("bess_generation_seconds", metadata["wall_time_ms"] / 1000, task_type=task_type)
+            if metadata.get("ttft_ms") is not None:
+                self._observe("bess_time_to_first_token_seconds", metadata["ttft_ms"] / 1000, task_type=task_type)
+
+            if metadata.get("route"):
+                labels = {"task_type": task_type, "template": metadata.get("template_type", ""), "route": metadata["route"]}
+                self._inc("bess_route_generations_total", 1, **labels)
+                if cost:
+                    self._inc("bess_route_cost_usd_total", cost, **labels)
+                wall_times = [call.get("wall_time_ms") for call in calls]
+                if None not in wall_times:
+                    self._observe("bess_route_generation_seconds", sum(wall_times) / 1000, **labels)
+
+    def record_failure(self, task_type: str, status: str = "failed"):
+        """
+        Record a generation that failed ("failed"), was rejected as a near-duplicate
+        ("duplicate") or was put back in the queue ("requeued").
+        """
+        with self._lock:
+            self._inc("bess_generations_total", 1, task_type=task_type, status=status)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, help_text in self.COUNTERS.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_labels(labels)} {value:.10g}")
+
+            for name, (help_text, buckets) in self.HISTOGRAMS.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(self._histograms[name].items()):
+                    for bound, count in zip(buckets, histogram.counts):
+                        bucket_labels = labels + (("le", f"{bound:g}"),)
+                        lines.append(f"{name}_bucket{_labels(bucket_labels)} {count}")
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {histogram.total}")
+                    lines.append(f"{name}_sum{_labels(labels)} {histogram.sum:.10g}")
+                    lines.append(f"{name}_count{_labels(labels)} {histogram.total}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Write the metrics atomically, so a scraper never reads a partial file."""
+        atomic_write(path, self.render())
@@ -0,0 +1,12 @@
+"""Shared test setup: import the agents' modules and keep their output in a temp dir."""
+
+import os
+import sys
+import tempfile
+
+# The agents run from this directory and import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# config.py reads OUTPUT_DIR at import; keep anything a module writes by default
+# out of the real output directory
+os.environ["OUTPUT_DIR"] = tempfile.mkdtemp(prefix="bess-tests-")
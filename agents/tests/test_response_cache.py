@@ -0,0 +1,113 @@
+"""Tests for ResponseCache expiry and eviction."""
+
+import json
+import os
+import time
+
+import pytest
+from anthropic.types import Message
+
+import response_cache
+from response_cache import ResponseCache
+
+TTL = 3600
+
+
+def make_message(text: str) -> Message:
+    return Message.model_validate({
+        "id": "msg_test",
+        "type": "message",
+        "role": "assistant",
+        "model": "claude-sonnet-4-5",
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": 20},
+    })
+
+
+def make_params(prompt: str) -> dict:
+    return {
+        "model": "claude-sonnet-4-5",
+        "max_tokens": 1024,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+
+
+@pytest.fixture
+def cache(tmp_path):
+    os.makedirs(tmp_path / "cache")
+    return ResponseCache(str(tmp_path / "cache"), ttl=TTL, max_entries=2)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Control the time the cache reads, starting at the real current time."""
+    now = [time.time()]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_hit_and_miss(cache):
+    cache.put(make_params("a"), make_message("answer a"))
+    assert cache.get(make_params("a")).content[0].text == "answer a"
+    assert cache.get(make_params("b")) is None
+    assert cache.get({**make_params("a"), "max_tokens": 2048}) is None
+
+
+def test_entry_expires_by_creation_time_despite_hits(cache, clock):
+    params = make_params("a")
+    cache.put(params, make_message("answer a"))
+    path = cache._path(cache.key(params))
+
+    clock[0] += TTL - 1
+    assert cache.get(params) is not None
+
+    # The hit refreshed the mtime, but the entry is still as old as its created_at
+    clock[0] += 2
+    assert cache.get(params) is None
+    assert not os.path.exists(path)
+
+
+def test_entry_without_created_at_is_expired(cache):
+    params = make_params("a")
+    path = cache._path(cache.key(params))
+    with open(path, "w") as f:
+        json.dump(make_message("answer a").model_dump(mode="json"), f)
+
+    assert cache.get(params) is None
+    assert not os.path.exists(path)
+
+
+def test_eviction_drops_least_recently_used(cache):
+    for name in ("a", "b"):
+        cache.put(make_params(name), make_message(name))
+    now = time.time()
+    os.utime(cache._path(cache.key(make_params("a"))), (now - 20, now - 20))
+    os.utime(cache._path(cache.key(make_params("b"))), (now - 10, now - 10))
+
+    # Hitting "a" makes "b" the least recently used
+    assert cache.get(make_params("a")) is not None
+    cache.put(make_params("c"), make_message("c"))
+
+    assert cache.get(make_params("b")) is None
+    assert cache.get(make_params("a")) is not None
+    assert cache.get(make_params("c")) is not None
+    assert len(os.listdir(cache.directory)) == 2
+
+
+def test_eviction_drops_expired_entries(cache):
+    cache.put(make_params("a"), make_message("a"))
+    stale = cache._path(cache.key(make_params("a")))
+    old = time.time() - TTL - 10
+    os.utime(stale, (old, old))
+
+    cache.put(make_params("b"), make_message("b"))
+    assert not os.path.exists(stale)
+    assert cache.get(make_params("b")) is not None
+
+
+def test_clear(cache):
+    cache.put(make_params("a"), make_message("a"))
+    cache.clear()
+    assert os.listdir(cache.directory) == []
@@ -0,0 +1,323 @@
+"""Tests for the schedule storage backends in schedule_store.py."""
+
+import json
+import multiprocessing
+import os
+import sqlite3
+
+import pytest
+
+from schedule_store import JournalStore, SQLiteTaskStore
+
+
+def make_task(task_id: str, scheduled_time: str = "2026-01-01T09:00:00", status: str = "pending") -> dict:
+    return {
+        "task_id": task_id,
+        "task_type": "linkedin",
+        "topic": "technology",
+        "template_type": "insight",
+        "scheduled_time": scheduled_time,
+        "status": status,
+        "lease_owner": None,
+        "lease_expires_at": None,
+    }
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / "schedule.json")
+
+
+# --- JournalStore: compaction and incremental reload ---
+
+def test_journal_compacts_into_snapshot(snapshot_path):
+    store = JournalStore(snapshot_path, compact_every=5)
+    store.put([make_task(f"t{i}") for i in range(3)])
+    store.delete(["t0"])
+    assert os.path.getsize(store.journal_path) > 0
+
+    # The fifth event triggers compaction
+    store.put([make_task("t3")])
+
+    assert os.path.getsize(store.journal_path) == 0
+    with open(snapshot_path) as f:
+        assert sorted(t["task_id"] for t in json.load(f)) == ["t1", "t2", "t3"]
+    assert sorted(t["task_id"] for t in JournalStore(snapshot_path).all_tasks()) == ["t1", "t2", "t3"]
+
+
+def test_journal_replays_over_snapshot(snapshot_path):
+    store = JournalStore(snapshot_path)
+    store.put([make_task("a"), make_task("b")])
+    store.compact()
+    store.put([{**make_task("a"), "status": "completed"}])
+    store.delete(["b"])
+
+    tasks = {t["task_id"]: t for t in JournalStore(snapshot_path).all_tasks()}
+    assert list(tasks) == ["a"]
+    assert tasks["a"]["status"] == "completed"
+
+
+def test_reload_picks_up_appends_from_another_store(snapshot_path):
+    reader = JournalStore(snapshot_path)
+    writer = JournalStore(snapshot_path)
+    assert reader.reload() is False
+
+    writer.put([make_task("a")])
+    assert reader.reload() is True
+    assert reader.get("a") is not None
+    assert reader.reload() is False
+
+    writer.put([{**make_task("a"), "status": "completed"}])
+    writer.put([make_task("b")])
+    assert reader.reload() is True
+    assert reader.get("a")["status"] == "completed"
+    assert reader.get("b") is not None
+
+
+def test_reload_after_another_store_compacts(snapshot_path):
+    reader = JournalStore(snapshot_path)
+    writer = JournalStore(snapshot_path)
+    writer.put([make_task("a"), make_task("b")])
+    reader.reload()
+
+    writer.delete(["a"])
+    writer.compact()
+    writer.put([make_task("c")])
+
+    assert reader.reload() is True
+    assert sorted(t["task_id"] for t in reader.all_tasks()) == ["b", "c"]
+
+
+def test_writers_merge_rather_than_overwrite(snapshot_path):
+    first = JournalStore(snapshot_path)
+    second = JournalStore(snapshot_path)
+    first.put([make_task("a")])
+    # second has not reloaded, but catches up under the lock before appending
+    second.put([make_task("b")])
+
+    assert sorted(t["task_id"] for t in JournalStore(snapshot_path).all_tasks()) == ["a", "b"]
+
+
+def test_torn_final_line_is_ignored(snapshot_path):
+    store = JournalStore(snapshot_path)
+    store.put([make_task("a")])
+    with open(store.journal_path, "a") as f:
+        f.write('{"op": "put", "task": {"task_id": "torn"')
+
+    recovered = JournalStore(snapshot_path)
+    assert [t["task_id"] for t in recovered.all_tasks()] == ["a"]
+
+    # The next append starts on a fresh line, so later events still apply
+    recovered.put([make_task("b")])
+    assert sorted(t["task_id"] for t in JournalStore(snapshot_path).all_tasks()) == ["a", "b"]
+
+
+# --- SQLiteTaskStore: queries and cross-process reload ---
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "schedule.db")
+
+
+def test_sqlite_queries(db_path):
+    store = SQLiteTaskStore(db_path)
+    store.put([
+        make_task("late", "2026-01-03T09:00:00"),
+        make_task("early", "2026-01-01T09:00:00"),
+        make_task("future", "2026-02-01T09:00:00"),
+        make_task("done", "2026-01-02T09:00:00", status="completed"),
+    ])
+
+    assert [t["task_id"] for t in store.due_tasks("2026-01-15T00:00:00")] == ["early", "late"]
+    assert store.count_by_status() == {"pending": 3, "completed": 1}
+    assert [t["task_id"] for t in store.tasks_by_status("completed")] == ["done"]
+    assert [t["task_id"] for t in store.recent_tasks(2)] == ["future", "done"]
+
+    store.put([{**make_task("early", "2026-01-01T09:00:00"), "status": "completed"}])
+    assert [t["task_id"] for t in store.all_tasks()] == ["late", "early", "future", "done"]
+    assert [t["task_id"] for t in store.due_tasks("2026-01-15T00:00:00")] == ["late"]
+
+    store.delete(["late"])
+    assert store.get("late") is None
+
+
+def test_sqlite_reload_sees_other_connections(db_path):
+    reader = SQLiteTaskStore(db_path)
+    writer = SQLiteTaskStore(db_path)
+    assert reader.reload() is False
+
+    writer.put([make_task("a")])
+    assert reader.reload() is True
+    assert reader.get("a") is not None
+    assert reader.reload() is False
+
+    # A connection's own commits do not change its data_version
+    reader.put([make_task("b")])
+    assert reader.reload() is False
+    assert writer.get("b") is not None
+
+
+def test_sqlite_adds_lease_columns_to_old_database(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        """
+        CREATE TABLE tasks (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id TEXT NOT NULL UNIQUE,
+            status TEXT NOT NULL,
+            scheduled_time TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        """
+    )
+    task = make_task("old")
+    conn.execute(
+        "INSERT INTO tasks (task_id, status, scheduled_time, data) VALUES (?, ?, ?, ?)",
+        (task["task_id"], task["status"], task["scheduled_time"], json.dumps(task)),
+    )
+    conn.commit()
+    conn.close()
+
+    store = SQLiteTaskStore(db_path)
+    claimed = store.claim_due("2026-01-15T00:00:00", "w1", "2026-01-15T00:05:00")
+    assert [t["task_id"] for t in claimed] == ["old"]
+
+
+# --- Leasing, on both backends ---
+
+NOW = "2026-01-15T00:00:00"
+LEASE_UNTIL = "2026-01-15T00:05:00"
+AFTER_LEASE = "2026-01-15T00:06:00"
+
+STORES = {
+    "journal": lambda tmp_path: JournalStore(str(tmp_path / "schedule.json")),
+    "sqlite": lambda tmp_path: SQLiteTaskStore(str(tmp_path / "schedule.db")),
+}
+
+
+@pytest.fixture(params=sorted(STORES))
+def open_store(request, tmp_path):
+    """Open a new store instance on a shared path, as a separate worker would."""
+    return lambda: STORES[request.param](tmp_path)
+
+
+def test_claim_due_leases_due_tasks_once(open_store):
+    store = open_store()
+    store.put([
+        make_task("b", "2026-01-02T09:00:00"),
+        make_task("a", "2026-01-01T09:00:00"),
+        make_task("future", "2026-02-01T09:00:00"),
+    ])
+
+    claimed = store.claim_due(NOW, "w1", LEASE_UNTIL, limit=None)
+    assert [t["task_id"] for t in claimed] == ["a", "b"]
+    assert all(t["status"] == "running" and t["lease_owner"] == "w1" for t in claimed)
+
+    other = open_store()
+    other.reload()
+    assert other.claim_due(NOW, "w2", LEASE_UNTIL, limit=None) == []
+    assert other.claim("a", NOW, "w2", LEASE_UNTIL) is None
+
+
+def test_expired_lease_is_reclaimed(open_store):
+    store = open_store()
+    store.put([make_task("a")])
+    task = store.claim_due(NOW, "w1", LEASE_UNTIL)[0]
+
+    other = open_store()
+    other.reload()
+    assert other.claim_due("2026-01-15T00:04:59", "w2", LEASE_UNTIL) == []
+    reclaimed = other.claim_due(AFTER_LEASE, "w2", "2026-01-15T00:11:00")
+    assert [t["lease_owner"] for t in reclaimed] == ["w2"]
+
+    # The first worker has lost the task: renewing and releasing both fail
+    store.reload()
+    assert store.renew_leases(["a"], "w1", "2026-01-15T00:20:00") == []
+    assert store.release({**task, "status": "completed"}, "w1") is False
+    assert store.get("a")["lease_owner"] == "w2"
+
+
+def test_renewed_lease_is_not_reclaimed(open_store):
+    store = open_store()
+    store.put([make_task("a")])
+    store.claim_due(NOW, "w1", LEASE_UNTIL)
+    assert store.renew_leases(["a"], "w1", "2026-01-15T00:10:00") == ["a"]
+
+    other = open_store()
+    other.reload()
+    assert other.claim_due(AFTER_LEASE, "w2", "2026-01-15T00:11:00") == []
+
+
+def test_release_saves_final_state(open_store):
+    store = open_store()
+    store.put([make_task("a")])
+    task = store.claim_due(NOW, "w1", LEASE_UNTIL)[0]
+    assert store.release({**task, "status": "completed"}, "w1") is True
+
+    saved = open_store().get("a")
+    assert saved["status"] == "completed"
+    assert saved["lease_owner"] is None and saved["lease_expires_at"] is None
+    assert store.claim_due(AFTER_LEASE, "w2", "2026-01-15T00:11:00") == []
+
+
+def test_claim_takes_tasks_that_are_not_due(open_store):
+    store = open_store()
+    store.put([make_task("future", "2026-02-01T09:00:00"), make_task("done", status="completed")])
+
+    assert store.claim("future", NOW, "w1", LEASE_UNTIL)["lease_owner"] == "w1"
+    assert store.claim("future", NOW, "w2", LEASE_UNTIL) is None
+    assert store.claim("done", NOW, "w1", LEASE_UNTIL) is None
+    assert store.claim("missing", NOW, "w1", LEASE_UNTIL) is None
+
+
+def test_claim_batched_leases_a_batch_once(open_store):
+    store = open_store()
+    store.put([
+        {**make_task("a"), "status": "batched", "batch_id": "batch_1"},
+        {**make_task("b"), "status": "batched", "batch_id": "batch_1"},
+        {**make_task("c"), "status": "batched", "batch_id": "batch_2"},
+    ])
+
+    claimed = store.claim_batched("batch_1", NOW, "w1", LEASE_UNTIL)
+    assert [t["task_id"] for t in claimed] == ["a", "b"]
+    assert all(t["status"] == "batched" for t in claimed)
+
+    other = open_store()
+    other.reload()
+    assert other.claim_batched("batch_1", NOW, "w2", LEASE_UNTIL) == []
+    assert len(other.claim_batched("batch_1", AFTER_LEASE, "w2", "2026-01-15T00:11:00")) == 2
+
+
+def _drain(open_store, worker_id, claims):
+    store = open_store()
+    while True:
+        claimed = store.claim_due(NOW, worker_id, LEASE_UNTIL)
+        if not claimed:
+            break
+        task = claimed[0]
+        claims.put((worker_id, task["task_id"]))
+        store.release({**task, "status": "completed"}, worker_id)
+
+
+def test_concurrent_workers_never_claim_the_same_task(open_store):
+    # File locks belong to the process, so each worker runs in its own
+    try:
+        ctx = multiprocessing.get_context("fork")
+    except ValueError:
+        pytest.skip("needs fork")
+
+    task_ids = [f"t{i:02d}" for i in range(40)]
+    open_store().put([make_task(task_id) for task_id in task_ids])
+
+    claims = ctx.Queue()
+    workers = [ctx.Process(target=_drain, args=(open_store, f"w{i}", claims)) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    claimed = [claims.get(timeout=5)[1] for _ in task_ids]
+    assert sorted(claimed) == task_ids
+    assert claims.empty()
+    assert open_store().count_by_status() == {"completed": len(task_ids)}
@@ -0,0 +1,91 @@
+"""Tests for SectionStreamParser's handling of chunk boundaries."""
+
+import pytest
+
+from stream_parser import SectionStreamParser
+
+MARKERS = ["TITLE", "CONTENT", "KEYWORDS"]
+
+RESPONSE = (
+    "TITLE: Why KEYWORDS: Matter\n"
+    "CONTENT:\n"
+    "First paragraph.\n\n"
+    "A line that ends with CONTENT: and mentions TITLE: again.\n"
+    "KEYWORDS: storage, grid, batteries\n"
+)
+
+
+def parse(text: str, chunk_size: int):
+    parser = SectionStreamParser(MARKERS)
+    events = []
+    for i in range(0, len(text), chunk_size):
+        events += parser.feed(text[i:i + chunk_size])
+    events += parser.close()
+    return parser.sections, events
+
+
+def test_sections():
+    sections, _ = parse(RESPONSE, len(RESPONSE))
+    assert sections == {
+        "TITLE": "Why KEYWORDS: Matter\n",
+        "CONTENT": "First paragraph.\n\nA line that ends with CONTENT: and mentions TITLE: again.\n",
+        "KEYWORDS": "storage, grid, batteries\n",
+    }
+
+
+@pytest.mark.parametrize("chunk_size", range(1, len(RESPONSE) + 1))
+def test_chunking_does_not_change_sections(chunk_size):
+    whole, _ = parse(RESPONSE, len(RESPONSE))
+    sections, events = parse(RESPONSE, chunk_size)
+    assert sections == whole
+
+    # The events carry the same text as the sections, in order
+    streamed = {}
+    for section, text in events:
+        streamed[section.upper()] = streamed.get(section.upper(), "") + text
+    assert streamed == sections
+
+
+def test_marker_split_across_chunks():
+    parser = SectionStreamParser(MARKERS)
+    assert parser.feed("TITLE: Grid storage\nCONT") == [("title", "Grid storage\n")]
+    # "CONT" is held back until the next chunk shows it is a marker
+    assert parser.sections == {"TITLE": "Grid storage\n"}
+    assert parser.feed("ENT: Body") == [("content", "Body")]
+
+
+def test_held_back_text_that_is_not_a_marker():
+    parser = SectionStreamParser(MARKERS)
+    parser.feed("TITLE: Grid storage\nCONT")
+    assert parser.feed("RACTS\n") == [("title", "CONTRACTS\n")]
+
+
+def test_close_flushes_held_back_text():
+    parser = SectionStreamParser(MARKERS)
+    parser.feed("TITLE: Ends on KEY")
+    assert parser.close() == [("title", "KEY")]
+    assert parser.sections == {"TITLE": "Ends on KEY"}
+
+
+def test_mid_line_marker_split_across_chunks_is_text():
+    parser = SectionStreamParser(MARKERS)
+    for chunk in ["TITLE: Trends\nCONTENT: Watch the ", "KEYWO", "RDS: list\n"]:
+        parser.feed(chunk)
+    parser.close()
+    assert parser.sections == {"TITLE": "Trends\n", "CONTENT": "Watch the KEYWORDS: list\n"}
+
+
+def test_marker_after_newline_at_chunk_end():
+    parser = SectionStreamParser(MARKERS)
+    for chunk in ["TITLE: Trends\nCONTENT: Body\n", "KEYWORDS: a, b"]:
+        parser.feed(chunk)
+    parser.close()
+    assert parser.sections["CONTENT"] == "Body\n"
+    assert parser.sections["KEYWORDS"] == "a, b"
+
+
+def test_marker_with_markdown_lead():
+    sections, _ = parse("## TITLE: Trends\n**CONTENT:** Body", 3)
+    assert list(sections) == ["TITLE", "CONTENT"]
+    assert sections["TITLE"].startswith("Trends")
+    assert sections["CONTENT"].endswith("Body")
@@ -0,0 +1,113 @@
+"""Token estimates: max_tokens sizing from the template registries and request input sizes."""
+
+import json
+import math
+import re
+
+
+# English prose with markdown averages ~1.3-1.4 tokens per word
+TOKENS_PER_WORD = 1.4
+
+# LinkedIn posts are short, emoji- and symbol-heavy text, which tokenizes denser than prose
+CHARS_PER_TOKEN = 3.0
+
+# Allowance over the target length, since models overshoot word counts
+HEADROOM = 1.15
+
+# Tokens for the non-body sections: title, meta description and keywords for
+# blogs; hook and CTA (which repeat lines of the post) for LinkedIn
+BLOG_SECTION_OVERHEAD = 300
+LINKEDIN_SECTION_OVERHEAD = 150
+
+
+def _round_up(tokens: float, step: int = 256) -> int:
+    return int(math.ceil(tokens / step) * step)
+
+
+def blog_max_tokens(template: dict) -> int:
+    """
+    Size max_tokens for a blog template from its "word_count" range.
+
+    e.g. "1800-2500" reserves room for 2500 words plus headroom and the
+    surrounding TITLE/META_DESCRIPTION/KEYWORDS sections.
+    """
+    words = max(int(n) for n in re.findall(r"\d+", template["word_count"]))
+    return _round_up(words * TOKENS_PER_WORD * HEADROOM + BLOG_SECTION_OVERHEAD)
+
+
+def linkedin_max_tokens(template: dict) -> int:
+    """
+    Size max_tokens for a LinkedIn template from its "character_limit".
+
+    The hook and CTA sections quote parts of the post again, so they are
+    budgeted on top of the post itself.
+    """
+    post_tokens = template["character_limit"] / CHARS_PER_TOKEN
+    return _round_up(post_tokens * HEADROOM + LINKEDIN_SECTION_OVERHEAD)
+
+
+# A structured post arrives as tool-call JSON: field names, quotes and the
+# escaping of newlines and quotes in the text make the same post longer, and a
+# cut-off tool call cannot be continued, so structured requests get more room
+STRUCTURED_HEADROOM = 1.3
+STRUCTURED_ENVELOPE = 100
+
+
+def structured_max_tokens(max_tokens: int) -> int:
+    """Enlarge a text-format max_tokens budget for the same output as a tool call."""
+    return _round_up(max_tokens * STRUCTURED_HEADROOM + STRUCTURED_ENVELOPE)
+
+
+# Prompts are plain English prose, which averages about 4 characters per token
+PROMPT_CHARS_PER_TOKEN = 4.0
+
+
+def _text_length(content) -> int:
+    if isinstance(content, str):
+        return len(content)
+    return sum(len(block.get("text", "")) for block in content)
+
+
+# Shortest prefix the API will cache, by model name prefix; the API silently
+# ignores breakpoints on shorter prefixes. Other models cache from 1024 tokens.
+MIN_CACHEABLE_TOKENS = [
+    ("claude-haiku-4-5", 4096),
+    ("claude-opus-4-5", 4096),
+    ("claude-3-5-haiku", 2048),
+    ("claude-3-haiku", 2048),
+]
+DEFAULT_MIN_CACHEABLE_TOKENS = 1024
+
+
+def min_cacheable_tokens(model: str) -> int:
+    """Get the minimum prompt prefix length, in tokens, that `model` caches."""
+    for prefix, tokens in MIN_CACHEABLE_TOKENS:
+        if model.startswith(prefix):
+            return tokens
+    return DEFAULT_MIN_CACHEABLE_TOKENS
+
+
+def drop_short_breakpoints(params: dict):
+    """
+    Remove the cache_control marks of a messages.create request whose prefix
+    (tools, then system blocks, then user content up to the mark) is
+    estimated below the model's minimum cacheable length.
+    """
+    minimum = min_cacheable_tokens(params["model"])
+    chars = len(json.dumps(params["tools"])) if params.get("tools") else 0
+    for block in params["system"] + params["messages"][0]["content"]:
+        chars += len(block.get("text", ""))
+        if "cache_control" in block and chars / PROMPT_CHARS_PER_TOKEN < minimum:
+            del block["cache_control"]
+
+
+def estimate_input_tokens(params: dict) -> int:
+    """
+    Estimate the input tokens of a messages.create request without calling
+    the token counting endpoint, for rate limiting before the request is sent.
+    """
+    chars = _text_length(params.get("system", ""))
+    chars += sum(_text_length(m["content"]) for m in params["messages"])
+    if params.get("tools"):
+        chars += len(json.dumps(params["tools"]))
+    return int(math.ceil(chars / PROMPT_CHARS_PER_TOKEN))
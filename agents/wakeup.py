@@ -0,0 +1,91 @@
+"""Local wake-up channel between CLI processes and the scheduler daemon."""
+
+import os
+import socket
+import time
+from typing import List, Optional
+
+
+# Unix domain sockets are unavailable on some platforms (e.g. older Windows)
+HAS_UNIX_SOCKETS = hasattr(socket, "AF_UNIX")
+
+
+class WakeupListener:
+    """
+    Datagram socket the daemon sleeps on until a deadline or a notification.
+
+    Each datagram carries an optional task ID, so the daemon learns which new
+    task to add to its timer heap without rescanning the schedule. When Unix
+    sockets are unavailable, wait() degrades to a plain sleep.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.sock: Optional[socket.socket] = None
+
+        if not HAS_UNIX_SOCKETS:
+            return
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            if os.path.exists(path):
+                # Left behind by a daemon that did not shut down cleanly
+                os.remove(path)
+            sock.bind(path)
+        except OSError as e:
+            print(f"Wake-up socket unavailable, falling back to polling: {e}")
+            sock.close()
+            return
+
+        self.sock = sock
+
+    def wait(self, timeout: Optional[float]) -> Optional[List[str]]:
+        """
+        Sleep until `timeout` seconds pass or a notification arrives.
+
+        Returns:
+            None on timeout, otherwise the task IDs received (possibly empty)
+        """
+        if self.sock is None:
+            time.sleep(timeout if timeout is not None else 1)
+            return None
+
+        self.sock.settimeout(timeout)
+        try:
+            data = self.sock.recv(4096)
+        except socket.timeout:
+            return None
+
+        # Drain anything else that queued up while we were asleep
+        messages = [data]
+        self.sock.setblocking(False)
+        try:
+            while True:
+                messages.append(self.sock.recv(4096))
+        except BlockingIOError:
+            pass
+
+        return [m.decode("utf-8") for m in messages if m]
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+def notify(path: str, task_id: str = ""):
+    """Wake a sleeping daemon, if one is listening on `path`."""
+    if not HAS_UNIX_SOCKETS or not os.path.exists(path):
+        return
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        sock.sendto(task_id.encode("utf-8"), path)
+    except OSError:
+        pass
+    finally:
+        sock.close()